@@ -1,6 +1,5 @@
 import streamlit as st
-import rdflib # Still needed for BNode, URIRef in get_node_label
-from pyvis.network import Network
+import rdflib
 import streamlit.components.v1 as components
 from pathlib import Path
 import tempfile
@@ -12,38 +11,91 @@ from c4sb_demo.graph_operations import (
     create_combined_linked_graph,
     execute_sparql_query,
 )
+from c4sb_demo.dataset_stats import get_graph_statistics
+from c4sb_demo.tracing import INFO, get_tracer, set_trace_level
+from c4sb_demo.visualization import (
+    DEFAULT_HOPS,
+    DEFAULT_MAX_NODES,
+    FULL_RENDER_TRIPLE_LIMIT,
+    ClassOverview,
+    GraphIndex,
+    build_neighborhood_network,
+    build_overview_network,
+    build_pyvis_network,
+    expand_neighborhood,
+)
 from c4sb_demo.sparql_constants import (
-    RDFS_LABEL,      # Used in get_node_label
-    SKOS_PREF_LABEL,   # Used in get_node_label
     QUERY_1,         # Added
     QUERY_2,         # Added
     QUERY_3,         # Added
     QUERY_4          # Added
 )
 
-# Helper function to get a display label for a node (uses RDFS_LABEL, SKOS_PREFLABEL from graph_operations)
-def get_node_label(graph, node):
-    label = None
-    # Try RDFS.label
-    for _, _, o_literal in graph.triples((node, RDFS_LABEL, None)):
-        label = str(o_literal)
-        break
-    if not label:
-        # Try SKOS.prefLabel
-        for _, _, o_literal in graph.triples((node, SKOS_PREF_LABEL, None)):
-            label = str(o_literal)
-            break
-    if not label:
-        # Fallback for URIs and BNodes
-        if isinstance(node, rdflib.BNode): # Blank node
-            label = f"_:{str(node)}" 
-        elif isinstance(node, rdflib.URIRef): # URI
-            label = str(node).split('#')[-1].split('/')[-1]
-            if not label and str(node).startswith("http"): 
-                label = str(node)
-        else: # Literal or other
-            label = str(node)
-    return label
+# Helper function to embed a Pyvis network in the page
+def render_pyvis_network(net):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".html", mode='w', encoding='utf-8') as tmp_file:
+        net.save_graph(tmp_file.name)
+        html_file_path = tmp_file.name
+
+    with open(html_file_path, 'r', encoding='utf-8') as f:
+        source_code = f.read()
+        components.html(source_code, height=800, scrolling=True)
+
+    Path(html_file_path).unlink(missing_ok=True)
+
+# Helper function to get the visualizer's index of a graph, kept across reruns until the graph changes
+def get_graph_index(graph, key_suffix):
+    key = f"graph_index_{key_suffix}"
+    cached = st.session_state.get(key)
+    if cached is None or cached[0] is not graph or cached[1] != len(graph):
+        cached = (graph, len(graph), GraphIndex.from_graph(graph))
+        st.session_state[key] = cached
+    return cached[2]
+
+# Helper function to get the class overview of an index and the instances of each class, kept next to the index
+def get_class_overview(index, key_suffix):
+    key = f"class_overview_{key_suffix}"
+    cached = st.session_state.get(key)
+    if cached is None or cached[0] is not index:
+        instances = {}
+        for node, node_types in index.types.items():
+            for cls in node_types:
+                instances.setdefault(cls, []).append(node)
+        cached = (index, ClassOverview.from_index(index), instances)
+        st.session_state[key] = cached
+    return cached[1], cached[2]
+
+# Helper function to show the class overview of a graph and expand a chosen node's neighbourhood
+def display_level_of_detail(index, key_suffix):
+    st.caption("Classes with their instance counts; choose a node below to expand its neighbourhood.")
+    overview, instances = get_class_overview(index, key_suffix)
+    render_pyvis_network(build_overview_network(index, overview=overview))
+
+    instance_counts = {c.cls: c.instances for c in overview.classes}
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        cls = st.selectbox(
+            "Class", [c.cls for c in overview.classes], key=f"lod_class_{key_suffix}",
+            format_func=lambda c: f"{index.label(c)} ({instance_counts[c]})",
+        )
+    with col2:
+        node = st.selectbox(
+            "Node to expand", instances.get(cls, []), index=None,
+            key=f"lod_node_{key_suffix}", format_func=index.label, placeholder="Choose a node",
+        )
+    with col3:
+        hops = st.slider("Hops", 1, 4, DEFAULT_HOPS, key=f"lod_hops_{key_suffix}")
+    with col4:
+        max_nodes = st.number_input(
+            "Node budget", min_value=10, max_value=2000, value=DEFAULT_MAX_NODES, step=10, key=f"lod_budget_{key_suffix}"
+        )
+
+    if node is not None:
+        view = expand_neighborhood(index, [node], hops=hops, max_nodes=int(max_nodes))
+        st.caption(f"{len(view.nodes)} nodes and {len(view.clusters)} clusters within {hops} hop(s) of {index.label(node)}.")
+        if view.truncated:
+            st.warning("The node budget was reached; raise it or lower the hops to see more.")
+        render_pyvis_network(build_neighborhood_network(view, index))
 
 # Helper function to display a graph 
 def display_graph_info(graph, title, key_suffix=""):
@@ -59,58 +111,22 @@ def display_graph_info(graph, title, key_suffix=""):
 
     if st.checkbox(f"Visualize {title} with Pyvis", key=f"show_pyvis_{key_suffix}"):
         try:
-            net = Network(notebook=True, height="750px", width="100%", cdn_resources='remote', directed=True)
-            net.force_atlas_2based(gravity=-50, central_gravity=0.01, spring_length=100, spring_strength=0.08, damping=0.4, overlap=0)
-            
-            # Keep track of rdflib nodes already added to Pyvis to use their string representation as ID
-            # and their computed label for display.
-            # Pyvis nodes are added using their string representation as ID.
-            processed_nodes = {} # Maps rdflib node to its string ID used in Pyvis
-
-            for s, p, o in graph:
-                s_str_id = str(s)
-                if s not in processed_nodes:
-                    label_s = get_node_label(graph, s)
-                    net.add_node(s_str_id, label=label_s, title=str(s))
-                    processed_nodes[s] = s_str_id
-                
-                if isinstance(o, rdflib.URIRef) or isinstance(o, rdflib.BNode):
-                    o_str_id = str(o)
-                    if o not in processed_nodes:
-                        label_o = get_node_label(graph, o)
-                        net.add_node(o_str_id, label=label_o, title=str(o))
-                        processed_nodes[o] = o_str_id
-                    
-                    edge_label = get_node_label(graph, p)
-                    net.add_edge(s_str_id, o_str_id, label=edge_label, title=str(p))
-                else: # o is a literal
-                    prop_label = get_node_label(graph, p)
-                    # Literals are added to the title of the subject node in Pyvis
-                    # Retrieve the node from Pyvis; net.get_node() expects the node ID (string)
-                    pyvis_node = net.get_node(s_str_id) 
-                    if pyvis_node:
-                        current_title = pyvis_node.get('title', str(s))
-                        if not isinstance(current_title, str):
-                            current_title = str(current_title)
-                        new_prop_info = f"\n{prop_label}: {str(o)}"
-                        # Update the title in the Pyvis node object directly
-                        if new_prop_info not in current_title:
-                            pyvis_node['title'] = current_title + new_prop_info
-                    # else: st.warning(f"Node {s_str_id} not found in Pyvis for literal.")
+            # One pass over the graph indexes labels and literal properties; nodes and edges are added in bulk
+            index = get_graph_index(graph, key_suffix)
+            # Large graphs open on the class overview, as drawing every triple would stall the browser
+            mode = st.radio(
+                "Level of detail", ["Overview", "Full graph"], horizontal=True, key=f"lod_mode_{key_suffix}",
+                index=0 if len(graph) > FULL_RENDER_TRIPLE_LIMIT else 1,
+            )
+            if mode == "Overview":
+                display_level_of_detail(index, key_suffix)
+                return
 
+            net = build_pyvis_network(graph, index=index)
             if not net.nodes:
                 st.write("Graph has no nodes to visualize with Pyvis.")
                 return
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".html", mode='w', encoding='utf-8') as tmp_file:
-                net.save_graph(tmp_file.name)
-                html_file_path = tmp_file.name
-            
-            with open(html_file_path, 'r', encoding='utf-8') as f:
-                source_code = f.read()
-                components.html(source_code, height=800, scrolling=True)
-            
-            Path(html_file_path).unlink(missing_ok=True)
+            render_pyvis_network(net)
 
         except Exception as e:
             st.error(f"Error visualizing graph {title} with Pyvis: {e}")
@@ -151,6 +167,13 @@ def run():
         st.session_state['query4_results_df'] = None
     if 'query4_path_graph' not in st.session_state:
         st.session_state['query4_path_graph'] = None
+    if 'base_trace_level' not in st.session_state:
+        st.session_state['base_trace_level'] = get_tracer().level  # As set by C4SB_TRACE
+
+    # Span timings are only recorded while asked for, so the default run pays nothing for them
+    record_timings = st.sidebar.checkbox("Record timings", value=get_tracer().enabled(INFO))
+    base_level = st.session_state['base_trace_level']
+    set_trace_level(max(base_level, INFO) if record_timings else base_level)
 
     project_root = Path(__file__).resolve().parent.parent.parent # cs4b-demo
     data_path = project_root / "data"
@@ -196,6 +219,8 @@ def run():
         if len(g_combined_linked) > 0:
             st.text(f"Number of triples in combined graph: {len(g_combined_linked)}")
             display_graph_info(g_combined_linked, "Combined and Linked Graph Visualization", key_suffix="combined_linked")
+            with st.expander("Dataset statistics (classes and predicates)"):
+                st.dataframe(get_graph_statistics(g_combined_linked).to_dataframe())
         else:
             st.warning("Combined graph is empty. This might happen if linking failed or source graphs are empty.")
 
@@ -205,7 +230,7 @@ def run():
         st.text_area("Query 1: ASHRAE Components for Brick RTU", QUERY_1["body"], height=200, key="q1_text_area")
         if st.button("Run Query 1", key="q1_run_button"):
             try:
-                results_df, path_graph = execute_sparql_query(g_combined_linked, QUERY_1) # Pass full dict
+                results_df, path_graph = execute_sparql_query(g_combined_linked, QUERY_1, use_result_cache=True)
                 st.session_state['query1_results_df'] = results_df
                 st.session_state['query1_path_graph'] = path_graph
                 if results_df is None: # Check if execute_sparql_query itself returned None for df
@@ -242,7 +267,7 @@ def run():
         st.text_area("Query 2: Brick Sensor Context with REC Links", QUERY_2["body"], height=250, key="q2_text_area")
         if st.button("Run Query 2", key="q2_run_button"):
             try:
-                results_df, path_graph = execute_sparql_query(g_combined_linked, QUERY_2) # Pass full dict
+                results_df, path_graph = execute_sparql_query(g_combined_linked, QUERY_2, use_result_cache=True)
                 st.session_state['query2_results_df'] = results_df
                 st.session_state['query2_path_graph'] = path_graph
                 if results_df is None:
@@ -275,7 +300,7 @@ def run():
         st.text_area("Query 3: ASHRAE Compressor, Linked Brick RTU, and REC Room Area", QUERY_3["body"], height=250, key="q3_text_area")
         if st.button("Run Query 3", key="q3_run_button"):
             try:
-                results_df, path_graph = execute_sparql_query(g_combined_linked, QUERY_3) # Pass full dict
+                results_df, path_graph = execute_sparql_query(g_combined_linked, QUERY_3, use_result_cache=True)
                 st.session_state['query3_results_df'] = results_df
                 st.session_state['query3_path_graph'] = path_graph
                 if results_df is None:
@@ -308,7 +333,7 @@ def run():
         st.text_area("Query 4: HVAC Unit Voltage for ex:room_101", QUERY_4["body"], height=250, key="q4_text_area")
         if st.button("Run Query 4", key="q4_run_button"):
             try:
-                results_df, path_graph = execute_sparql_query(g_combined_linked, QUERY_4) # Pass full dict
+                results_df, path_graph = execute_sparql_query(g_combined_linked, QUERY_4, use_result_cache=True)
                 st.session_state['query4_results_df'] = results_df
                 st.session_state['query4_path_graph'] = path_graph
                 if results_df is None:
@@ -355,5 +380,16 @@ def run():
         else:
             st.warning("ASHRAE 223 graph not loaded.")
 
+    if record_timings:
+        tracer = get_tracer()
+        with st.sidebar.expander("Timings", expanded=True):
+            st.dataframe(tracer.to_dataframe(), hide_index=True)
+            counters = tracer.counters()
+            if counters:
+                st.dataframe(pd.DataFrame(list(counters.items()), columns=["counter", "value"]), hide_index=True)
+            if st.button("Reset timings"):
+                tracer.reset()
+                st.rerun()
+
 if __name__ == "__main__":
     run()
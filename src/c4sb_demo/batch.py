@@ -0,0 +1,278 @@
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Any, Iterator
+
+import pandas as pd
+
+from c4sb_demo.graph_operations import create_combined_linked_graph, execute_sparql_query
+from c4sb_demo.sparql_constants import QUERY_1, QUERY_2, QUERY_3, QUERY_4
+from c4sb_demo.tracing import tracing
+
+DEFAULT_QUERIES: Dict[str, Dict[str, Any]] = {
+    "QUERY_1": QUERY_1,
+    "QUERY_2": QUERY_2,
+    "QUERY_3": QUERY_3,
+    "QUERY_4": QUERY_4,
+}
+
+
+@dataclass
+class BuildingSources:
+    """The source files of one building; any of them may be omitted."""
+    name: str
+    brick_file: Optional[Path] = None
+    rec_file: Optional[Path] = None
+    ashrae_file: Optional[Path] = None
+    additional_ttl_files: List[Path] = field(default_factory=list)
+
+
+@dataclass
+class BuildingResult:
+    building: str
+    results: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    triples: int = 0
+    build_seconds: float = 0.0
+    query_seconds: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    query_errors: Dict[str, str] = field(default_factory=dict)
+    trace: Optional[Dict[str, Any]] = None  # Span timings and counters, see tracing.Tracer.records
+
+    @property
+    def total_seconds(self) -> float:
+        return self.build_seconds + sum(self.query_seconds.values())
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        All query results of the building in one table tagged with building and
+        query columns. Failed queries appear as a single row with an error column.
+        """
+        frames = [
+            df.assign(building=self.building, query=query_name)
+            for query_name, df in self.results.items()
+            if df is not None
+        ]
+        frames.extend(
+            pd.DataFrame([{"building": self.building, "query": query_name, "error": message}])
+            for query_name, message in self.query_errors.items()
+        )
+        combined = _concat_frames(frames)
+        leading = ["building", "query"]
+        return combined[leading + [c for c in combined.columns if c not in leading]]
+
+
+def _concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates frames, keeping the union of their columns. Empty frames and
+    all-NA columns are left out of the concat itself, since pandas is changing
+    how they determine the result dtypes.
+    """
+    columns = list(dict.fromkeys(c for df in frames for c in df.columns))
+    frames = [df.dropna(axis=1, how="all") for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns or ["building", "query"])
+    return pd.concat(frames, ignore_index=True).reindex(columns=columns)
+
+
+def load_manifest(manifest_path: Path) -> List[BuildingSources]:
+    """
+    Reads a JSON manifest of the form
+    {"buildings": [{"name": ..., "brick_file": ..., "rec_file": ..., "ashrae_file": ...,
+    "additional_ttl_files": [...]}, ...]}. Relative paths are resolved against
+    the manifest's directory.
+    """
+    manifest_path = Path(manifest_path)
+    base = manifest_path.parent
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    def resolve(value: Optional[str]) -> Optional[Path]:
+        return None if value is None else base / value
+
+    buildings = []
+    for entry in manifest.get("buildings", []):
+        buildings.append(BuildingSources(
+            name=entry["name"],
+            brick_file=resolve(entry.get("brick_file")),
+            rec_file=resolve(entry.get("rec_file")),
+            ashrae_file=resolve(entry.get("ashrae_file")),
+            additional_ttl_files=[resolve(p) for p in entry.get("additional_ttl_files", [])],
+        ))
+    return buildings
+
+
+def run_building(
+    sources: BuildingSources,
+    queries: Optional[Dict[str, Dict[str, Any]]] = None,
+    use_cache: bool = True,
+    trace: bool = False
+) -> BuildingResult:
+    """
+    Worker entry point: builds one building's combined graph and runs every
+    query on it. With trace=True the result carries the span timings of the
+    building (see tracing.py).
+    """
+    if not trace:
+        return _run_building(sources, queries, use_cache)
+    with tracing() as tracer:
+        result = _run_building(sources, queries, use_cache)
+        result.trace = tracer.records()
+    return result
+
+
+def _run_building(
+    sources: BuildingSources,
+    queries: Optional[Dict[str, Dict[str, Any]]],
+    use_cache: bool
+) -> BuildingResult:
+    queries = DEFAULT_QUERIES if queries is None else queries
+    result = BuildingResult(building=sources.name)
+    started = time.perf_counter()
+    try:
+        g = create_combined_linked_graph(
+            sources.brick_file,
+            sources.rec_file,
+            sources.ashrae_file,
+            additional_ttl_files=sources.additional_ttl_files,
+            use_cache=use_cache,
+        )
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+        return result
+    finally:
+        result.build_seconds = time.perf_counter() - started
+    if g is None:
+        result.error = "Could not build the combined graph"
+        return result
+    result.triples = len(g)
+    if not result.triples:
+        result.error = "No source files could be loaded"
+        return result
+
+    for query_name, query_definition in queries.items():
+        query_started = time.perf_counter()
+        results_df, _ = execute_sparql_query(g, query_definition)
+        result.query_seconds[query_name] = time.perf_counter() - query_started
+        if results_df is None:
+            result.query_errors[query_name] = "Query failed, see the log for the SPARQL error"
+        else:
+            result.results[query_name] = results_df
+    return result
+
+
+def iter_batch(
+    buildings: List[BuildingSources],
+    queries: Optional[Dict[str, Dict[str, Any]]] = None,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    trace: bool = False
+) -> Iterator[BuildingResult]:
+    """
+    Builds and queries each building in its own worker process (up to
+    max_workers), yielding each BuildingResult as soon as it is done, so in
+    completion order rather than manifest order. With a single building or
+    max_workers=1 everything runs in the calling process.
+    """
+    if len(buildings) <= 1 or max_workers == 1:
+        for sources in buildings:
+            yield run_building(sources, queries, use_cache, trace)
+        return
+
+    workers = min(max_workers or len(buildings), len(buildings))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_building, sources, queries, use_cache, trace): sources
+            for sources in buildings
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker itself died (e.g. ran out of memory)
+                yield BuildingResult(building=futures[future].name, error=f"{type(e).__name__}: {e}")
+
+
+def timings_dataframe(results: List[BuildingResult]) -> pd.DataFrame:
+    """One row per building: graph size, build time, per-query and total seconds, error."""
+    rows = []
+    for result in results:
+        row: Dict[str, Any] = {
+            "building": result.building,
+            "triples": result.triples,
+            "build_seconds": result.build_seconds,
+        }
+        for query_name, seconds in result.query_seconds.items():
+            row[f"{query_name}_seconds"] = seconds
+        row["total_seconds"] = result.total_seconds
+        row["error"] = result.error
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def run_batch(
+    buildings: List[BuildingSources],
+    queries: Optional[Dict[str, Dict[str, Any]]] = None,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Runs iter_batch to completion. Returns the combined building-tagged results
+    (sorted by building, then query, with an error row per failed query) and
+    the per-building timings.
+    """
+    results = list(iter_batch(buildings, queries, max_workers=max_workers, use_cache=use_cache))
+    combined = _concat_frames([r.to_dataframe() for r in results])
+    combined = combined.sort_values(["building", "query"], kind="stable", ignore_index=True)
+    timings = timings_dataframe(results)
+    if not timings.empty:
+        timings = timings.sort_values("building", ignore_index=True)
+    return combined, timings
+
+
+def main():
+    """
+    Batch runner: builds and queries every building of a manifest in parallel,
+    streaming the building-tagged result rows to a JSON Lines file as each
+    building finishes and writing the per-building timings as CSV.
+    """
+    parser = argparse.ArgumentParser(description="Run the demo queries across a portfolio of buildings.")
+    parser.add_argument("manifest", type=Path, help="JSON manifest of building source files")
+    parser.add_argument("--output", type=Path, default=Path("batch-results.jsonl"), help="JSON Lines file for the result rows")
+    parser.add_argument("--timings", type=Path, default=None, help="CSV file for the per-building timings")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: one per building)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the parsed-graph cache")
+    parser.add_argument("--trace", action="store_true", help="Print the slowest traced spans of each building")
+    args = parser.parse_args()
+
+    buildings = load_manifest(args.manifest)
+    print(f"Running {len(DEFAULT_QUERIES)} queries across {len(buildings)} buildings...")
+    started = time.perf_counter()
+    results = []
+    with open(args.output, "w") as out:
+        for result in iter_batch(buildings, max_workers=args.workers, use_cache=not args.no_cache, trace=args.trace):
+            results.append(result)
+            df = result.to_dataframe()
+            if not df.empty:
+                out.write(df.to_json(orient="records", lines=True, default_handler=str))
+                out.flush()
+            if result.error:
+                print(f"Error processing {result.building}: {result.error}")
+            else:
+                print(f"{result.building}: {result.triples} triples, {len(df)} rows in {result.total_seconds:.2f}s")
+            if result.trace:
+                spans = sorted(result.trace["spans"].items(), key=lambda item: -item[1]["seconds"])[:5]
+                print("  slowest spans: " + ", ".join(f"{name} {s['seconds'] * 1000:.1f} ms" for name, s in spans))
+
+    timings = timings_dataframe(results)
+    if args.timings:
+        timings.to_csv(args.timings, index=False)
+    else:
+        print(timings.to_string(index=False))
+    print(f"Batch complete in {time.perf_counter() - started:.2f}s, results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
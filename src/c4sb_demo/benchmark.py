@@ -0,0 +1,392 @@
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Any, Callable, Sequence
+
+import rdflib
+
+from c4sb_demo.batch import DEFAULT_QUERIES
+from c4sb_demo.graph_operations import create_combined_linked_graph, execute_sparql_query
+from c4sb_demo.synthetic import SCALE_PRESETS, generate_building_files
+from c4sb_demo.tracing import DEBUG, INFO, get_tracer, tracing
+from c4sb_demo.validate_graphs import (
+    ASHRAE_DATA_FILE,
+    BRICK_DATA_FILE,
+    REC_DATA_FILE,
+    SHAPE_PROFILES,
+    validate_file,
+)
+
+# Bump when the results file layout changes
+RESULTS_FORMAT_VERSION: int = 1
+
+# The shipped sample files; every other size is a synthetic.SCALE_PRESETS entry
+SAMPLE_SIZE = "sample"
+DEFAULT_SIZES: List[str] = [SAMPLE_SIZE, "tiny"]
+
+# Validation stages: (stage name, shapes profile, which source file it validates)
+VALIDATION_STAGES: List[Tuple[str, str, str]] = [
+    ("validate:rec", "rec", "rec"),
+    ("validate:ashrae-223", "ashrae-223", "ashrae"),
+]
+STAGES: List[str] = ["ingest", *DEFAULT_QUERIES, *(name for name, _, _ in VALIDATION_STAGES)]
+
+# A stage regresses when its median time grows by more than DEFAULT_TIME_THRESHOLD
+# (a fraction) and by at least DEFAULT_MIN_DELTA_SECONDS, or its memory growth by
+# more than DEFAULT_RSS_THRESHOLD and at least DEFAULT_MIN_DELTA_MB.
+DEFAULT_TIME_THRESHOLD: float = 0.20
+DEFAULT_RSS_THRESHOLD: float = 0.25
+DEFAULT_MIN_DELTA_SECONDS: float = 0.01
+DEFAULT_MIN_DELTA_MB: float = 8.0
+
+
+def peak_rss_mb() -> float:
+    """High-water resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KiB elsewhere
+
+
+@dataclass
+class StageResult:
+    """Timings of one stage at one graph size."""
+    size: str
+    stage: str
+    triples: int = 0
+    seconds: List[float] = field(default_factory=list)
+    rows: Optional[int] = None
+    peak_rss_mb: float = 0.0  # Process high-water mark after the stage
+    rss_growth_mb: float = 0.0  # How much the stage raised it
+    error: Optional[str] = None
+    trace: Optional[Dict[str, Any]] = None  # Span timings and counters of the timed runs (see tracing.Tracer.records)
+
+    @property
+    def median_seconds(self) -> float:
+        return statistics.median(self.seconds) if self.seconds else 0.0
+
+    @property
+    def triples_per_second(self) -> float:
+        return self.triples / self.median_seconds if self.median_seconds else 0.0
+
+    def to_record(self) -> Dict[str, Any]:
+        record = asdict(self)
+        record.update(
+            min_seconds=min(self.seconds, default=0.0),
+            median_seconds=self.median_seconds,
+            mean_seconds=statistics.fmean(self.seconds) if self.seconds else 0.0,
+            stdev_seconds=statistics.stdev(self.seconds) if len(self.seconds) > 1 else 0.0,
+            triples_per_second=self.triples_per_second,
+        )
+        return record
+
+
+def benchmark_sources(size: str, work_dir: Path, seed: int = 0) -> Dict[str, Path]:
+    """The brick, rec and ashrae source files of a size, generating synthetic ones under work_dir."""
+    if size == SAMPLE_SIZE:
+        return {"brick": BRICK_DATA_FILE, "rec": REC_DATA_FILE, "ashrae": ASHRAE_DATA_FILE}
+    if size not in SCALE_PRESETS:
+        raise ValueError(f"Unknown benchmark size {size!r}; expected {SAMPLE_SIZE!r} or one of {sorted(SCALE_PRESETS)}")
+    generated = generate_building_files(work_dir / size, SCALE_PRESETS[size], seed=seed, name=size)
+    return {"brick": generated.brick_file, "rec": generated.rec_file, "ashrae": generated.ashrae_file}
+
+
+def time_stage(run: Callable[[], Any], warmup: int, repeats: int, quiet: bool = True) -> Tuple[List[float], Any]:
+    """
+    Calls run warmup times untimed, then repeats times timed; returns the wall
+    times and the last result. Trace data of the warmup runs is discarded.
+    """
+    result = None
+    seconds = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+        for _ in range(warmup):
+            run()
+        get_tracer().reset()
+        for _ in range(max(repeats, 1)):
+            started = time.perf_counter()
+            result = run()
+            seconds.append(time.perf_counter() - started)
+    return seconds, result
+
+
+def run_size(
+    size: str,
+    stages: Sequence[str],
+    work_dir: Path,
+    warmup: int = 1,
+    repeats: int = 3,
+    seed: int = 0,
+    use_cache: bool = False,
+    quiet: bool = True,
+    trace: bool = False
+) -> List[StageResult]:
+    """
+    Runs the selected stages at one size, in STAGES order. The queries run on
+    the graph of one untimed ingest. Run this in a fresh process (run_benchmarks
+    does) for the memory figures to belong to this size alone. With trace=True
+    each result carries the span timings of its timed runs.
+    """
+    sources = benchmark_sources(size, Path(work_dir), seed)
+    results = []
+    graph: Optional[rdflib.Graph] = None
+
+    def measure(stage: str, run: Callable[[], Any]) -> Tuple[StageResult, Any]:
+        result = StageResult(size, stage)
+        rss_before = peak_rss_mb()
+        level = DEBUG if not quiet else INFO if trace else get_tracer().level
+        with tracing(level) as tracer:
+            try:
+                result.seconds, value = time_stage(run, warmup, repeats, quiet)
+            except Exception as e:
+                result.error, value = f"{type(e).__name__}: {e}", None
+            if trace:
+                result.trace = tracer.records()
+        result.peak_rss_mb = peak_rss_mb()
+        result.rss_growth_mb = result.peak_rss_mb - rss_before
+        results.append(result)
+        return result, value
+
+    def ingest() -> Optional[rdflib.Graph]:
+        return create_combined_linked_graph(sources["brick"], sources["rec"], sources["ashrae"], use_cache=use_cache)
+
+    if "ingest" in stages:
+        result, graph = measure("ingest", ingest)
+        result.triples = len(graph) if graph is not None else 0
+    if any(name in stages for name in DEFAULT_QUERIES) and graph is None:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+            graph = ingest()
+    for name, query in DEFAULT_QUERIES.items():
+        if name not in stages:
+            continue
+        result, value = measure(name, lambda: execute_sparql_query(graph, query))
+        df = value[0] if value is not None else None
+        result.triples = len(graph) if graph is not None else 0
+        result.rows = None if df is None else len(df)
+        if df is None and result.error is None:
+            result.error = "Query failed"
+    for name, profile, source in VALIDATION_STAGES:
+        if name not in stages:
+            continue
+        # What validate_graph_fragment runs, without printing the report
+        result, report = measure(name, lambda: validate_file(sources[source], SHAPE_PROFILES[profile], profile=profile))
+        result.triples = len(rdflib.Graph().parse(sources[source]))
+        if report is not None and report.error and result.error is None:
+            result.error = report.error
+    return results
+
+
+def _run_size_job(job: Tuple[str, Sequence[str], Path, int, int, int, bool, bool, bool]) -> List[StageResult]:
+    return run_size(*job)
+
+
+def run_benchmarks(
+    sizes: Sequence[str],
+    stages: Sequence[str] = tuple(STAGES),
+    warmup: int = 1,
+    repeats: int = 3,
+    seed: int = 0,
+    work_dir: Optional[Path] = None,
+    use_cache: bool = False,
+    isolate: bool = True,
+    quiet: bool = True,
+    trace: bool = False
+) -> List[StageResult]:
+    """
+    Runs run_size for every size, each in a fresh worker process unless
+    isolate is False. Synthetic sources go to work_dir (a temporary directory
+    when None).
+    """
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark stage(s) {unknown}; expected some of {STAGES}")
+    results: List[StageResult] = []
+    with contextlib.ExitStack() as stack:
+        if work_dir is None:
+            work_dir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="c4sb-bench-")))
+        for size in sizes:
+            job = (size, list(stages), Path(work_dir), warmup, repeats, seed, use_cache, quiet, trace)
+            if not isolate:
+                results.extend(_run_size_job(job))
+                continue
+            # Spawned, not forked, so the worker's high-water RSS starts from scratch
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                results.extend(executor.submit(_run_size_job, job).result())
+    return results
+
+
+def write_results(path: Path, results: Sequence[StageResult], settings: Dict[str, Any]) -> None:
+    """Writes the results with the settings and environment they were taken in as JSON."""
+    document = {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "rdflib": rdflib.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "settings": settings,
+        "results": [r.to_record() for r in results],
+    }
+    Path(path).write_text(json.dumps(document, indent=2) + "\n")
+
+
+def load_results(path: Path) -> List[Dict[str, Any]]:
+    """The result records of a results file written by write_results."""
+    document = json.loads(Path(path).read_text())
+    if document.get("format_version") != RESULTS_FORMAT_VERSION:
+        raise ValueError(f"{path} has results format {document.get('format_version')}, expected {RESULTS_FORMAT_VERSION}")
+    return document["results"]
+
+
+@dataclass
+class Comparison:
+    """One stage at one size against its baseline."""
+    size: str
+    stage: str
+    baseline_seconds: float
+    seconds: float
+    baseline_rss_growth_mb: float
+    rss_growth_mb: float
+    time_regressed: bool = False
+    rss_regressed: bool = False
+
+    @property
+    def ratio(self) -> float:
+        return self.seconds / self.baseline_seconds if self.baseline_seconds else float("inf")
+
+    @property
+    def regressed(self) -> bool:
+        return self.time_regressed or self.rss_regressed
+
+
+def compare_to_baseline(
+    results: Sequence[StageResult],
+    baseline: Sequence[Dict[str, Any]],
+    time_threshold: float = DEFAULT_TIME_THRESHOLD,
+    rss_threshold: float = DEFAULT_RSS_THRESHOLD,
+    min_delta_seconds: float = DEFAULT_MIN_DELTA_SECONDS,
+    min_delta_mb: float = DEFAULT_MIN_DELTA_MB
+) -> List[Comparison]:
+    """Compares median times and memory growth with the baseline records of the same size and stage."""
+    by_key = {(r["size"], r["stage"]): r for r in baseline if not r.get("error")}
+    comparisons = []
+    for result in results:
+        base = by_key.get((result.size, result.stage))
+        if base is None or result.error:
+            continue
+        comparison = Comparison(
+            result.size, result.stage, base["median_seconds"], result.median_seconds,
+            base["rss_growth_mb"], result.rss_growth_mb,
+        )
+        time_delta = comparison.seconds - comparison.baseline_seconds
+        comparison.time_regressed = (
+            time_delta > min_delta_seconds and time_delta > time_threshold * comparison.baseline_seconds
+        )
+        rss_delta = comparison.rss_growth_mb - comparison.baseline_rss_growth_mb
+        comparison.rss_regressed = rss_delta > min_delta_mb and rss_delta > rss_threshold * comparison.baseline_rss_growth_mb
+        comparisons.append(comparison)
+    return comparisons
+
+
+def format_results(results: Sequence[StageResult]) -> str:
+    lines = [f"{'size':<8} {'stage':<20} {'triples':>9} {'median s':>10} {'min s':>9} {'triples/s':>11} {'peak MiB':>9} {'+MiB':>7}"]
+    for r in results:
+        if r.error:
+            lines.append(f"{r.size:<8} {r.stage:<20} ERROR: {r.error}")
+            continue
+        lines.append(
+            f"{r.size:<8} {r.stage:<20} {r.triples:>9} {r.median_seconds:>10.4f} {min(r.seconds):>9.4f} "
+            f"{r.triples_per_second:>11.0f} {r.peak_rss_mb:>9.1f} {r.rss_growth_mb:>7.1f}"
+        )
+    return "\n".join(lines)
+
+
+def format_trace(results: Sequence[StageResult], limit: int = 5) -> str:
+    """The slowest spans of each traced stage, per timed run."""
+    lines = []
+    for r in results:
+        if not r.trace or not r.trace["spans"]:
+            continue
+        runs = max(len(r.seconds), 1)
+        spans = sorted(r.trace["spans"].items(), key=lambda item: -item[1]["seconds"])[:limit]
+        lines.append(f"{r.size} {r.stage}: " + ", ".join(f"{name} {s['seconds'] / runs * 1000:.1f} ms" for name, s in spans))
+    return "\n".join(lines)
+
+
+def format_comparisons(comparisons: Sequence[Comparison]) -> str:
+    lines = [f"{'size':<8} {'stage':<20} {'baseline s':>10} {'now s':>9} {'ratio':>6} {'base +MiB':>9} {'+MiB':>7}"]
+    for c in comparisons:
+        flags = " ".join(flag for flag, on in (("SLOWER", c.time_regressed), ("MORE MEMORY", c.rss_regressed)) if on)
+        lines.append(
+            f"{c.size:<8} {c.stage:<20} {c.baseline_seconds:>10.4f} {c.seconds:>9.4f} {c.ratio:>6.2f} "
+            f"{c.baseline_rss_growth_mb:>9.1f} {c.rss_growth_mb:>7.1f}  {flags}".rstrip()
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """
+    Benchmarks ingest, QUERY_1..4 and validation across graph sizes, writes the
+    results as JSON and, given a baseline results file, exits with status 1 if
+    any stage regressed beyond the thresholds.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark graph ingest, the demo queries and validation.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help=f"Graph sizes: {SAMPLE_SIZE!r} or synthetic presets {sorted(SCALE_PRESETS)} (default: {DEFAULT_SIZES})")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES, metavar="STAGE",
+                        help=f"Stages to run (default: all of {STAGES})")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before timing each stage (default: 1)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs of each stage (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic buildings (default: 0)")
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"), help="Results file to write")
+    parser.add_argument("--baseline", type=Path, default=None, help="Results file to compare against")
+    parser.add_argument("--time-threshold", type=float, default=DEFAULT_TIME_THRESHOLD,
+                        help=f"Allowed median time growth as a fraction (default: {DEFAULT_TIME_THRESHOLD})")
+    parser.add_argument("--rss-threshold", type=float, default=DEFAULT_RSS_THRESHOLD,
+                        help=f"Allowed memory growth as a fraction (default: {DEFAULT_RSS_THRESHOLD})")
+    parser.add_argument("--work-dir", type=Path, default=None, help="Keep the generated sources here instead of a temporary directory")
+    parser.add_argument("--use-cache", action="store_true", help="Ingest through the parsed-graph cache")
+    parser.add_argument("--in-process", action="store_true", help="Run every size in this process (memory figures accumulate)")
+    parser.add_argument("--trace", action="store_true", help="Record the span timings of each stage (see tracing.py)")
+    parser.add_argument("--verbose", action="store_true", help="Show the output and DEBUG trace of the benchmarked code")
+    args = parser.parse_args()
+
+    settings = {
+        "sizes": args.sizes, "stages": args.stages, "warmup": args.warmup, "repeats": args.repeats,
+        "seed": args.seed, "use_cache": args.use_cache, "isolated": not args.in_process, "trace": args.trace,
+    }
+    print(f"Benchmarking {len(args.stages)} stages at sizes {args.sizes} ({args.warmup} warmup, {args.repeats} timed runs)...")
+    results = run_benchmarks(
+        args.sizes, args.stages, args.warmup, args.repeats, args.seed, args.work_dir,
+        use_cache=args.use_cache, isolate=not args.in_process, quiet=not args.verbose, trace=args.trace,
+    )
+    write_results(args.output, results, settings)
+    print(format_results(results))
+    if args.trace:
+        print(format_trace(results))
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        comparisons = compare_to_baseline(results, load_results(args.baseline), args.time_threshold, args.rss_threshold)
+        print(f"\nCompared with {args.baseline}:")
+        print(format_comparisons(comparisons))
+        regressions = [c for c in comparisons if c.regressed]
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed beyond the thresholds.")
+            sys.exit(1)
+        print("No regressions beyond the thresholds.")
+
+
+if __name__ == "__main__":
+    main()
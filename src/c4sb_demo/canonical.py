@@ -0,0 +1,516 @@
+import threading
+import weakref
+from typing import Optional, List, Dict, Tuple, Set, Sequence, Iterable, Mapping, Any
+
+import rdflib
+from rdflib.plugins.sparql.algebra import traverse, _traverseAgg, _addVars
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.sparql import Query
+from rdflib.store import Store
+from rdflib.term import URIRef, BNode, Variable, Node
+
+from c4sb_demo.graph_store import graph_version
+from c4sb_demo.sparql_constants import OWL_SAMEAS
+from c4sb_demo.tracing import debug
+from c4sb_demo.witness import where_pattern, set_where_pattern, copy_algebra
+
+Triple = Tuple[Node, Node, Node]
+# What a query asks of a node: (node is the subject, predicate, term at the other end or None)
+PatternKey = Tuple[bool, URIRef, Optional[Node]]
+
+
+class UnionFind:
+    """Disjoint sets over hashable items with path halving and union by size."""
+
+    def __init__(self):
+        self.parent: Dict[Any, Any] = {}
+        self.size: Dict[Any, int] = {}
+
+    def find(self, item: Any) -> Any:
+        parent = self.parent
+        if item not in parent:
+            parent[item] = item
+            self.size[item] = 1
+            return item
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: Any, b: Any) -> Any:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+    def groups(self) -> Dict[Any, List[Any]]:
+        members: Dict[Any, List[Any]] = {}
+        for item in self.parent:
+            members.setdefault(self.find(item), []).append(item)
+        return members
+
+
+class CanonicalMap:
+    """
+    Result of smushing a graph: maps every member of an owl:sameAs equivalence
+    class to its canonical node and each canonical node back to the original
+    terms it stands for.
+    """
+
+    def __init__(self, canonical_of: Dict[Node, Node], originals: Dict[Node, Tuple[Node, ...]]):
+        self.canonical_of = canonical_of
+        self.originals_of = originals
+        # Filled by canonicalize_graph: the triples it replaced and the ones it introduced
+        self.removed_triples = rdflib.Graph()
+        self.removed_nodes: Set[Node] = set()
+        self.added_triples: Set[Triple] = set()
+        # Query text -> (graph version, rewrite or None) as of the last check
+        self._rewritten: Dict[str, Tuple[Any, Optional[Query]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.originals_of)
+
+    def canonical(self, term: Node) -> Node:
+        return self.canonical_of.get(term, term)
+
+    def originals(self, term: Node) -> Tuple[Node, ...]:
+        """All terms (canonical first) that term stands for after smushing."""
+        return self.originals_of.get(term, (term,))
+
+    def is_merged(self, term: Any) -> bool:
+        """True if term is a member (canonical or alias) of a smushed owl:sameAs class."""
+        return term in self.canonical_of or term in self.originals_of
+
+    def original_view(self, graph: rdflib.Graph) -> rdflib.Graph:
+        """Read-only view of the smushed graph as it was before canonicalize_graph."""
+        return rdflib.Graph(store=UnsmushedStore(graph, self))
+
+    def rewrite_query(self, query_text: str, prepared: Query, graph: rdflib.Graph) -> Optional[Query]:
+        """
+        Returns prepared rewritten by rewrite_sameas_query if that gives the same
+        results on the smushed graph as prepared on original_view(graph)
+        (see rewrite_is_exact), else None. The verdict depends on the data, so
+        it is cached by query text and graph version, and only for graphs with
+        a versioned store (see graph_store.new_graph).
+        """
+        version = graph_version(graph)
+        with self._lock:
+            cached = self._rewritten.get(query_text)
+            if version is not None and cached is not None and cached[0] == version:
+                return cached[1]
+        rewritten: Optional[Query] = rewrite_sameas_query(prepared, self)
+        if not rewrite_is_exact(prepared, rewritten, self, graph):
+            debug("owl:sameAs rewrite would change the query's results; querying the unsmushed view.")
+            rewritten = None
+        if version is not None:
+            with self._lock:
+                self._rewritten[query_text] = (version, rewritten)
+        return rewritten
+
+
+class UnsmushedStore(Store):
+    """
+    Read-only store showing a graph smushed by canonicalize_graph as it was
+    before: the smushed triples minus those smushing added, plus the ones it
+    replaced. Triples added to the graph later show through unchanged.
+    """
+
+    def __init__(self, graph: rdflib.Graph, cmap: CanonicalMap):
+        super().__init__()
+        self.graph = graph
+        self.cmap = cmap
+
+    def triples(self, triple_pattern, context=None):
+        removed = self.cmap.removed_triples
+        added = self.cmap.added_triples
+        canonical_of = self.cmap.canonical_of
+        s, _, o = triple_pattern
+        removed_nodes = self.cmap.removed_nodes
+        if (s is None or s in removed_nodes) and (o is None or o in removed_nodes):
+            for triple, _ in removed.store.triples(triple_pattern, None):
+                yield triple, iter(())
+        for triple, _ in self.graph.store.triples(triple_pattern, None):
+            if added and triple in added:
+                continue
+            s, p, o = triple
+            # Only triples re-added to the graph since smushing can duplicate a replaced one
+            if (s in canonical_of or o in canonical_of or p == OWL_SAMEAS) and triple in removed:
+                continue
+            yield triple, iter(())
+
+    def __len__(self, context=None):
+        return sum(1 for _ in self.triples((None, None, None)))
+
+    def add(self, triple, context, quoted=False):
+        raise TypeError("The unsmushed view of a graph is read-only")
+
+    def remove(self, triple_pattern, context=None):
+        raise TypeError("The unsmushed view of a graph is read-only")
+
+    def snapshot_before_change(self, snapshot) -> None:
+        """Passed on to the smushed graph's store (see graph_store.VersionedMemory)."""
+        register = getattr(self.graph.store, "snapshot_before_change", None)
+        if register is not None:
+            register(snapshot)
+        else:
+            snapshot.materialize()
+
+    def namespaces(self):
+        return self.graph.namespaces()
+
+    def prefix(self, namespace):
+        return self.graph.store.prefix(namespace)
+
+    def namespace(self, prefix):
+        return self.graph.store.namespace(prefix)
+
+
+def _rank(term: Node, prefer: Sequence[str]) -> Tuple[int, int, str]:
+    # IRIs before blank nodes, preferred namespaces first, then lexical order
+    if not isinstance(term, URIRef):
+        return (1, len(prefer), str(term))
+    text = str(term)
+    for i, ns in enumerate(prefer):
+        if text.startswith(ns):
+            return (0, i, text)
+    return (0, len(prefer), text)
+
+
+def sameas_classes(graph: rdflib.Graph) -> UnionFind:
+    """Unions the subject and object of every owl:sameAs triple between IRIs or blank nodes."""
+    uf = UnionFind()
+    for s, _, o in graph.triples((None, OWL_SAMEAS, None)):
+        if isinstance(s, (URIRef, BNode)) and isinstance(o, (URIRef, BNode)):
+            uf.union(s, o)
+    return uf
+
+
+def build_canonical_map(graph: rdflib.Graph, prefer: Sequence[str] = ()) -> CanonicalMap:
+    """
+    Picks a canonical node for every owl:sameAs class of graph: IRIs before blank
+    nodes, then IRIs in the namespaces of prefer (in order), then lexical order.
+    """
+    canonical_of: Dict[Node, Node] = {}
+    originals: Dict[Node, Tuple[Node, ...]] = {}
+    for members in sameas_classes(graph).groups().values():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda term: _rank(term, prefer))
+        canonical = members[0]
+        originals[canonical] = tuple(members)
+        for member in members[1:]:
+            canonical_of[member] = canonical
+    return CanonicalMap(canonical_of, originals)
+
+
+_canonical_maps: "weakref.WeakKeyDictionary[rdflib.Graph, CanonicalMap]" = weakref.WeakKeyDictionary()
+
+
+def get_canonical_map(graph: rdflib.Graph) -> Optional[CanonicalMap]:
+    """The CanonicalMap of a graph smushed by canonicalize_graph, or None."""
+    try:
+        return _canonical_maps.get(graph)
+    except TypeError:
+        return None
+
+
+def canonicalize_graph(
+    graph: rdflib.Graph,
+    prefer: Sequence[str] = ()
+) -> CanonicalMap:
+    """
+    Smushes graph in place: every owl:sameAs equivalence class is merged into one
+    canonical node (see build_canonical_map), the sameAs triples inside a class
+    are dropped and all other triples are rewritten onto the canonical nodes.
+    A merged node keeps every member's properties, so a plain query projecting
+    e.g. rdfs:label gets one row per label of the class. execute_sparql_query
+    (via get_canonical_map) therefore only runs a query rewritten by
+    rewrite_sameas_query when that is known to give the original results, and
+    otherwise runs it on CanonicalMap.original_view, which reads slower than
+    the plain graph.
+    """
+    cmap = build_canonical_map(graph, prefer)
+    canonical_of = cmap.canonical_of
+
+    def rewrite(triple):
+        s, p, o = triple
+        return canonical_of.get(s, s), canonical_of.get(p, p), canonical_of.get(o, o)
+
+    affected = set()
+    for alias in canonical_of:
+        affected.update(graph.triples((alias, None, None)))
+        affected.update(graph.triples((None, None, alias)))
+        affected.update(graph.triples((None, alias, None)))
+    for canonical in cmap.originals_of:
+        affected.update(graph.triples((canonical, OWL_SAMEAS, None)))
+
+    for triple in affected:
+        graph.remove(triple)
+        cmap.removed_triples.add(triple)
+        cmap.removed_nodes.update((triple[0], triple[2]))
+    for triple in affected:
+        s, p, o = rewrite(triple)
+        if p == OWL_SAMEAS and s == o:
+            continue
+        if (s, p, o) not in graph:
+            cmap.added_triples.add((s, p, o))
+            graph.add((s, p, o))
+
+    try:
+        _canonical_maps[graph] = cmap
+    except TypeError:
+        pass
+    debug(f"Canonicalized {len(cmap)} owl:sameAs classes ({len(canonical_of)} aliases, {len(affected)} triples rewritten).")
+    return cmap
+
+
+def _required_bgps(part: Any) -> List[CompValue]:
+    """The BGPs every solution of part has to match, i.e. not those under OPTIONAL, UNION, MINUS or GRAPH."""
+    found: List[CompValue] = []
+    stack = [part]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, CompValue):
+            continue
+        if node.name == "BGP":
+            found.append(node)
+        elif node.name == "Join":
+            stack.extend((node.p1, node.p2))
+        elif node.name in ("LeftJoin", "Minus"):
+            stack.append(node.p1)
+        elif node.name in ("Filter", "Extend"):
+            stack.append(node.p)
+    return found
+
+
+def _sameas_groups(part: Any) -> UnionFind:
+    # Terms joined by a required owl:sameAs pattern with at least one variable end
+    uf = UnionFind()
+    for bgp in _required_bgps(part):
+        for s, p, o in bgp.triples:
+            if p != OWL_SAMEAS:
+                continue
+            if isinstance(s, Variable) or isinstance(o, Variable):
+                uf.union(s, o)
+    return uf
+
+
+def _bgp_substitutions(part: Any, cmap: Optional[CanonicalMap]) -> Dict[Variable, Node]:
+    """
+    Finds the owl:sameAs triple patterns that smushing made redundant and
+    returns the variable -> replacement (variable or canonical term) map that
+    removes them. sameAs patterns under OPTIONAL and the like are left alone.
+    """
+    uf = _sameas_groups(part)
+    substitutions: Dict[Variable, Node] = {}
+    for members in uf.groups().values():
+        constants = [m for m in members if not isinstance(m, Variable)]
+        if constants:
+            canonical = {cmap.canonical(c) if cmap else c for c in constants}
+            if len(canonical) > 1:
+                continue  # Variables tied to different entities; leave the pattern alone
+            target = canonical.pop()
+        else:
+            target = min(members, key=str)
+        for member in members:
+            if isinstance(member, Variable) and member != target:
+                substitutions[member] = target
+    return substitutions
+
+
+def _iter_nodes(node: Any, name: str) -> Iterable[CompValue]:
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, CompValue):
+            if current.name == name:
+                yield current
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple)):
+            stack.extend(current)
+
+
+def rewrite_sameas_query(prepared: Query, cmap: Optional[CanonicalMap] = None) -> Query:
+    """
+    Rewrites a prepared query for a smushed graph. Each owl:sameAs triple pattern
+    linking a variable to another variable or to an IRI is dropped and the
+    variables it joined are merged into one; the merged-away variables are
+    re-bound with BIND so projections, grouping and ordering see the same
+    names as before. With a CanonicalMap, IRIs in the query are mapped to their
+    canonical nodes as well. Returns a new Query; prepared is left untouched.
+    """
+    rewritten = Query(prepared.prologue, copy_algebra(prepared.algebra))
+    where = where_pattern(rewritten)
+    substitutions = _bgp_substitutions(where, cmap)
+
+    def replace(node: Any) -> Any:
+        if isinstance(node, Variable):
+            return substitutions.get(node)
+        if cmap is not None and isinstance(node, (URIRef, BNode)) and not isinstance(node, Variable):
+            canonical = cmap.canonical(node)
+            return canonical if canonical != node else None
+        if isinstance(node, CompValue) and node.name == "BGP":
+            node["triples"] = [
+                t for t in node.triples
+                if not (t[1] == OWL_SAMEAS and (t[0] == t[2] or (cmap is not None and cmap.canonical(t[0]) == cmap.canonical(t[2]))))
+            ]
+        return None
+
+    where = traverse(where, visitPost=replace)
+    for var, target in sorted(substitutions.items(), key=lambda item: str(item[0])):
+        where = CompValue("Extend", p=where, expr=target, var=var)
+    set_where_pattern(rewritten, where)
+    _traverseAgg(rewritten.algebra, _addVars)
+    rewritten._original_args = getattr(prepared, "_original_args", None)
+    return rewritten
+
+
+def _is_query_variable(term: Any) -> bool:
+    # Blank nodes in a query's triple patterns act as variables
+    return isinstance(term, (Variable, BNode))
+
+
+def _pattern_keys(part: Any, cmap: CanonicalMap) -> Optional[Tuple[Dict[Node, Set[PatternKey]], Dict[Node, Set[PatternKey]]]]:
+    """
+    For every query variable and merged constant under part, the pattern keys it
+    has to match (required BGPs) and may match (all other BGPs), leaving out
+    owl:sameAs patterns. None if a pattern has a variable or path predicate.
+    """
+    required_bgps = {id(bgp) for bgp in _required_bgps(part)}
+    required: Dict[Node, Set[PatternKey]] = {}
+    optional: Dict[Node, Set[PatternKey]] = {}
+    for bgp in _iter_nodes(part, "BGP"):
+        keys = required if id(bgp) in required_bgps else optional
+        for s, p, o in bgp.triples:
+            if p == OWL_SAMEAS:
+                continue
+            if not isinstance(p, URIRef):
+                return None
+            for node, key in ((s, (True, p, None if _is_query_variable(o) else o)),
+                              (o, (False, p, None if _is_query_variable(s) else s))):
+                if _is_query_variable(node) or cmap.is_merged(node):
+                    keys.setdefault(node, set()).add(key)
+    return required, optional
+
+
+def _visible_variables(node: Any) -> Set[Variable]:
+    """Variables used anywhere in a query's algebra other than in triple patterns (projection, BIND, FILTER, ...)."""
+    found: Set[Variable] = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, Variable):
+            found.add(current)
+        elif isinstance(current, CompValue):
+            stack.extend(value for key, value in current.items() if key not in ("triples", "_vars"))
+        elif isinstance(current, (list, tuple)):
+            stack.extend(current)
+    return found
+
+
+def _holds(graph: rdflib.Graph, node: Node, key: PatternKey) -> bool:
+    outgoing, predicate, other = key
+    for _ in graph.triples((node, predicate, other) if outgoing else (other, predicate, node)):
+        return True
+    return False
+
+
+def _canonical_key(key: PatternKey, cmap: CanonicalMap) -> PatternKey:
+    outgoing, predicate, other = key
+    return outgoing, predicate, cmap.canonical(other) if other is not None else None
+
+
+def _key_holders(graph: rdflib.Graph, key: PatternKey, cmap: CanonicalMap) -> Set[Node]:
+    outgoing, predicate, other = _canonical_key(key, cmap)
+    if outgoing:
+        return set(graph.subjects(predicate, other))
+    return set(graph.objects(other, predicate))
+
+
+def rewrite_is_exact(prepared: Query, rewritten: Query, cmap: CanonicalMap, graph: rdflib.Graph) -> bool:
+    """
+    True if rewritten (rewrite_sameas_query of prepared) gives on the smushed
+    graph exactly the results prepared gives on cmap.original_view(graph).
+
+    That holds when, in every owl:sameAs class a query term can bind, one
+    member alone holds everything the query asks of that term (so the merged
+    node can't match another member's labels, say), the sameAs patterns the
+    rewrite dropped link those members in the original data, terms whose value
+    is visible (projected, in BIND/FILTER, ...) are the canonical member, and no
+    node outside the classes matches terms that the rewrite merged.
+    """
+    rewritten_where = where_pattern(rewritten)
+    if any(p == OWL_SAMEAS for bgp in _iter_nodes(rewritten_where, "BGP") for _, p, _ in bgp.triples):
+        return False  # sameAs patterns the rewrite kept find nothing on the smushed graph
+    where = where_pattern(prepared)
+    keys = _pattern_keys(where, cmap)
+    if keys is None:
+        return False
+    required, optional = keys
+    visible = _visible_variables(prepared.algebra)
+    view = cmap.original_view(graph)
+    sameas_patterns = [(s, o) for bgp in _required_bgps(where) for s, p, o in bgp.triples if p == OWL_SAMEAS]
+
+    groups = _sameas_groups(where)
+    for term in list(required) + list(optional):
+        groups.find(term)
+    for terms in groups.groups().values():
+        constants = [t for t in terms if not _is_query_variable(t)]
+        if any(not cmap.is_merged(c) for c in constants) and len(terms) > 1:
+            return False  # e.g. ?x owl:sameAs <iri> for an IRI with no sameAs links
+        group_keys = set().union(*(required.get(t, set()) for t in terms))
+        if constants:
+            candidates = {cmap.canonical(c) for c in constants}
+        elif group_keys:
+            candidates = _key_holders(graph, next(iter(group_keys)), cmap) & cmap.originals_of.keys()
+        elif len(terms) > 1:
+            candidates = set(cmap.originals_of)
+        else:
+            continue  # A term with no patterns doesn't bind nodes
+        if len(terms) > 1 and not constants:
+            if not group_keys:
+                return False
+            # The merged terms could bind any single node that matches them all; only a class node may
+            first, *rest = group_keys
+            for node in _key_holders(graph, first, cmap):
+                if not cmap.is_merged(node) and all(_holds(graph, node, _canonical_key(key, cmap)) for key in rest):
+                    return False
+
+        for canonical in candidates:
+            members = cmap.originals(canonical)
+            if not all(any(_holds(view, m, key) for m in members) for key in group_keys):
+                continue  # Neither query matches this class
+            owners: Dict[Node, Node] = {}
+            for term in terms:
+                term_keys = required.get(term, set()) | optional.get(term, set())
+                holders = [m for m in members if any(_holds(view, m, key) for key in term_keys)]
+                if not holders:
+                    if not _is_query_variable(term):
+                        owners[term] = term
+                    elif len(terms) > 1:
+                        return False
+                    continue
+                if len(holders) > 1:
+                    return False
+                owner = holders[0]
+                if not _is_query_variable(term) and owner != term:
+                    return False
+                if term in visible and owner != canonical:
+                    return False
+                owners[term] = owner
+            for s, o in sameas_patterns:
+                if s in owners or o in owners:
+                    if s not in owners or o not in owners or (owners[s], OWL_SAMEAS, owners[o]) not in view:
+                        return False
+    return True
+
+
+def canonical_bindings(init_bindings: Optional[Mapping[str, Any]], cmap: CanonicalMap) -> Optional[Dict[str, Any]]:
+    if not init_bindings:
+        return init_bindings
+    return {k: cmap.canonical(v) for k, v in init_bindings.items()}
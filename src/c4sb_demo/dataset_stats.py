@@ -0,0 +1,268 @@
+import threading
+import weakref
+from typing import Optional, Dict, Set, Tuple, Any, Callable
+
+import pandas as pd
+import rdflib
+from rdflib import Literal, BNode, URIRef, Namespace
+from rdflib.namespace import XSD
+from rdflib.term import Variable, Node
+
+from c4sb_demo.graph_store import VersionedMemory
+from c4sb_demo.sparql_constants import RDF_TYPE
+from c4sb_demo.tracing import span, debug
+
+VOID: Namespace = Namespace("http://rdfs.org/ns/void#")
+
+TriplePattern = Tuple[Node, Node, Node]
+
+
+def _is_var(term: Node) -> bool:
+    # Blank nodes in a query pattern behave like (non-projectable) variables
+    return isinstance(term, (Variable, BNode))
+
+
+def _bump(counts: Dict[Node, int], key: Node, delta: int) -> None:
+    value = counts.get(key, 0) + delta
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+class GraphStatistics:
+    """
+    VoID-style statistics of a graph: total triples and distinct subjects/objects,
+    and per predicate its triple count and distinct subjects/objects
+    (void:propertyPartition), per class its number of instances
+    (void:classPartition).
+
+    Attached to a graph with a VersionedMemory store (see attach_statistics) the
+    index is maintained as triples are added or removed, so every lookup is
+    O(1). Otherwise collect() builds a snapshot.
+    The query optimizer also uses it to estimate pattern cardinalities.
+    """
+
+    def __init__(self):
+        self.triples: int = 0
+        self.subjects: int = 0
+        self.objects: int = 0
+        self.predicate_triples: Dict[Node, int] = {}
+        self.predicate_subjects: Dict[Node, int] = {}
+        self.predicate_objects: Dict[Node, int] = {}
+        self.class_instances: Dict[Node, int] = {}
+        self.incremental: bool = False
+        self._store: Optional[VersionedMemory] = None
+        self._plans: Dict[str, Tuple[Any, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def collect(cls, graph: rdflib.Graph) -> "GraphStatistics":
+        """Gathers the statistics in one pass over graph."""
+        stats = cls()
+        stats._scan(graph)
+        return stats
+
+    def _scan(self, graph: rdflib.Graph) -> None:
+        subjects: Dict[Node, Set[Node]] = {}
+        objects: Dict[Node, Set[Node]] = {}
+        all_subjects: Set[Node] = set()
+        all_objects: Set[Node] = set()
+        counts: Dict[Node, int] = {}
+        classes: Dict[Node, int] = {}
+        for s, p, o in graph.triples((None, None, None)):
+            counts[p] = counts.get(p, 0) + 1
+            subjects.setdefault(p, set()).add(s)
+            objects.setdefault(p, set()).add(o)
+            all_subjects.add(s)
+            all_objects.add(o)
+            if p == RDF_TYPE:
+                classes[o] = classes.get(o, 0) + 1
+        self.predicate_triples = counts
+        self.class_instances = classes
+        self.triples = sum(counts.values())
+        self.subjects = len(all_subjects)
+        self.objects = len(all_objects)
+        self.predicate_subjects = {p: len(v) for p, v in subjects.items()}
+        self.predicate_objects = {p: len(v) for p, v in objects.items()}
+
+    # Lookups
+
+    def class_count(self, cls: Node) -> int:
+        return self.class_instances.get(cls, 0)
+
+    def predicate_count(self, predicate: Node) -> int:
+        return self.predicate_triples.get(predicate, 0)
+
+    def distinct_subjects(self, predicate: Optional[Node] = None) -> int:
+        return self.subjects if predicate is None else self.predicate_subjects.get(predicate, 0)
+
+    def distinct_objects(self, predicate: Optional[Node] = None) -> int:
+        return self.objects if predicate is None else self.predicate_objects.get(predicate, 0)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """One row per class and per predicate, largest first."""
+        rows = [
+            {"kind": "class", "term": str(cls), "triples": n, "distinct_subjects": n, "distinct_objects": None}
+            for cls, n in self.class_instances.items()
+        ] + [
+            {
+                "kind": "predicate", "term": str(p), "triples": n,
+                "distinct_subjects": self.predicate_subjects.get(p, 0),
+                "distinct_objects": self.predicate_objects.get(p, 0),
+            }
+            for p, n in self.predicate_triples.items()
+        ]
+        df = pd.DataFrame(rows, columns=["kind", "term", "triples", "distinct_subjects", "distinct_objects"])
+        df = df.astype({"triples": "Int64", "distinct_subjects": "Int64", "distinct_objects": "Int64"})
+        return df.sort_values(["kind", "triples"], ascending=[True, False], ignore_index=True)
+
+    def to_void(self, dataset: Optional[URIRef] = None) -> rdflib.Graph:
+        """Describes the statistics as a VoID dataset description."""
+        void = rdflib.Graph()
+        void.bind("void", VOID)
+        ds = dataset or BNode()
+        void.add((ds, RDF_TYPE, VOID.Dataset))
+        void.add((ds, VOID.triples, Literal(self.triples, datatype=XSD.integer)))
+        void.add((ds, VOID.distinctSubjects, Literal(self.subjects, datatype=XSD.integer)))
+        void.add((ds, VOID.distinctObjects, Literal(self.objects, datatype=XSD.integer)))
+        void.add((ds, VOID.properties, Literal(len(self.predicate_triples), datatype=XSD.integer)))
+        void.add((ds, VOID.classes, Literal(len(self.class_instances), datatype=XSD.integer)))
+        for p, n in self.predicate_triples.items():
+            part = BNode()
+            void.add((ds, VOID.propertyPartition, part))
+            void.add((part, VOID.property, p))
+            void.add((part, VOID.triples, Literal(n, datatype=XSD.integer)))
+            void.add((part, VOID.distinctSubjects, Literal(self.predicate_subjects.get(p, 0), datatype=XSD.integer)))
+            void.add((part, VOID.distinctObjects, Literal(self.predicate_objects.get(p, 0), datatype=XSD.integer)))
+        for cls, n in self.class_instances.items():
+            part = BNode()
+            void.add((ds, VOID.classPartition, part))
+            void.add((part, VOID["class"], cls))
+            void.add((part, VOID.entities, Literal(n, datatype=XSD.integer)))
+        return void
+
+    # Incremental maintenance (GraphChangeListener)
+
+    def _count_upto(self, pattern: TriplePattern, limit: int) -> int:
+        n = 0
+        for _ in self._store.triples(pattern):
+            n += 1
+            if n >= limit:
+                break
+        return n
+
+    def triple_added(self, triple: TriplePattern) -> None:
+        # Called after the add: a count of 1 means this triple introduced the term
+        s, p, o = triple
+        self.triples += 1
+        _bump(self.predicate_triples, p, 1)
+        if self._count_upto((s, p, None), 2) == 1:
+            _bump(self.predicate_subjects, p, 1)
+        if self._count_upto((None, p, o), 2) == 1:
+            _bump(self.predicate_objects, p, 1)
+        if self._count_upto((s, None, None), 2) == 1:
+            self.subjects += 1
+        if self._count_upto((None, None, o), 2) == 1:
+            self.objects += 1
+        if p == RDF_TYPE:
+            _bump(self.class_instances, o, 1)
+
+    def triple_removed(self, triple: TriplePattern) -> None:
+        s, p, o = triple
+        self.triples -= 1
+        _bump(self.predicate_triples, p, -1)
+        if self._count_upto((s, p, None), 1) == 0:
+            _bump(self.predicate_subjects, p, -1)
+        if self._count_upto((None, p, o), 1) == 0:
+            _bump(self.predicate_objects, p, -1)
+        if self._count_upto((s, None, None), 1) == 0:
+            self.subjects -= 1
+        if self._count_upto((None, None, o), 1) == 0:
+            self.objects -= 1
+        if p == RDF_TYPE:
+            _bump(self.class_instances, o, -1)
+
+    # Query planning
+
+    def estimate(self, pattern: TriplePattern, bound: Set[Node] = frozenset()) -> float:
+        """
+        Estimated number of matches of pattern for one binding of the variables in
+        bound (i.e. its fan-out when joined after them).
+        """
+        s, p, o = pattern
+        s_bound = not _is_var(s) or s in bound
+        o_bound = not _is_var(o) or o in bound
+        if not _is_var(p):
+            if p == RDF_TYPE and not _is_var(o):
+                n = self.class_instances.get(o, 0)
+                n_subjects, n_objects = n, 1
+            else:
+                n = self.predicate_triples.get(p, 0)
+                n_subjects = self.predicate_subjects.get(p, 0)
+                n_objects = self.predicate_objects.get(p, 0)
+        elif p in bound:
+            # Some predicate, unknown which: assume an average one
+            predicates = max(len(self.predicate_triples), 1)
+            n = self.triples / predicates
+            n_subjects, n_objects = self.subjects / predicates, self.objects / predicates
+        else:
+            n, n_subjects, n_objects = self.triples, self.subjects, self.objects
+        if n == 0:
+            return 0.0
+        if s_bound:
+            n /= max(n_subjects, 1)
+        if o_bound:
+            n /= max(n_objects, 1)
+        return n
+
+    def plan(self, query_text: str, build: Callable[[], Any]) -> Any:
+        """
+        Returns the cached plan for query_text, building it with build() on a miss
+        or once the graph has grown or shrunk by more than 2x since it was planned.
+        """
+        with self._lock:
+            cached = self._plans.get(query_text)
+        if cached is not None:
+            plan, planned_at = cached
+            if planned_at / 2 <= self.triples <= planned_at * 2:
+                return plan
+        plan = build()
+        with self._lock:
+            self._plans[query_text] = (plan, self.triples)
+        return plan
+
+
+_graph_statistics: "weakref.WeakKeyDictionary[rdflib.Graph, GraphStatistics]" = weakref.WeakKeyDictionary()
+
+
+def attach_statistics(graph: rdflib.Graph) -> GraphStatistics:
+    """
+    Registers a GraphStatistics index for graph (scanning what it already holds).
+    On a VersionedMemory store the index is kept current from then on. Attach it
+    after bulk loads: maintaining it per parsed triple costs a few index probes
+    each, far more than the one scan.
+    """
+    stats = GraphStatistics()
+    if len(graph):
+        stats._scan(graph)
+    store = graph.store
+    if isinstance(store, VersionedMemory):
+        stats._store = store
+        stats.incremental = True
+        store.add_listener(stats)
+    _graph_statistics[graph] = stats
+    return stats
+
+
+def get_graph_statistics(graph: rdflib.Graph, collect: bool = True) -> Optional[GraphStatistics]:
+    """
+    The statistics index of graph. Without an attached index one is attached on
+    first use when collect is True; with collect=False None is returned instead.
+    """
+    stats = _graph_statistics.get(graph)
+    if stats is None and collect:
+        with span("stats.collect"):
+            stats = attach_statistics(graph)
+        debug(f"Collected statistics for {len(stats.predicate_triples)} predicates and {len(stats.class_instances)} classes.")
+    return stats
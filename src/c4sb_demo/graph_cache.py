@@ -0,0 +1,354 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Any, Iterable
+
+import rdflib
+from rdflib.plugins.stores.memory import Memory
+from rdflib import BNode, Literal, URIRef
+from rdflib.term import Node
+
+from c4sb_demo.tracing import count
+
+# Bump whenever the on-disk payload layout changes so stale entries are ignored.
+CACHE_FORMAT_VERSION: int = 2
+# Entries are only valid for the rdflib release that produced them: term
+# normalization (literals in particular) can differ between parser versions.
+PARSER_VERSION: str = f"rdflib-{rdflib.__version__}/fmt-{CACHE_FORMAT_VERSION}"
+
+CACHE_FILE_SUFFIX: str = ".rdfcache"
+# Payloads start with PAYLOAD_MAGIC and the byte length of a JSON header
+PAYLOAD_MAGIC: bytes = b"C4SBRDF\0"
+_HEADER_LENGTH = struct.Struct("<I")
+DEFAULT_MAX_CACHE_BYTES: int = int(os.environ.get("C4SB_GRAPH_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Set C4SB_GRAPH_CACHE=0 to always parse from source.
+CACHE_ENABLED: bool = os.environ.get("C4SB_GRAPH_CACHE", "1") != "0"
+
+KEY_MODES = ("hash", "mtime")
+
+
+def default_cache_dir() -> Path:
+    """C4SB_GRAPH_CACHE_DIR, else c4sb-demo/graphs under XDG_CACHE_HOME (~/.cache); read on every call."""
+    configured = os.environ.get("C4SB_GRAPH_CACHE_DIR")
+    if configured:
+        return Path(configured)
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "c4sb-demo" / "graphs"
+
+
+def _encode_term(term: Node) -> Any:
+    # IRIs, by far the most common terms, are stored as bare strings
+    if isinstance(term, URIRef):
+        return str(term)
+    if isinstance(term, BNode):
+        return ["b", str(term)]
+    if isinstance(term, Literal):
+        return ["l", str(term), term.datatype and str(term.datatype), term.language]
+    raise ValueError(f"Cannot encode RDF term of type {type(term).__name__}")
+
+
+def _decode_term(value: Any) -> Node:
+    if isinstance(value, str):
+        return URIRef(value)
+    if value[0] == "b":
+        return BNode(value[1])
+    if value[0] == "l":
+        _, lexical, datatype, language = value
+        return Literal(lexical, lang=language, datatype=URIRef(datatype) if datatype else None)
+    raise ValueError(f"Unknown encoded term {value!r}")
+
+
+def encode_triples(triples: Iterable[Tuple[Node, Node, Node]], namespaces: Iterable[Tuple[str, Any]]) -> bytes:
+    """
+    Encodes triples and prefix bindings into a compact binary payload.
+
+    Each distinct term is stored once in a term table and triples are stored as
+    an array of unsigned integer indexes into that table. Triple order is kept,
+    so replaying a payload adds triples in the same order the parser did.
+
+    The term table and prefix bindings are JSON and the indexes raw integers,
+    so reading a payload, even one planted in a shared cache directory, never
+    runs code the way unpickling would.
+    """
+    term_index: Dict[Node, int] = {}
+    triple_indexes = array("I")
+    for triple in triples:
+        for term in triple:
+            idx = term_index.get(term)
+            if idx is None:
+                idx = len(term_index)
+                term_index[term] = idx
+            triple_indexes.append(idx)
+    header = json.dumps({
+        "version": PARSER_VERSION,
+        "byteorder": sys.byteorder,
+        "itemsize": triple_indexes.itemsize,
+        "namespaces": [(prefix, str(ns)) for prefix, ns in namespaces],
+        "terms": [_encode_term(term) for term in term_index],
+    }, separators=(",", ":")).encode("utf-8")
+    return b"".join((PAYLOAD_MAGIC, _HEADER_LENGTH.pack(len(header)), header, triple_indexes.tobytes()))
+
+
+def encode_graph(graph: rdflib.Graph) -> bytes:
+    """Encodes all triples and prefix bindings of graph (see encode_triples)."""
+    return encode_triples(graph, graph.namespaces())
+
+
+class _RecordingStore(Memory):
+    """Memory store that records added triples in insertion order instead of indexing them."""
+
+    def __init__(self):
+        super().__init__()
+        self.recorded: Dict[Tuple[Node, Node, Node], None] = {}
+
+    def add(self, triple, context, quoted=False):
+        self.recorded[triple] = None
+
+
+def parse_to_payload(source: Path, rdf_format: str = "turtle") -> bytes:
+    """Parses source and returns its encoded payload without building any triple indexes."""
+    store = _RecordingStore()
+    scratch = rdflib.Graph(store=store, bind_namespaces="none")
+    scratch.parse(str(source), format=rdf_format)
+    return encode_triples(store.recorded, scratch.namespaces())
+
+
+def decode_graph(blob: bytes) -> Tuple[List[Tuple[str, str]], List[Node], array]:
+    """
+    Decodes a payload produced by encode_triples into (namespaces, terms, triple_indexes).
+    Raises ValueError for anything that is not a complete payload of this format version.
+    """
+    start = len(PAYLOAD_MAGIC) + _HEADER_LENGTH.size
+    if not blob.startswith(PAYLOAD_MAGIC) or len(blob) < start:
+        raise ValueError("Not a graph cache payload")
+    (header_length,) = _HEADER_LENGTH.unpack_from(blob, len(PAYLOAD_MAGIC))
+    header = json.loads(blob[start:start + header_length].decode("utf-8"))
+    if header.get("version") != PARSER_VERSION:
+        raise ValueError(f"Cached payload version {header.get('version')} does not match {PARSER_VERSION}")
+    triple_indexes = array("I")
+    if header["itemsize"] != triple_indexes.itemsize or header["byteorder"] != sys.byteorder:
+        raise ValueError("Cached payload was written on a platform with another integer layout")
+    triple_indexes.frombytes(blob[start + header_length:])
+    terms = [_decode_term(value) for value in header["terms"]]
+    if len(triple_indexes) % 3 or (triple_indexes and max(triple_indexes) >= len(terms)):
+        raise ValueError("Truncated or inconsistent graph cache payload")
+    return [tuple(ns) for ns in header["namespaces"]], terms, triple_indexes
+
+
+def add_encoded_graph(graph: rdflib.Graph, blob: bytes, fresh_bnodes: bool = True) -> int:
+    """
+    Adds the triples of an encoded payload to graph and re-applies its prefix bindings,
+    the same way a parser would. Returns the number of triples in the payload.
+
+    Like a parser, every call mints new blank nodes, so loading one source twice
+    into a graph gives two sets of blank nodes rather than merging them. Pass
+    fresh_bnodes=False to keep the encoded blank node ids, e.g. when a graph is
+    shipped to another process and must keep its identity.
+    """
+    namespaces, terms, idx = decode_graph(blob)
+    if fresh_bnodes:
+        terms = [BNode() if isinstance(term, BNode) else term for term in terms]
+    for prefix, ns in namespaces:
+        graph.bind(prefix, ns)
+    graph.addN(
+        (terms[idx[i]], terms[idx[i + 1]], terms[idx[i + 2]], graph)
+        for i in range(0, len(idx), 3)
+    )
+    return len(idx) // 3
+
+
+class GraphCache:
+    """
+    Content-addressed on-disk cache of parsed RDF sources.
+
+    Entries are keyed by the source's content hash (or size and mtime when
+    key_mode is "mtime"), the RDF format and PARSER_VERSION. The cache directory
+    is kept under max_bytes by evicting least recently used entries.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+        key_mode: str = "hash",
+    ):
+        if key_mode not in KEY_MODES:
+            raise ValueError(f"Unknown cache key_mode {key_mode!r}, expected one of {KEY_MODES}")
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.key_mode = key_mode
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _source_id(source: Path) -> str:
+        # Stable per-path prefix so every entry of a source can be found for invalidation.
+        return hashlib.sha1(str(Path(source).resolve()).encode("utf-8")).hexdigest()[:16]
+
+    def cache_key(self, source: Path, rdf_format: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{PARSER_VERSION}\0{rdf_format}\0".encode("utf-8"))
+        if self.key_mode == "mtime":
+            stat = Path(source).stat()
+            digest.update(f"{Path(source).resolve()}\0{stat.st_size}\0{stat.st_mtime_ns}".encode("utf-8"))
+        else:
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    def entry_path(self, source: Path, rdf_format: str) -> Path:
+        return self.cache_dir / f"{self._source_id(source)}-{self.cache_key(source, rdf_format)}{CACHE_FILE_SUFFIX}"
+
+    def _entries(self, source: Optional[Path] = None) -> List[Path]:
+        if not self.cache_dir.is_dir():
+            return []
+        pattern = f"{self._source_id(source)}-*{CACHE_FILE_SUFFIX}" if source else f"*{CACHE_FILE_SUFFIX}"
+        return list(self.cache_dir.glob(pattern))
+
+    def load(self, source: Path, rdf_format: str) -> Optional[bytes]:
+        """Returns the cached payload for source, or None on a miss."""
+        entry = self.entry_path(source, rdf_format)
+        try:
+            blob = entry.read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(entry)  # Mark as recently used for LRU eviction
+        except OSError:
+            pass
+        return blob
+
+    def store(self, source: Path, rdf_format: str, blob: bytes) -> None:
+        """Writes a payload for source, replacing stale entries of the same source."""
+        entry = self.entry_path(source, rdf_format)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for stale in self._entries(source):
+                if stale != entry:
+                    stale.unlink(missing_ok=True)
+            tmp_path = entry.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(blob)
+            os.replace(tmp_path, entry)
+        except OSError as e:
+            print(f"Warning: could not write graph cache entry {entry}: {e}")
+            return
+        self.evict()
+
+    def parse_into(self, graph: rdflib.Graph, source: Path, rdf_format: str = "turtle") -> int:
+        """
+        Adds the triples of source to graph, using the cached payload when available.
+        Parse errors propagate to the caller exactly as with graph.parse.
+        Returns the number of triples read from source.
+        """
+        blob = self.load(source, rdf_format)
+        if blob is not None:
+            try:
+                added = add_encoded_graph(graph, blob)
+                count("graph_cache.hits")
+                return added
+            except Exception as e:
+                print(f"Warning: discarding unreadable graph cache entry for {source}: {e}")
+                self.invalidate(source)
+        count("graph_cache.misses")
+        return add_encoded_graph(graph, self.build_payload(source, rdf_format))
+
+    def build_payload(self, source: Path, rdf_format: str = "turtle") -> bytes:
+        """Parses source into a payload and stores it in the cache."""
+        # Parse separately so the payload holds only this source's triples and bindings.
+        blob = parse_to_payload(source, rdf_format)
+        self.store(source, rdf_format, blob)
+        return blob
+
+    def get_payload(self, source: Path, rdf_format: str = "turtle") -> bytes:
+        """Returns the cached payload for source, parsing and storing it on a miss."""
+        blob = self.load(source, rdf_format)
+        return blob if blob is not None else self.build_payload(source, rdf_format)
+
+    def invalidate(self, source: Optional[Path] = None) -> int:
+        """Removes the entries for source, or every entry when source is None. Returns the count removed."""
+        removed = 0
+        for entry in self._entries(source):
+            try:
+                entry.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def size_bytes(self) -> int:
+        total = 0
+        for entry in self._entries():
+            try:
+                total += entry.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def evict(self) -> int:
+        """Deletes least recently used entries until the cache fits in max_bytes. Returns the count removed."""
+        entries: List[Tuple[float, int, Path]] = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache_dir": str(self.cache_dir),
+            "entries": len(self._entries()),
+            "size_bytes": self.size_bytes(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_default_cache: Optional[GraphCache] = None
+
+
+def get_graph_cache() -> Optional[GraphCache]:
+    """Returns the process-wide GraphCache, or None when caching is disabled."""
+    global _default_cache
+    if not CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        _default_cache = GraphCache()
+    return _default_cache
+
+
+def set_graph_cache(cache: Optional[GraphCache]) -> None:
+    """Replaces the process-wide GraphCache (e.g. to point it at another directory)."""
+    global _default_cache
+    _default_cache = cache
+
+
+def invalidate_graph_cache(source: Optional[Path] = None) -> int:
+    """Drops cached entries for source (or all entries). Returns the count removed."""
+    cache = get_graph_cache()
+    return cache.invalidate(source) if cache is not None else 0
+
+
+def parse_source(graph: rdflib.Graph, source: Path, rdf_format: str = "turtle", use_cache: bool = True) -> None:
+    """Parses source into graph, going through the process-wide cache unless use_cache is False."""
+    cache = get_graph_cache() if use_cache else None
+    if cache is None:
+        graph.parse(str(source), format=rdf_format)
+    else:
+        cache.parse_into(graph, source, rdf_format)
@@ -1,18 +1,30 @@
 import rdflib
 from rdflib.namespace import  Namespace 
-from rdflib.term import URIRef 
+from rdflib.term import URIRef, Node
+from rdflib.plugins.sparql.sparql import Query
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Set, Any, Union
 import pandas as pd
 
 from c4sb_demo.sparql_constants import (
     BRICK,      
-    REC_CORE,   
-    S223,       
-    RDF_TYPE,
     OWL_SAMEAS,
-    PREFIX_DICT
+    PREFIX_DICT,
+    LINKS_GRAPH,
+    INFERRED_GRAPH,
 )
+from c4sb_demo.graph_cache import parse_source
+from c4sb_demo.ingest import parse_sources_parallel, ingest_source
+from c4sb_demo.linking import EntityLinker, LinkReport
+from c4sb_demo.query_cache import prepare_cached, get_query_result_cache
+from c4sb_demo.graph_store import new_graph, new_dataset, graph_version
+from c4sb_demo.result_frames import bindings_to_dataframe
+from c4sb_demo.canonical import canonicalize_graph, get_canonical_map, canonical_bindings
+from c4sb_demo.views import materialize_room_views
+from c4sb_demo.dataset_stats import attach_statistics, get_graph_statistics
+from c4sb_demo.optimizer import optimized_query, explain_query
+from c4sb_demo.witness import lazy_witness_graph, DEFAULT_WITNESS_TRIPLE_BUDGET
+from c4sb_demo.tracing import span, count, debug, debug_enabled
 
 # Ensure that the imported RDF, RDFS, OWL are indeed Namespace objects for binding
 # If they are imported as something else (e.g. just a base URI string from another module),
@@ -23,16 +35,17 @@ from c4sb_demo.sparql_constants import (
 # OWL = Namespace("http://www.w3.org/2002/07/owl#")
 # These are correctly imported from rdflib.namespace, so they are Namespace objects.
 
-def load_graph(file_path: Path) -> Optional[rdflib.Graph]:
-    """Loads an RDF graph from a file."""
+def load_graph(file_path: Path, use_cache: bool = True) -> Optional[rdflib.Graph]:
+    """Loads an RDF graph from a file, reusing the on-disk parsed-graph cache unless use_cache is False."""
     if not file_path or not file_path.exists():
         # print(f\"DEBUG: File not found or None: {file_path}\")
         return None
-    g = rdflib.Graph()
+    g = new_graph()
     try:
         # print(f\"DEBUG: Parsing file: {file_path}\")
-        g.parse(str(file_path), format=rdflib.util.guess_format(str(file_path)) or "turtle")
+        parse_source(g, file_path, rdflib.util.guess_format(str(file_path)) or "turtle", use_cache=use_cache)
         # print(f\"DEBUG: Parsed {file_path}, graph now has {len(g)} triples.\")
+        attach_statistics(g)
         return g
     except Exception as e:
         print(f"Error loading graph from {file_path}: {e}")
@@ -87,6 +100,21 @@ def _safe_bind_prefix(graph: rdflib.Graph, prefix: str, namespace_val: Union[Nam
         graph.bind(prefix, namespace_to_bind, override=True)
 
 
+def _bind_prefix_dict(graph: rdflib.Graph) -> None:
+    """Binds every prefix of PREFIX_DICT (the definitive set of prefixes and their Namespace objects) to graph."""
+    if PREFIX_DICT:
+        for prefix_key, namespace_obj_from_dict in PREFIX_DICT.items():
+            # Values in PREFIX_DICT should be rdflib.Namespace objects or compatible for binding
+            # Ensure the type passed to _safe_bind_prefix is one it expects, converting if necessary.
+            if isinstance(namespace_obj_from_dict, (Namespace, URIRef, str)):
+                ns_to_bind = namespace_obj_from_dict
+            else:
+                # For types like rdflib.namespace.RDF (DefinedNamespaceMeta),
+                # convert to a Namespace object using its string URI.
+                ns_to_bind = Namespace(str(namespace_obj_from_dict))
+            _safe_bind_prefix(graph, prefix_key, ns_to_bind)
+
+
 # SPARQL Query Definitions (cleaned and generalized)
 # These are now expected to be defined in sparql_constants.py as dictionaries
 # and passed to execute_sparql_query.
@@ -97,21 +125,62 @@ def _safe_bind_prefix(graph: rdflib.Graph, prefix: str, namespace_val: Union[Nam
 # }
 # The old QUERY_1_BODY, QUERY_2_BODY etc. string constants are removed from this file.
 
-def execute_sparql_query(graph: rdflib.Graph, query_definition: Dict[str, str]) -> tuple[Optional[pd.DataFrame], Optional[rdflib.Graph]]:
+def execute_sparql_query(
+    graph: rdflib.Graph,
+    query_definition: Dict[str, str],
+    init_bindings: Optional[Dict[str, Any]] = None,
+    use_result_cache: bool = False,
+    witness_budget: Optional[int] = None,
+    optimize: bool = True
+) -> tuple[Optional[pd.DataFrame], Optional[rdflib.Graph]]:
+    """
+    Runs query_definition["body"] against graph and returns (DataFrame, path graph).
+
+    For SELECT and ASK queries the path graph holds the data triples that the
+    WHERE clause actually matched (see witness.build_witness_graph). It is filled
+    lazily on first read and capped at witness_budget triples (default: the
+    definition's "witness_triple_budget", else DEFAULT_WITNESS_TRIPLE_BUDGET).
+
+    With optimize=True the triple patterns of each BGP are reordered
+    most-selective-first using the graph's statistics and evaluated in that
+    order (see optimizer.py); explain_sparql_query shows the resulting plan.
+
+    With use_result_cache=True, results are looked up in the process-wide
+    QueryResultCache under (query, init_bindings, graph version) and come back
+    without re-evaluation until the graph is mutated. Only graphs backed by a
+    versioned store (see graph_store.new_graph) are cached; cached results are
+    shared and must not be mutated.
+    """
     if graph is None:
-        print("DEBUG: execute_sparql_query called with None graph.")
+        debug("execute_sparql_query called with None graph.")
         return None, None
     
     query_body = query_definition.get("body")
     if not query_body:
-        print("DEBUG: Query definition does not contain a 'body'.")
+        debug("Query definition does not contain a 'body'.")
         return None, None
 
-    print(f"DEBUG: Input graph to execute_sparql_query has {len(graph)} triples.")
-    # print(f"DEBUG: Query body:\\n{query_body}") # Uncomment to see full query
+    if witness_budget is None:
+        witness_budget = int(query_definition.get("witness_triple_budget", DEFAULT_WITNESS_TRIPLE_BUDGET))
+
+    version = graph_version(graph) if use_result_cache else None
+    if version is None:
+        return _evaluate_sparql_query(graph, query_definition, query_body, init_bindings, witness_budget, optimize)
 
-    path_graph = rdflib.Graph()
+    result_cache = get_query_result_cache()
+    cache_key = result_cache.make_key(query_body, init_bindings, version, (witness_budget, optimize))
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        count("query.result_cache_hits")
+        debug("Returning cached query result.")
+        return cached
+    df, path_graph = _evaluate_sparql_query(graph, query_definition, query_body, init_bindings, witness_budget, optimize)
+    if df is not None:
+        result_cache.put(cache_key, df, path_graph)
+    return df, path_graph
 
+
+def _bind_path_graph_prefixes(path_graph: rdflib.Graph, graph: rdflib.Graph) -> None:
     # Bind all essential prefixes first
     if PREFIX_DICT:
         for prefix_key, namespace_obj_from_dict in PREFIX_DICT.items():
@@ -120,78 +189,124 @@ def execute_sparql_query(graph: rdflib.Graph, query_definition: Dict[str, str])
     # Also bind from main graph namespaces
     for p, ns_uriref_from_main_graph in graph.namespaces(): 
         _safe_bind_prefix(path_graph, p, ns_uriref_from_main_graph)
-    
-    # Debug: check what prefixes are bound in path_graph
-    # print(f"DEBUG: Path graph prefixes: {[p for p, _ in path_graph.namespaces()]}")
+
+
+def _prepare_for_graph(
+    graph: rdflib.Graph,
+    query_body: str,
+    init_bindings: Optional[Dict[str, Any]],
+    optimize: bool
+) -> tuple[Query, Optional[Dict[str, Any]], rdflib.Graph]:
+    """
+    Prepared form of query_body as it should run on graph, with matching
+    init_bindings and the graph to run it on.
+    """
+    with span("query.parse"):
+        prepared = prepare_cached(query_body, PREFIX_DICT)
+    query_graph = graph
+    plan_key = query_body
+    canonical_map = get_canonical_map(graph)
+    if canonical_map is not None:
+        rewritten = canonical_map.rewrite_query(query_body, prepared, graph)
+        if rewritten is not None and not any(canonical_map.is_merged(v) for v in (init_bindings or {}).values()):
+            # Smushed graph: drop the owl:sameAs hops and use canonical IRIs
+            prepared = rewritten
+            init_bindings = canonical_bindings(init_bindings, canonical_map)
+        else:
+            # The rewrite would change the results; run the query on the graph as it was
+            query_graph = canonical_map.original_view(graph)
+            plan_key = f"# unsmushed\n{query_body}"
+    if optimize:
+        # Most selective triple patterns first, from the graph's cardinality statistics
+        with span("query.optimize"):
+            prepared = optimized_query(plan_key, prepared, get_graph_statistics(graph))
+    return prepared, init_bindings, query_graph
+
+
+def explain_sparql_query(
+    graph: rdflib.Graph,
+    query_definition: Dict[str, str],
+    init_bindings: Optional[Dict[str, Any]] = None,
+    optimize: bool = True,
+    analyze: bool = True
+) -> Optional[pd.DataFrame]:
+    """
+    EXPLAIN for query_definition on graph: the triple patterns in the order
+    execute_sparql_query would evaluate them, with estimated and (if analyze)
+    actual cardinalities. See optimizer.explain_query.
+    """
+    query_body = query_definition.get("body")
+    if graph is None or not query_body:
+        return None
+    prepared, init_bindings, query_graph = _prepare_for_graph(graph, query_body, init_bindings, optimize)
+    return explain_query(query_graph, prepared, get_graph_statistics(graph), init_bindings, analyze)
+
+
+def _evaluate_sparql_query(
+    graph: rdflib.Graph,
+    query_definition: Dict[str, str],
+    query_body: str,
+    init_bindings: Optional[Dict[str, Any]] = None,
+    witness_budget: int = DEFAULT_WITNESS_TRIPLE_BUDGET,
+    optimize: bool = True
+) -> tuple[Optional[pd.DataFrame], Optional[rdflib.Graph]]:
+    if debug_enabled():
+        debug(f"Input graph to execute_sparql_query has {len(graph)} triples.")
 
     try:
-        results: rdflib.query.Result = graph.query(query_body, initNs=PREFIX_DICT)
-        print(f"DEBUG: Query results type: {results.type}")
+        # The prepared (parsed + translated) query is shared process-wide, see query_cache.
+        prepared, init_bindings, query_graph = _prepare_for_graph(graph, query_body, init_bindings, optimize)
+        with span("query.eval"):
+            results: rdflib.query.Result = query_graph.query(prepared, initBindings=init_bindings)
+            if results.type == 'SELECT':
+                results.bindings  # Evaluation is lazy; materialize the solutions inside the span
+        debug(f"Query results type: {results.type}")
         df: Optional[pd.DataFrame] = None
 
         if results.type == 'ASK':
             df = pd.DataFrame([{'ASK_RESULT': results.askAnswer}])
-            print(f"DEBUG ASK result: {results.askAnswer}")
+            debug(f"ASK result: {results.askAnswer}")
             
-            # New logic: Use pre-defined path_graph_ttl
-            ttl_data = query_definition.get("path_graph_ttl")
-            if ttl_data:
-                try:
-                    path_graph.parse(data=ttl_data, format="turtle")
-                    print(f"DEBUG ASK: Parsed TTL into path_graph, which now has {len(path_graph)} triples.")
-                except Exception as e_parse:
-                    print(f"Error parsing path_graph_ttl for ASK query: {e_parse}")
-            else:
-                print("DEBUG ASK: No 'path_graph_ttl' found in query_definition.")
+            # Path graph: the data triples matched by the WHERE clause, built on first read
+            path_graph = lazy_witness_graph(query_graph, prepared, init_bindings, witness_budget)
 
         elif results.type == 'SELECT':
-            data: List[Dict[str, Any]] = []
             select_vars = results.vars if results.vars is not None else []
             if results.bindings: 
-                for binding_idx, binding in enumerate(results.bindings):
-                    current_row_dict: Dict[str, Any] = {}
-                    for var_name in select_vars: 
-                        value = binding.get(var_name)
-                        current_row_dict[str(var_name)] = value if value is not None else ""
-                    data.append(current_row_dict)
-                df = pd.DataFrame(data)
-                print(f"DEBUG SELECT: DataFrame created with {len(df)} rows.")
+                # Typed, column-by-column conversion; unbound variables become <NA>
+                with span("query.dataframe"):
+                    df = bindings_to_dataframe(select_vars, results.bindings)
+                count("query.rows", len(df))
+                debug(f"SELECT: DataFrame created with {len(df)} rows.")
             else: 
                 columns_list = [str(var) for var in select_vars]
                 if columns_list:
                     df = pd.DataFrame(columns=pd.Index(columns_list))
                 else:
                     df = pd.DataFrame()
-                print("DEBUG SELECT: No bindings, empty DataFrame with defined columns created.")
-
-            # New logic: Use pre-defined path_graph_ttl
-            ttl_data = query_definition.get("path_graph_ttl")
-            if ttl_data:
-                try:
-                    path_graph.parse(data=ttl_data, format="turtle")
-                    print(f"DEBUG SELECT: Parsed TTL into path_graph, which now has {len(path_graph)} triples.")
-                except Exception as e_parse:
-                    print(f"Error parsing path_graph_ttl for SELECT query: {e_parse}")
-            else:
-                print("DEBUG SELECT: No 'path_graph_ttl' found in query_definition.")
+                debug("SELECT: No bindings, empty DataFrame with defined columns created.")
 
+            # Path graph: the data triples matched by the WHERE clause, built on first read
+            path_graph = lazy_witness_graph(query_graph, prepared, init_bindings, witness_budget)
 
         elif results.type == 'CONSTRUCT':
+            path_graph = rdflib.Graph()
             if results.graph is not None:
                 path_graph += results.graph 
-                print(f"DEBUG CONSTRUCT: Added {len(results.graph)} triples to path_graph from query result.")
+                debug(f"CONSTRUCT: Added {len(results.graph)} triples to path_graph from query result.")
                 construct_df_data: List[Dict[str, Any]] = [] 
                 for s, p, o in results.graph:
                     construct_df_data.append({'subject': str(s), 'predicate': str(p), 'object': str(o)})
                 df = pd.DataFrame(construct_df_data)
             else: 
                 df = pd.DataFrame()
-                print("DEBUG CONSTRUCT: results.graph is None.")
+                debug("CONSTRUCT: results.graph is None.")
         
         elif results.type == 'DESCRIBE': 
+            path_graph = rdflib.Graph()
             if results.graph is not None:
                 path_graph += results.graph 
-                print(f"DEBUG DESCRIBE: Added {len(results.graph)} triples to path_graph from query result.")
+                debug(f"DESCRIBE: Added {len(results.graph)} triples to path_graph from query result.")
                 describe_df_data: List[Dict[str, Any]] = [] 
                 for s, p, o in results.graph:
                     describe_df_data.append({'subject': str(s), 'predicate': str(p), 'object': str(o)})
@@ -205,13 +320,14 @@ def execute_sparql_query(graph: rdflib.Graph, query_definition: Dict[str, str])
                  df = pd.DataFrame([{'described_uri': str(v)} for v in results.vars])
             else: 
                 df = pd.DataFrame()
-                print("DEBUG DESCRIBE: results.graph is None and no vars.")
+                debug("DESCRIBE: results.graph is None and no vars.")
         
         else:
             print(f"Unhandled query result type: {results.type}") 
             return None, None 
 
-        print(f"DEBUG: Returning DataFrame with {len(df) if df is not None else 'None'} rows and path_graph with {len(path_graph)} triples.")
+        _bind_path_graph_prefixes(path_graph, graph)
+        debug(f"Returning DataFrame with {len(df) if df is not None else 'None'} rows and path_graph.")
         return df, path_graph
 
     except Exception as e:
@@ -224,24 +340,37 @@ def create_combined_linked_graph(
     brick_file: Path, 
     rec_file: Path, 
     ashrae_file: Path,
-    additional_ttl_files: Optional[List[Path]] = None
+    additional_ttl_files: Optional[List[Path]] = None,
+    use_cache: bool = True,
+    parallel: bool = False,
+    max_workers: Optional[int] = None,
+    linker: Optional[EntityLinker] = None,
+    canonicalize: bool = False,
+    materialize_views: bool = False
 ) -> Optional[rdflib.Graph]:
-    g = rdflib.Graph()
-    print("DEBUG: Initializing combined graph.") # Re-enabled
+    """
+    Loads the Brick, REC and ASHRAE 223 sources (plus any additional TTL files) into one graph
+    and adds the owl:sameAs links between them.
+
+    With parallel=True each source file is parsed in its own worker process (up to
+    max_workers) and the results are merged in input order.
+    Linking is done by linker (a default EntityLinker when None); its match
+    statistics are kept on linker.last_report.
+    With canonicalize=True each owl:sameAs class is then merged into a single
+    node (see canonical.canonicalize_graph) and queries run through
+    execute_sparql_query skip the sameAs joins wherever that keeps their
+    results (see canonical.rewrite_is_exact). This is not a speedup in general:
+    of the shipped queries only QUERY_4 qualifies, and the others run on the
+    slower unsmushed view of the graph.
+    With materialize_views=True per-room desk counts and areas are precomputed
+    and kept current as view:* triples in the graph, see views.get_room_view.
+    They are off by default so the graph only holds the sources' triples.
+    """
+    g = new_graph()
+    debug("Initializing combined graph.")
 
     # Bind all known prefixes to the graph using PREFIX_DICT from sparql_constants
-    # This assumes PREFIX_DICT contains the definitive set of prefixes and their Namespace objects
-    if PREFIX_DICT:
-        for prefix_key, namespace_obj_from_dict in PREFIX_DICT.items():
-            # Values in PREFIX_DICT should be rdflib.Namespace objects or compatible for binding
-            # Ensure the type passed to _safe_bind_prefix is one it expects, converting if necessary.
-            if isinstance(namespace_obj_from_dict, (Namespace, URIRef, str)):
-                ns_to_bind = namespace_obj_from_dict
-            else:
-                # For types like rdflib.namespace.RDF (DefinedNamespaceMeta),
-                # convert to a Namespace object using its string URI.
-                ns_to_bind = Namespace(str(namespace_obj_from_dict))
-            _safe_bind_prefix(g, prefix_key, ns_to_bind)
+    _bind_prefix_dict(g)
     
     # If there are any prefixes critical for tests that might not be in PREFIX_DICT
     # or need a very specific Namespace object not aliased in PREFIX_DICT,
@@ -260,91 +389,172 @@ def create_combined_linked_graph(
     if additional_ttl_files:
         files_to_load.extend(additional_ttl_files)
 
+    try:
+        if parallel:
+            existing_files = []
+            for ttl_file in files_to_load:
+                if ttl_file and ttl_file.exists():
+                    existing_files.append(ttl_file)
+                else:
+                    debug(f"File not found or None: {ttl_file}")
+            debug(f"Parsing {len(existing_files)} files in parallel.")
+            with span("parse.parallel"):
+                parse_sources_parallel(g, existing_files, "turtle", max_workers=max_workers, use_cache=use_cache)
+        else:
+            for ttl_file in files_to_load:
+                if ttl_file and ttl_file.exists():
+                    debug(f"Parsing file: {ttl_file}")
+                    with span("parse", ttl_file.name):
+                        ingest_source(g, ttl_file, "turtle", use_cache=use_cache)
+                    if debug_enabled():
+                        debug(f"Parsed {ttl_file}, graph now has {len(g)} triples.")
+                else:
+                    debug(f"File not found or None: {ttl_file}")
+    except Exception as e:
+        print(f"Error loading TTL files: {e}")
+        return None
+
+    if debug_enabled():
+        debug(f"All files parsed. Total triples before linking: {len(g)}")
+
+    # Class/predicate statistics: one scan after the bulk load, maintained incrementally from here on
+    with span("stats.collect"):
+        attach_statistics(g)
+
+    # Link equivalent Brick, REC and ASHRAE 223 entities (buildings, RTUs, zones/rooms) with owl:sameAs
+    link_report = (linker or EntityLinker()).link(g)
+    debug(link_report.summary())
+
+    # Add inverse hasPart relationships for isPartOf
+    debug("Adding inverse hasPart relationships...")
+    with span("link.inverse_has_part"):
+        isPartOf_triples = list(g.triples((None, BRICK.isPartOf, None)))
+        for part, _, whole in isPartOf_triples:
+            g.add((whole, BRICK.hasPart, part))
+
+    if canonicalize:
+        # Merge each owl:sameAs class into one node; queries are rewritten to match in execute_sparql_query
+        with span("canonicalize"):
+            canonicalize_graph(g)
+
+    if materialize_views:
+        # view:deskCount / view:area on every room, maintained as the graph changes
+        with span("views.materialize"):
+            materialize_room_views(g)
+
+    if debug_enabled():
+        debug(f"Graph after linking and inverse relationships. Total triples: {len(g)}")
+    return g
+
+
+def source_graph_id(source_file: Path) -> URIRef:
+    """The named graph a source file is loaded into by create_combined_linked_dataset."""
+    return URIRef(Path(source_file).resolve().as_uri())
+
+
+def _add_inverse_has_part(dataset: rdflib.Dataset, parts: Optional[Set[Node]] = None) -> None:
+    """
+    Adds the brick:hasPart inverse of every brick:isPartOf (of parts, or of all
+    nodes when None) to the inferred named graph, dropping stale ones for parts.
+    """
+    inferred = dataset.graph(INFERRED_GRAPH)
+    if parts is None:
+        inferred.addN((whole, BRICK.hasPart, part, inferred) for part, _, whole in dataset.triples((None, BRICK.isPartOf, None)))
+        return
+    for part in parts:
+        inferred.remove((None, BRICK.hasPart, part))
+        for whole in dataset.objects(part, BRICK.isPartOf):
+            inferred.add((whole, BRICK.hasPart, part))
+
+
+def create_combined_linked_dataset(
+    brick_file: Path,
+    rec_file: Path,
+    ashrae_file: Path,
+    additional_ttl_files: Optional[List[Path]] = None,
+    use_cache: bool = True,
+    linker: Optional[EntityLinker] = None,
+    materialize_views: bool = False
+) -> Optional[rdflib.Dataset]:
+    """
+    Named-graph variant of create_combined_linked_graph: each source file is loaded
+    into its own named graph (see source_graph_id), the owl:sameAs links go to
+    LINKS_GRAPH and the inverse hasPart triples to INFERRED_GRAPH. The default
+    graph is the union of all of them, so the dataset can be passed to
+    execute_sparql_query like a combined graph.
+    materialize_views works as in create_combined_linked_graph.
+    Use reload_source to pick up changes to one source file without a rebuild.
+    """
+    ds = new_dataset()
+    _bind_prefix_dict(ds)
+
+    files_to_load = [brick_file, rec_file, ashrae_file] + list(additional_ttl_files or [])
     try:
         for ttl_file in files_to_load:
             if ttl_file and ttl_file.exists():
-                print(f"DEBUG: Parsing file: {ttl_file}") # Re-enabled
-                g.parse(str(ttl_file), format="turtle")
-                print(f"DEBUG: Parsed {ttl_file}, graph now has {len(g)} triples.") # Re-enabled
+                with span("parse", ttl_file.name):
+                    ingest_source(ds.graph(source_graph_id(ttl_file)), ttl_file, "turtle", use_cache=use_cache)
+                if debug_enabled():
+                    debug(f"Parsed {ttl_file} into its named graph, dataset now has {len(ds)} triples.")
             else:
-                print(f"DEBUG: File not found or None: {ttl_file}") # Re-enabled
+                debug(f"File not found or None: {ttl_file}")
     except Exception as e:
         print(f"Error loading TTL files: {e}")
         return None
 
-    print(f"DEBUG: All files parsed. Total triples before linking: {len(g)}") # Re-enabled
-
-    # Link Buildings: Brick Building to REC Building
-    brick_buildings = list(g.subjects(predicate=RDF_TYPE, object=BRICK.Building))
-    rec_buildings = list(g.subjects(predicate=RDF_TYPE, object=REC_CORE.Building))
-    print(f"DEBUG: Found Brick Buildings: {brick_buildings}") # Added
-    print(f"DEBUG: Found REC Buildings: {rec_buildings}") # Added
-    if brick_buildings and rec_buildings:
-        # Assuming there's only one of each for simplicity in this demo data
-        # And that they correspond to each other.
-        # In a real scenario, you might need more sophisticated matching logic.
-        g.add((brick_buildings[0], OWL_SAMEAS, rec_buildings[0]))
-        print(f"DEBUG: Added owl:sameAs between {brick_buildings[0]} and {rec_buildings[0]}") # Added
-    else:
-        print("DEBUG: No Brick or REC buildings found to link, or one list is empty.") # Modified
-
-    # Link RTUs: Brick RTU to ASHRAE 223 RTU (AirHandlingUnit)
-    brick_rtus = list(g.subjects(predicate=RDF_TYPE, object=BRICK.RTU))
-    ashrae_rtus = list(g.subjects(predicate=RDF_TYPE, object=S223.AirHandlingUnit))
-    print(f"DEBUG: Found Brick RTUs: {brick_rtus}") # Added
-    print(f"DEBUG: Found ASHRAE AHUs: {ashrae_rtus}") # Added
-
-    if brick_rtus and ashrae_rtus:
-        # Assuming there's only one of each for simplicity in this demo data
-        g.add((brick_rtus[0], OWL_SAMEAS, ashrae_rtus[0]))
-        print(f"DEBUG: Added owl:sameAs between {brick_rtus[0]} and {ashrae_rtus[0]}") # Added
-    else:
-        print("DEBUG: No Brick RTUs or ASHRAE AHUs found to link, or one list is empty.") # Modified
-
-    # Link HVAC Zones (Brick) to Rooms (REC)
-    brick_hvac_zones = list(g.subjects(predicate=RDF_TYPE, object=BRICK.HVAC_Zone))
-    rec_rooms = list(g.subjects(predicate=RDF_TYPE, object=REC_CORE.Room))
-    print(f"DEBUG: Found Brick HVAC Zones: {brick_hvac_zones}") # Added
-    print(f"DEBUG: Found REC Rooms: {rec_rooms}") # Added
-
-    if brick_hvac_zones and rec_rooms:
-        # Assuming one-to-one mapping for simplicity
-        g.add((brick_hvac_zones[0], OWL_SAMEAS, rec_rooms[0]))
-        print(f"DEBUG: Added owl:sameAs between {brick_hvac_zones[0]} and {rec_rooms[0]}") # Added
-    else:
-        print("DEBUG: No Brick HVAC Zones or REC Rooms found to link, or one list is empty.") # Modified
-    
-    # Link Mechanical Room (Brick) to Room (REC) - if applicable
-    brick_mech_rooms = list(g.subjects(predicate=RDF_TYPE, object=BRICK.Mechanical_Room))
-    print(f"DEBUG: Found Brick Mechanical Rooms: {brick_mech_rooms}") # Added
-    if brick_mech_rooms and rec_rooms:
-        target_rec_room_for_mech = rec_rooms[0]
-        mech_room_is_hvac_zone = bool(brick_hvac_zones and brick_mech_rooms[0] == brick_hvac_zones[0])
-
-        if mech_room_is_hvac_zone and len(rec_rooms) > 1:
-            target_rec_room_for_mech = rec_rooms[1]
-
-        if not (mech_room_is_hvac_zone and len(rec_rooms) <= 1):
-            if (brick_mech_rooms[0], OWL_SAMEAS, target_rec_room_for_mech) not in g:
-                g.add((brick_mech_rooms[0], OWL_SAMEAS, target_rec_room_for_mech))
-                print(f"DEBUG: Linked Brick Mechanical Room {brick_mech_rooms[0]} to REC Room {target_rec_room_for_mech}") # Re-enabled
-            else:
-                print(f"DEBUG: Link for Brick Mechanical Room {brick_mech_rooms[0]} to REC Room {target_rec_room_for_mech} already exists.") # Re-enabled
-        elif mech_room_is_hvac_zone and len(rec_rooms) <=1 : # Explicitly re-enable this print
-            print(f"DEBUG: Brick Mechanical Room {brick_mech_rooms[0]} is also the linked HVAC zone, and no other REC rooms to link.") # Re-enabled
-        
-    else: # Explicitly re-enable this print
-        print("DEBUG: No Brick Mechanical Rooms or REC Rooms found for specific linking.") # Re-enabled
+    # Class/predicate statistics: one scan after the bulk load, maintained incrementally from here on
+    with span("stats.collect"):
+        attach_statistics(ds)
 
-    # Add inverse hasPart relationships for isPartOf
-    print("DEBUG: Adding inverse hasPart relationships...")
-    isPartOf_triples = list(g.triples((None, BRICK.isPartOf, None)))
-    for part, _, whole in isPartOf_triples:
-        g.add((whole, BRICK.hasPart, part))
-        # print(f"DEBUG: Added hasPart: {whole} -> {part}")  # Commented out for cleaner output
+    link_report = (linker or EntityLinker()).link(ds, target=ds.graph(LINKS_GRAPH))
+    debug(link_report.summary())
+    with span("link.inverse_has_part"):
+        _add_inverse_has_part(ds)
 
-    print(f"DEBUG: Graph after linking and inverse relationships. Total triples: {len(g)}") # Re-enabled
-    return g
+    if materialize_views:
+        with span("views.materialize"):
+            materialize_room_views(ds)
+
+    if debug_enabled():
+        debug(f"Dataset after linking and inverse relationships. Total triples: {len(ds)}")
+    return ds
+
+
+def reload_source(
+    dataset: rdflib.Dataset,
+    source_file: Path,
+    use_cache: bool = True,
+    linker: Optional[EntityLinker] = None
+) -> LinkReport:
+    """
+    Re-ingests one source file of a dataset built by create_combined_linked_dataset.
+
+    Only the source's named graph is dropped and parsed again (an empty graph is
+    left behind when the file no longer exists). The owl:sameAs links and
+    inverse hasPart triples touching the subjects of its old or new contents
+    are removed and recomputed; all other links are kept as they are.
+    Returns the report of the incremental linking pass.
+    """
+    source_graph = dataset.graph(source_graph_id(source_file))
+    touched: Set[Node] = set(source_graph.subjects())
+    source_graph.remove((None, None, None))
+    if source_file.exists():
+        with span("parse", source_file.name):
+            ingest_source(source_graph, source_file, "turtle", use_cache=use_cache)
+    else:
+        debug(f"File not found: {source_file}, leaving its named graph empty.")
+    touched.update(source_graph.subjects())
+
+    links = dataset.graph(LINKS_GRAPH)
+    for node in touched:
+        links.remove((node, OWL_SAMEAS, None))
+        links.remove((None, OWL_SAMEAS, node))
+    link_report = (linker or EntityLinker()).link(dataset, target=links, incremental=True)
+    with span("link.inverse_has_part"):
+        _add_inverse_has_part(dataset, touched)
+    if debug_enabled():
+        debug(f"Reloaded {source_file} ({len(source_graph)} triples, {len(touched)} subjects touched); {link_report.summary()}")
+    return link_report
 
 # Example usage (optional, for testing or direct script execution)
 if __name__ == '__main__':
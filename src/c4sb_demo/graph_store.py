@@ -0,0 +1,107 @@
+import uuid
+import weakref
+from typing import Optional, List, Tuple, Protocol
+
+import rdflib
+from rdflib.plugins.stores.memory import Memory
+from rdflib.term import Node
+
+
+class GraphChangeListener(Protocol):
+    """Receives the triples that actually enter or leave a VersionedMemory store."""
+
+    def triple_added(self, triple: Tuple[Node, Node, Node]) -> None: ...
+
+    def triple_removed(self, triple: Tuple[Node, Node, Node]) -> None: ...
+
+
+class PendingSnapshot(Protocol):
+    """Something computed lazily from a VersionedMemory store that must see its current contents."""
+
+    def materialize(self) -> None: ...
+
+
+class VersionedMemory(Memory):
+    """
+    rdflib Memory store with a monotonic mutation counter and optional change listeners.
+
+    version is bumped on every add/remove call (including no-op ones), which makes
+    (token, version) a cheap fingerprint of the graph contents for caches.
+    Listeners are only told about triples that were really added or removed, and
+    cost nothing while none are registered. Pending snapshots (see
+    snapshot_before_change) are materialized just before the next mutation.
+    """
+
+    def __init__(self, configuration: Optional[str] = None, identifier=None):
+        super().__init__(configuration, identifier)
+        self.token: str = uuid.uuid4().hex
+        self.version: int = 0
+        self.listeners: List[GraphChangeListener] = []
+        self.pending_snapshots: "weakref.WeakSet[PendingSnapshot]" = weakref.WeakSet()
+
+    def _contains(self, triple: Tuple[Node, Node, Node]) -> bool:
+        for _ in self.triples(triple):
+            return True
+        return False
+
+    def _flush_snapshots(self) -> None:
+        snapshots = list(self.pending_snapshots)
+        self.pending_snapshots.clear()
+        for snapshot in snapshots:
+            snapshot.materialize()
+
+    def add(self, triple, context, quoted=False):
+        if self.pending_snapshots:
+            self._flush_snapshots()
+        notify = bool(self.listeners) and not quoted and not self._contains(triple)
+        super().add(triple, context, quoted=quoted)
+        self.version += 1
+        if notify:
+            for listener in self.listeners:
+                listener.triple_added(triple)
+
+    def remove(self, triple_pattern, context=None):
+        if self.pending_snapshots:
+            self._flush_snapshots()
+        candidates = [t for t, _ in self.triples(triple_pattern, context)] if self.listeners else []
+        super().remove(triple_pattern, context)
+        self.version += 1
+        for triple in candidates:
+            # Still present when it was only removed from one of several contexts.
+            if not self._contains(triple):
+                for listener in self.listeners:
+                    listener.triple_removed(triple)
+
+    def add_listener(self, listener: GraphChangeListener) -> None:
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener: GraphChangeListener) -> None:
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def snapshot_before_change(self, snapshot: PendingSnapshot) -> None:
+        """Has snapshot materialized before the store is next mutated. Held weakly."""
+        self.pending_snapshots.add(snapshot)
+
+
+def new_graph(**kwargs) -> rdflib.Graph:
+    """Creates an rdflib.Graph backed by a VersionedMemory store."""
+    return rdflib.Graph(store=VersionedMemory(), **kwargs)
+
+
+def new_dataset(**kwargs) -> rdflib.Dataset:
+    """
+    Creates an rdflib.Dataset backed by a VersionedMemory store whose default graph
+    is the union of its named graphs, so it can be queried like a combined graph.
+    """
+    kwargs.setdefault("default_union", True)
+    return rdflib.Dataset(store=VersionedMemory(), **kwargs)
+
+
+def graph_version(graph: rdflib.Graph) -> Optional[Tuple[str, int]]:
+    """Returns the (store token, version) fingerprint of graph, or None if its store is not versioned."""
+    store = graph.store
+    if isinstance(store, VersionedMemory):
+        return store.token, store.version
+    return None
@@ -0,0 +1,331 @@
+import time
+from collections import deque
+from typing import Optional, List, Dict, Set, Tuple, Iterable
+
+from rdflib import Graph, URIRef, BNode, Literal, Namespace
+from rdflib.collection import Collection
+from rdflib.paths import AlternativePath, InvPath, MulPath, NegatedPath, SequencePath, ZeroOrOne
+from rdflib.term import Node, Variable
+
+from c4sb_demo.query_cache import prepare_cached
+from c4sb_demo.sparql_constants import RDF_TYPE
+from c4sb_demo.validate_graphs import ShapesValidator
+from c4sb_demo.witness import triple_patterns
+
+SH: Namespace = Namespace("http://www.w3.org/ns/shacl#")
+
+# Constraint parameters whose values are shapes validated on the value nodes
+_NESTED_SHAPE_PREDICATES = (SH.node, SH.property, SH.qualifiedValueShape, SH["not"])
+_SHAPE_LIST_PREDICATES = (SH["and"], SH["or"], SH.xone)
+
+Triple = Tuple[Node, Node, Node]
+
+
+def _add(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    return None if a is None or b is None else a + b
+
+
+def _max(values: Iterable[Optional[int]]) -> Optional[int]:
+    result = 0
+    for value in values:
+        if value is None:
+            return None
+        result = max(result, value)
+    return result
+
+
+def path_length(shapes_graph: Graph, path: Node) -> Optional[int]:
+    """Number of hops a SHACL property path walks from the focus node; None when unbounded."""
+    if isinstance(path, URIRef):
+        return 1
+    if (path, SH.inversePath, None) in shapes_graph:
+        return path_length(shapes_graph, shapes_graph.value(path, SH.inversePath))
+    if (path, SH.alternativePath, None) in shapes_graph:
+        items = Collection(shapes_graph, shapes_graph.value(path, SH.alternativePath))
+        return _max(path_length(shapes_graph, item) for item in items)
+    if (path, SH.zeroOrOnePath, None) in shapes_graph:
+        return path_length(shapes_graph, shapes_graph.value(path, SH.zeroOrOnePath))
+    if (path, SH.zeroOrMorePath, None) in shapes_graph or (path, SH.oneOrMorePath, None) in shapes_graph:
+        return None
+    if isinstance(path, BNode) and (path, None, None) in shapes_graph:
+        # Sequence path (RDF list)
+        total: Optional[int] = 0
+        for item in Collection(shapes_graph, path):
+            total = _add(total, path_length(shapes_graph, item))
+        return total
+    return None
+
+
+def _predicate_length(predicate: Node) -> Optional[int]:
+    # Hops of a predicate or rdflib property path in a SPARQL triple pattern
+    if isinstance(predicate, SequencePath):
+        total: Optional[int] = 0
+        for arg in predicate.args:
+            total = _add(total, _predicate_length(arg))
+        return total
+    if isinstance(predicate, AlternativePath):
+        return _max(_predicate_length(arg) for arg in predicate.args)
+    if isinstance(predicate, InvPath):
+        return _predicate_length(predicate.arg)
+    if isinstance(predicate, MulPath):
+        return _predicate_length(predicate.path) if predicate.mod == ZeroOrOne else None
+    if isinstance(predicate, NegatedPath):
+        return 1
+    return 1
+
+
+def query_radius(query_text: str) -> Optional[int]:
+    """
+    Farthest number of hops from $this a SPARQL constraint's WHERE clause reaches;
+    None when it cannot be parsed or also matches triples not connected to $this.
+    """
+    try:
+        query = prepare_cached(query_text)
+    except Exception:
+        return None
+    adjacency: Dict[Node, List[Tuple[Node, Optional[int]]]] = {}
+    for s, p, o in triple_patterns(query.algebra):
+        hops = _predicate_length(p)
+        adjacency.setdefault(s, []).append((o, hops))
+        adjacency.setdefault(o, []).append((s, hops))
+    this = Variable("this")
+    if this not in adjacency:
+        return None if adjacency else 0
+    distance: Dict[Node, Optional[int]] = {this: 0}
+    queue = deque([this])
+    while queue:
+        node = queue.popleft()
+        for neighbor, hops in adjacency[node]:
+            if neighbor in distance:
+                continue
+            distance[neighbor] = _add(distance[node], hops)
+            if distance[neighbor] is None:
+                return None
+            if not isinstance(neighbor, (Literal,)):
+                queue.append(neighbor)
+    if len(distance) < len(adjacency):
+        return None
+    return _max(distance.values())
+
+
+def _sparql_prefixes(shapes_graph: Graph) -> str:
+    declarations = []
+    for declaration in shapes_graph.objects(None, SH.declare):
+        prefix, namespace = shapes_graph.value(declaration, SH.prefix), shapes_graph.value(declaration, SH.namespace)
+        if prefix is not None and namespace is not None:
+            declarations.append(f"PREFIX {prefix}: <{namespace}>")
+    return "\n".join(sorted(set(declarations)))
+
+
+def shape_radius(shapes_graph: Graph, shape: Node, _seen: Optional[Set[Node]] = None) -> Optional[int]:
+    """
+    Hops from a focus node within which a change can alter the shape's results:
+    its own path plus the deepest nested shape or SPARQL constraint. None when unbounded.
+    """
+    seen = _seen if _seen is not None else set()
+    if shape in seen:
+        return 0  # Recursive shapes: counted once
+    seen = seen | {shape}
+    path = shapes_graph.value(shape, SH.path)
+    own = path_length(shapes_graph, path) if path is not None else 0
+    nested: List[Optional[int]] = []
+    for predicate in _NESTED_SHAPE_PREDICATES:
+        for child in shapes_graph.objects(shape, predicate):
+            nested.append(shape_radius(shapes_graph, child, seen))
+    for predicate in _SHAPE_LIST_PREDICATES:
+        for shape_list in shapes_graph.objects(shape, predicate):
+            for child in Collection(shapes_graph, shape_list):
+                nested.append(shape_radius(shapes_graph, child, seen))
+    prefixes = None
+    for constraint in shapes_graph.objects(shape, SH.sparql):
+        select = shapes_graph.value(constraint, SH.select)
+        if select is None:
+            nested.append(None)
+            continue
+        if prefixes is None:
+            prefixes = _sparql_prefixes(shapes_graph)
+        # $PATH stands for the shape's path, already counted in own
+        text = str(select).replace("$PATH", "<urn:c4sb-demo:path>")
+        radius = query_radius(prefixes + "\n" + text)
+        nested.append(None if radius is None else max(radius - 1, 0) if path is not None else radius)
+    return _add(own, _max(nested))
+
+
+def dependency_radius(shapes_validator: ShapesValidator) -> Optional[int]:
+    """
+    The largest shape_radius over every shape of shapes_validator; None when any
+    shape's dependencies cannot be bounded statically: unbounded paths
+    (sh:zeroOrMorePath ...), SPARQL constraints that cannot be analyzed or that
+    look at nodes not connected to $this.
+    """
+    return _max(shape_radius(shapes_validator.shacl_graph, shape.node) for shape in shapes_validator.shapes)
+
+
+def neighborhood(graph: Graph, nodes: Iterable[Node], radius: int) -> Set[Node]:
+    """
+    nodes and the nodes within radius hops of them, in either direction but not
+    through rdf:type objects (i.e. classes) or literals.
+    """
+    frontier: Set[Node] = set(nodes)
+    found = set(frontier)
+    for _ in range(radius):
+        next_frontier: Set[Node] = set()
+        for node in frontier:
+            for p, o in graph.predicate_objects(node):
+                if p != RDF_TYPE and not isinstance(o, Literal) and o not in found:
+                    next_frontier.add(o)
+            for s in graph.subjects(None, node):
+                if s not in found:
+                    next_frontier.add(s)
+        found |= next_frontier
+        frontier = next_frontier
+        if not frontier:
+            break
+    return found
+
+
+def affected_nodes(graph: Graph, changed: Iterable[Triple], radius: int) -> Set[Node]:
+    """Nodes within radius hops (see neighborhood) of a subject or object of the changed triples."""
+    seeds: Set[Node] = set()
+    for s, p, o in changed:
+        seeds.add(s)
+        if not isinstance(o, Literal) and p != RDF_TYPE:
+            seeds.add(o)
+    return neighborhood(graph, seeds, radius)
+
+
+def _closure(graph: Graph, node: Node) -> Set[Triple]:
+    """The triples of node and of the blank nodes reachable from it."""
+    triples: Set[Triple] = set()
+    stack = [node]
+    seen = {node}
+    while stack:
+        current = stack.pop()
+        for s, p, o in graph.triples((current, None, None)):
+            triples.add((s, p, o))
+            if isinstance(o, BNode) and o not in seen:
+                seen.add(o)
+                stack.append(o)
+    return triples
+
+
+def report_text(results_graph: Graph) -> str:
+    """
+    A plain-text rendering of a validation report graph, for reports merged from
+    partial validations. It follows the layout of pyshacl's results_text, but
+    results are sorted by focus node and nodes are written as N3 terms, so the
+    text of a merged report is not byte-identical to pyshacl's.
+    """
+    report = results_graph.value(predicate=RDF_TYPE, object=SH.ValidationReport)
+    conforms = results_graph.value(report, SH.conforms)
+    results = sorted(results_graph.objects(report, SH.result), key=lambda r: (
+        str(results_graph.value(r, SH.focusNode)), str(results_graph.value(r, SH.sourceShape)),
+        str(results_graph.value(r, SH.resultMessage)),
+    ))
+    lines = ["Validation Report", f"Conforms: {conforms.toPython() if conforms is not None else None}"]
+    if results:
+        lines.append(f"Results ({len(results)}):")
+    for result in results:
+        component = results_graph.value(result, SH.sourceConstraintComponent)
+        kind = "Constraint Violation" if results_graph.value(result, SH.resultSeverity) == SH.Violation else "Validation Result"
+        lines.append(f"{kind} in {str(component).split('#')[-1]} ({component}):")
+        for label, predicate in (
+            ("Severity", SH.resultSeverity), ("Source Shape", SH.sourceShape), ("Focus Node", SH.focusNode),
+            ("Value Node", SH.value), ("Result Path", SH.resultPath), ("Message", SH.resultMessage),
+        ):
+            value = results_graph.value(result, predicate)
+            if value is not None:
+                lines.append(f"\t{label}: {value.n3(results_graph.namespace_manager)}")
+    return "\n".join(lines) + "\n"
+
+
+def report_conforms(results_graph: Graph, options: Dict[str, object]) -> bool:
+    """Whether a report graph conforms, given the allow_infos / allow_warnings validation options."""
+    report = results_graph.value(predicate=RDF_TYPE, object=SH.ValidationReport)
+    allowed = set()
+    if options.get("allow_infos"):
+        allowed.add(SH.Info)
+    if options.get("allow_warnings"):
+        allowed |= {SH.Info, SH.Warning}
+    return not any(
+        results_graph.value(result, SH.resultSeverity) not in allowed
+        for result in results_graph.objects(report, SH.result)
+    )
+
+
+class IncrementalValidator:
+    """
+    Keeps a data graph and its validation report current under small edits.
+
+    update() applies a triple delta to the data graph, works out from the shapes'
+    targets, property paths, nested shapes and SPARQL constraints which focus
+    nodes the delta can affect (see dependency_radius and affected_nodes),
+    revalidates only those and merges their results into the previous report.
+    Shapes with SHACL rules, whose inferences can reach anywhere, and shapes
+    whose dependencies are unbounded are always revalidated in full.
+
+    results_text is always the report_text rendering of results_graph, so its
+    format does not change between full and incremental validations.
+    """
+
+    def __init__(self, shapes_validator: ShapesValidator, data_graph: Graph):
+        self.shapes_validator = shapes_validator
+        self.data_graph = data_graph
+        self.radius = dependency_radius(shapes_validator)
+        self.has_rules = (None, SH.rule, None) in shapes_validator.shacl_graph
+        self.last_focus_nodes: Optional[Set[Node]] = None
+        self.last_seconds: float = 0.0
+        self.revalidate()
+
+    def revalidate(self) -> Tuple[bool, Graph, str]:
+        """Validates the whole data graph from scratch."""
+        started = time.perf_counter()
+        self.conforms, self.results_graph, _ = self.shapes_validator.validate(self.data_graph)
+        self.results_text = report_text(self.results_graph)
+        self.last_focus_nodes = None
+        self.last_seconds = time.perf_counter() - started
+        return self.conforms, self.results_graph, self.results_text
+
+    def update(self, added: Iterable[Triple] = (), removed: Iterable[Triple] = ()) -> Tuple[bool, Graph, str]:
+        """Applies the delta to the data graph and returns the updated (conforms, results_graph, results_text)."""
+        added, removed = list(added), list(removed)
+        for triple in removed:
+            self.data_graph.remove(triple)
+        for triple in added:
+            self.data_graph.add(triple)
+        if not added and not removed:
+            return self.conforms, self.results_graph, self.results_text
+        if self.has_rules or self.radius is None:
+            return self.revalidate()
+
+        started = time.perf_counter()
+        focus = affected_nodes(self.data_graph, added + removed, self.radius)
+        _, partial_graph, _ = self.shapes_validator.validate(self.data_graph, focus_nodes=focus)
+        self._merge(partial_graph, focus)
+        self.last_focus_nodes = focus
+        self.last_seconds = time.perf_counter() - started
+        return self.conforms, self.results_graph, self.results_text
+
+    def _merge(self, partial_graph: Graph, focus: Set[Node]) -> None:
+        merged = self.results_graph
+        report = merged.value(predicate=RDF_TYPE, object=SH.ValidationReport)
+        stale, kept = [], []
+        for result in merged.objects(report, SH.result):
+            (stale if merged.value(result, SH.focusNode) in focus else kept).append(result)
+        # Result paths can share blank nodes between results; keep what the others still use
+        still_used: Set[Triple] = set()
+        for result in kept:
+            still_used |= _closure(merged, result)
+        for result in stale:
+            merged.remove((report, SH.result, result))
+            for triple in _closure(merged, result) - still_used:
+                merged.remove(triple)
+        partial_report = partial_graph.value(predicate=RDF_TYPE, object=SH.ValidationReport)
+        for result in partial_graph.objects(partial_report, SH.result):
+            merged.add((report, SH.result, result))
+            for triple in _closure(partial_graph, result):
+                merged.add(triple)
+
+        self.conforms = report_conforms(merged, self.shapes_validator.options)
+        merged.set((report, SH.conforms, Literal(self.conforms)))
+        self.results_text = report_text(merged)
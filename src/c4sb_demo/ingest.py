@@ -0,0 +1,212 @@
+import codecs
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Tuple, Callable
+
+import rdflib
+from rdflib.exceptions import ParserError
+from rdflib.graph import ConjunctiveGraph
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from rdflib.plugins.parsers.nquads import NQuadsParser
+from rdflib.term import Node
+
+from c4sb_demo.graph_cache import (
+    get_graph_cache,
+    parse_to_payload,
+    add_encoded_graph,
+    parse_source,
+)
+from c4sb_demo.tracing import span, count, debug, debug_enabled
+
+# Line-oriented formats that can be ingested with bounded memory via stream_ntriples.
+STREAMABLE_FORMATS = {".nt": "nt", ".nq": "nquads"}
+DEFAULT_STREAM_BATCH_SIZE: int = 50_000
+
+# progress(triples_added, bytes_read, total_bytes)
+ProgressCallback = Callable[[int, int, int], None]
+
+
+def is_streamable(source: Path) -> bool:
+    return Path(source).suffix.lower() in STREAMABLE_FORMATS
+
+
+class _BatchSink:
+    """
+    Parser sink that buffers parsed statements and flushes them to a graph in
+    batches through graph.addN, the store's bulk-add path.
+    """
+
+    def __init__(self, graph: rdflib.Graph, batch_size: int):
+        self.graph = graph
+        self.batch_size = batch_size
+        self.batch: List[Tuple[Node, Node, Node, rdflib.Graph]] = []
+        self.added = 0
+        # Named graphs are only kept when the target can hold them.
+        self.context_aware = isinstance(graph, ConjunctiveGraph)
+
+    def triple(self, s: Node, p: Node, o: Node) -> None:
+        self.batch.append((s, p, o, self.graph))
+
+    def get_context(self, identifier: Node) -> "_ContextSink":
+        return _ContextSink(self, identifier)
+
+    @property
+    def default_context(self) -> "_ContextSink":
+        return _ContextSink(self, None)
+
+    def flush(self) -> None:
+        if self.batch:
+            self.graph.addN(self.batch)
+            self.added += len(self.batch)
+            self.batch = []
+
+
+class _ContextSink:
+    """Stand-in for the Dataset contexts NQuadsParser.parseline adds quads to."""
+
+    def __init__(self, sink: _BatchSink, identifier: Optional[Node]):
+        self.sink = sink
+        self.identifier = identifier
+
+    def add(self, triple: Tuple[Node, Node, Node]) -> None:
+        s, p, o = triple
+        if self.sink.context_aware and self.identifier is not None:
+            context = self.sink.graph.get_context(self.identifier)
+        elif self.sink.context_aware:
+            context = self.sink.graph.default_context
+        else:
+            context = self.sink.graph
+        self.sink.batch.append((s, p, o, context))
+
+
+def stream_ntriples(
+    graph: rdflib.Graph,
+    source: Path,
+    rdf_format: Optional[str] = None,
+    batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+    progress: Optional[ProgressCallback] = None
+) -> int:
+    """
+    Streams an N-Triples or N-Quads file into graph with bounded memory.
+
+    The file is read in small chunks and parsed line by line; parsed triples are
+    added in batches of batch_size through graph.addN, so peak memory is one batch
+    plus the blank node map rather than the whole document. Quads keep their named
+    graph when graph is a Dataset/ConjunctiveGraph and are merged into graph otherwise.
+    progress, if given, is called after every batch with
+    (triples_added, bytes_read, total_bytes).
+    Returns the number of triples added.
+    """
+    source = Path(source)
+    rdf_format = rdf_format or STREAMABLE_FORMATS.get(source.suffix.lower(), "nt")
+    if rdf_format not in ("nt", "ntriples", "nquads"):
+        raise ValueError(f"Cannot stream format {rdf_format!r}; convert it with convert_to_ntriples first.")
+
+    sink = _BatchSink(graph, batch_size)
+    parser = NQuadsParser() if rdf_format == "nquads" else W3CNTriplesParser()
+    parser.sink = sink  # type: ignore[assignment]
+    total_bytes = source.stat().st_size
+
+    with open(source, "rb") as raw:
+        parser.file = codecs.getreader("utf-8")(raw)
+        parser.buffer = ""
+        while True:
+            line = parser.readline()
+            if line is None:
+                break
+            parser.line = line
+            try:
+                parser.parseline()
+            except ParserError as e:
+                raise ParserError(f"Invalid line in {source} ({e}): {line!r}")
+            if len(sink.batch) >= batch_size:
+                sink.flush()
+                if progress:
+                    progress(sink.added, raw.tell(), total_bytes)
+        sink.flush()
+        if progress:
+            progress(sink.added, total_bytes, total_bytes)
+    return sink.added
+
+
+def convert_to_ntriples(source: Path, destination: Optional[Path] = None, rdf_format: str = "turtle") -> Path:
+    """
+    One-off conversion of an RDF source (Turtle by default) into N-Triples so later
+    loads can go through stream_ntriples. Writes next to source with a .nt suffix
+    unless destination is given. Returns the destination path.
+    """
+    source = Path(source)
+    destination = Path(destination) if destination else source.with_suffix(".nt")
+    g = rdflib.Graph()
+    g.parse(str(source), format=rdf_format)
+    g.serialize(destination=str(destination), format="nt", encoding="utf-8")
+    return destination
+
+
+def ingest_source(graph: rdflib.Graph, source: Path, rdf_format: str = "turtle", use_cache: bool = True) -> None:
+    """Adds source to graph, streaming line-oriented formats and parsing (with cache) everything else."""
+    if is_streamable(source):
+        stream_ntriples(graph, source)
+    else:
+        parse_source(graph, source, rdf_format, use_cache=use_cache)
+
+
+def _source_payload(source: Path, rdf_format: str, use_cache: bool) -> bytes:
+    """Worker entry point: parses one source (or reads it from the cache) into a compact payload."""
+    cache = get_graph_cache() if use_cache else None
+    if cache is None:
+        return parse_to_payload(source, rdf_format)
+    return cache.get_payload(source, rdf_format)
+
+
+def parse_sources_parallel(
+    graph: rdflib.Graph,
+    sources: List[Path],
+    rdf_format: str = "turtle",
+    max_workers: Optional[int] = None,
+    use_cache: bool = True
+) -> None:
+    """
+    Parses each source in its own worker process and merges the results into graph.
+
+    Workers ship back the compact payloads used by the graph cache; they are merged
+    in the order given in sources, with each source's prefix bindings re-applied,
+    so the result matches parsing the files one after another.
+    Parse errors are re-raised in the calling process.
+    Streamable N-Triples/N-Quads sources are streamed in the calling process
+    instead, since shipping them whole between processes would defeat their
+    bounded-memory load.
+    """
+    parsed_sources = [source for source in sources if not is_streamable(source)]
+    if len(parsed_sources) <= 1 or max_workers == 1:
+        for source in sources:
+            ingest_source(graph, source, rdf_format, use_cache=use_cache)
+        return
+
+    workers = min(max_workers or len(parsed_sources), len(parsed_sources))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        payloads = executor.map(
+            _source_payload,
+            parsed_sources,
+            [rdf_format] * len(parsed_sources),
+            [use_cache] * len(parsed_sources),
+        )
+        for source in sources:
+            if is_streamable(source):
+                stream_ntriples(graph, source)
+                continue
+            blob = next(payloads)
+            try:
+                with span("parse.merge", source.name):
+                    merged = add_encoded_graph(graph, blob)
+            except Exception as e:
+                # A corrupt cache entry read by a worker: drop it and parse locally.
+                print(f"Warning: could not merge payload for {source} ({e}); parsing it directly.")
+                cache = get_graph_cache() if use_cache else None
+                if cache is not None:
+                    cache.invalidate(source)
+                parse_source(graph, source, rdf_format, use_cache=use_cache)
+                continue
+            count("parse.triples", merged)
+            if debug_enabled():
+                debug(f"Merged {merged} triples from {source}, graph now has {len(graph)} triples.")
@@ -0,0 +1,355 @@
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Tuple, Set, Iterable
+
+import rdflib
+from rdflib.term import Literal, URIRef, Node
+
+from c4sb_demo.dataset_stats import get_graph_statistics
+from c4sb_demo.tracing import span, get_tracer
+from c4sb_demo.sparql_constants import (
+    BRICK,
+    REC_CORE,
+    S223,
+    RDF_TYPE,
+    OWL_SAMEAS,
+    RDFS_LABEL,
+    SKOS_PREF_LABEL,
+)
+
+# Predicates whose values are used as human-readable names when building match keys.
+NAME_PREDICATES: List[URIRef] = [RDFS_LABEL, SKOS_PREF_LABEL, S223.hasDescription]
+
+# Predicates carrying equipment tags ("rtu", "hvac", or Brick tag IRIs) for the "tag" key strategy.
+TAG_PREDICATES: List[URIRef] = [S223.hasTag, BRICK.hasTag]
+
+# Predicates walked (transitively) from an entity up to the building that contains it.
+# These form the structural "parent building" key used to block candidates.
+PARENT_PREDICATES: List[URIRef] = [
+    BRICK.isPartOf,
+    BRICK.hasLocation,
+    REC_CORE.isPartOf,
+    REC_CORE.isPartOfBuilding,
+    REC_CORE.isPartOfFloor,
+    REC_CORE.isPartOfSpace,
+]
+BUILDING_CLASSES: Set[URIRef] = {BRICK.Building, REC_CORE.Building}
+
+# Tokens that only say which standard a node comes from (e.g. "building_rec",
+# "Example Office Building (REC)") and are dropped before comparing names.
+STANDARD_TOKENS: Set[str] = {"brick", "rec", "s223", "223", "223p", "ashrae"}
+
+_PARENTHETICAL_RE = re.compile(r"\([^)]*\)")
+_TOKEN_RE = re.compile(r"[a-z]+|\d+")
+_CAMEL_RE = re.compile(r"(?<=[a-z])(?=[A-Z])")
+_NUMBER_RE = re.compile(r"\d+")
+
+# How a rule pairs candidates left over after keyed matching (LinkRule.fallback):
+# "unambiguous" links a block's leftovers only when exactly one remains on each
+# side; "first" links the first leftover pair of a block in which nothing matched
+# by key (the original demo linker's zones[0] <-> rooms[0]); "positional" pairs
+# every leftover in document order.
+FALLBACK_MODES = ("unambiguous", "first", "positional")
+
+
+def normalize_key(value: str) -> str:
+    """
+    Normalizes a label or local name into a match key: case-folded, parentheticals
+    and standard-name tokens removed, punctuation dropped and numbers without
+    leading zeros. "RTU-01", "rtu_1" and "Rtu 1 (Brick)" all become "rtu1".
+    """
+    value = _PARENTHETICAL_RE.sub(" ", _CAMEL_RE.sub(" ", value)).lower()
+    tokens = []
+    for token in _TOKEN_RE.findall(value):
+        if token in STANDARD_TOKENS:
+            continue
+        tokens.append(str(int(token)) if token.isdigit() else token)
+    return "".join(tokens)
+
+
+def local_name(node: Node) -> str:
+    return str(node).split("#")[-1].split("/")[-1]
+
+
+def last_number(value: str) -> Optional[str]:
+    """The last number in value without leading zeros: "RTU-01" and "Rooftop Unit 1" give "1"."""
+    numbers = _NUMBER_RE.findall(value)
+    return str(int(numbers[-1])) if numbers else None
+
+
+@dataclass
+class LinkRule:
+    """Links instances of left_class to instances of right_class with owl:sameAs."""
+    name: str
+    left_class: URIRef
+    right_class: URIRef
+    # Pairing of candidates left over once keyed matching is exhausted, one of
+    # FALLBACK_MODES; None links keyed matches only.
+    fallback: Optional[str] = None
+    # Skip right-hand nodes already linked by an earlier rule.
+    exclude_linked: bool = False
+
+    def __post_init__(self):
+        if self.fallback is not None and self.fallback not in FALLBACK_MODES:
+            raise ValueError(f"Unknown fallback {self.fallback!r} for link rule {self.name}, expected one of {FALLBACK_MODES}")
+
+
+DEFAULT_LINK_RULES: List[LinkRule] = [
+    LinkRule("building", BRICK.Building, REC_CORE.Building, fallback="unambiguous"),
+    LinkRule("rtu", BRICK.RTU, S223.AirHandlingUnit, fallback="unambiguous"),
+    # Zones and rooms rarely share names; the sample sources pair "HVAC Zone 1" with
+    # "Room 101" by convention only, which "first" keeps without touching blocks
+    # where any zone was matched by key.
+    LinkRule("hvac_zone", BRICK.HVAC_Zone, REC_CORE.Room, fallback="first"),
+    LinkRule("mechanical_room", BRICK.Mechanical_Room, REC_CORE.Room, fallback="unambiguous", exclude_linked=True),
+]
+
+
+@dataclass
+class RuleStats:
+    rule: str
+    left_candidates: int = 0
+    right_candidates: int = 0
+    matched_by: Dict[str, int] = field(default_factory=dict)
+    unmatched_left: int = 0
+    unmatched_right: int = 0
+    seconds: float = 0.0
+
+    @property
+    def matched(self) -> int:
+        return sum(self.matched_by.values())
+
+
+@dataclass
+class LinkReport:
+    links: List[Tuple[Node, Node, str]] = field(default_factory=list)
+    rules: List[RuleStats] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        lines = [f"Linked {len(self.links)} entity pairs in {self.seconds * 1000:.1f} ms"]
+        for stats in self.rules:
+            by = ", ".join(f"{k}={v}" for k, v in stats.matched_by.items()) or "none"
+            lines.append(
+                f"  {stats.rule}: {stats.left_candidates}x{stats.right_candidates} candidates, "
+                f"{stats.matched} matched ({by}), {stats.unmatched_left}/{stats.unmatched_right} unmatched, "
+                f"{stats.seconds * 1000:.1f} ms"
+            )
+        return "\n".join(lines)
+
+
+class EntityLinker:
+    """
+    Links equivalent entities across the Brick, REC and 223P parts of a combined graph.
+
+    For each LinkRule, candidates are blocked by their (already linked) parent
+    building and matched through hash indexes over normalized local names,
+    labels and equipment tags, so a rule costs time linear in its candidates
+    instead of comparing every pair. Subclass and override entity_keys to add
+    other identifiers.
+    """
+
+    def __init__(self, rules: Optional[List[LinkRule]] = None, key_strategies: Iterable[str] = ("id", "label", "tag")):
+        self.rules = list(rules) if rules is not None else list(DEFAULT_LINK_RULES)
+        self.key_strategies = list(key_strategies)
+        self.last_report: Optional[LinkReport] = None
+
+    def entity_keys(self, graph: rdflib.Graph, node: Node, strategy: str) -> Set[str]:
+        """Returns the match keys of node for one key strategy."""
+        if strategy == "id":
+            keys = {normalize_key(local_name(node))} if isinstance(node, URIRef) else set()
+        elif strategy == "label":
+            keys = {normalize_key(str(o)) for p in NAME_PREDICATES for o in graph.objects(node, p)}
+        elif strategy == "tag":
+            # Equipment tag: "<tag>:<number>", e.g. s223:hasTag "rtu" on "Rooftop Unit 1" and
+            # a brick:RTU (its class acting as the tag) labelled "RTU-01" both give "rtu:1"
+            tags = {
+                normalize_key(str(o) if isinstance(o, Literal) else local_name(o))
+                for p in TAG_PREDICATES for o in graph.objects(node, p)
+            }
+            tags.update(normalize_key(local_name(cls)) for cls in graph.objects(node, RDF_TYPE))
+            names = [local_name(node)] if isinstance(node, URIRef) else []
+            names.extend(str(o) for p in NAME_PREDICATES for o in graph.objects(node, p))
+            numbers = {n for n in map(last_number, names) if n is not None}
+            keys = {f"{tag}:{number}" for tag in tags if tag for number in numbers}
+        else:
+            raise ValueError(f"Unknown key strategy {strategy!r}")
+        keys.discard("")
+        return keys
+
+    def link(self, graph: rdflib.Graph, target: Optional[rdflib.Graph] = None, incremental: bool = False) -> LinkReport:
+        """
+        Adds owl:sameAs links for every rule and returns the match report.
+
+        Links are added to target (graph itself when None), e.g. a named graph of
+        a dataset. With incremental=True the owl:sameAs links already in target
+        are kept: their entities are not linked again and seed the building
+        blocks, so only entities left unlinked (say after dropping the links of
+        a reloaded source) are matched.
+        """
+        started = time.perf_counter()
+        report = LinkReport()
+        target = graph if target is None else target
+        # Union-find style canonical map so blocks see buildings linked by earlier rules.
+        canonical: Dict[Node, Node] = {}
+        building_cache: Dict[Node, Optional[Node]] = {}
+        linked_right: Set[Node] = set()
+        already_linked: Set[Node] = set()
+        if incremental:
+            for l, _, r in target.triples((None, OWL_SAMEAS, None)):
+                already_linked.update((l, r))
+                if l != r:
+                    canonical[r] = l
+
+        def canonical_of(node: Optional[Node]) -> Optional[Node]:
+            while node is not None and node in canonical:
+                node = canonical[node]
+            return node
+
+        def building_of(node: Node) -> Optional[Node]:
+            if node in building_cache:
+                return building_cache[node]
+            building_cache[node] = None  # Guards against cycles
+            seen = {node}
+            frontier = [node]
+            found = None
+            while frontier and found is None:
+                next_frontier = []
+                for current in frontier:
+                    if any((current, RDF_TYPE, cls) in graph for cls in BUILDING_CLASSES):
+                        found = current
+                        break
+                    for predicate in PARENT_PREDICATES:
+                        for parent in graph.objects(current, predicate):
+                            if parent not in seen:
+                                seen.add(parent)
+                                next_frontier.append(parent)
+                frontier = next_frontier
+            building_cache[node] = found
+            return found
+
+        # O(1) class counts when the graph carries a statistics index (see dataset_stats)
+        index_stats = get_graph_statistics(graph, collect=False)
+        # Rules are timed anyway for the report; the tracer gets the same figures
+        tracer = get_tracer()
+
+        for rule in self.rules:
+            rule_started = time.perf_counter()
+            stats = RuleStats(rule=rule.name)
+            if index_stats is not None and not (
+                index_stats.class_count(rule.left_class) and index_stats.class_count(rule.right_class)
+            ):
+                # Nothing to pair up; skip the candidate scans
+                stats.left_candidates = stats.unmatched_left = index_stats.class_count(rule.left_class)
+                stats.right_candidates = stats.unmatched_right = index_stats.class_count(rule.right_class)
+                stats.seconds = time.perf_counter() - rule_started
+                report.rules.append(stats)
+                continue
+            with span("link.candidates", rule.name):
+                all_left = list(dict.fromkeys(graph.subjects(RDF_TYPE, rule.left_class)))
+                left = [l for l in all_left if l not in already_linked]
+                right = [
+                    r for r in dict.fromkeys(graph.subjects(RDF_TYPE, rule.right_class))
+                    if not (rule.exclude_linked and r in linked_right) and r not in already_linked
+                ]
+            stats.left_candidates, stats.right_candidates = len(left), len(right)
+
+            def block_of(node: Node) -> Optional[Node]:
+                if rule.left_class in BUILDING_CLASSES:
+                    return None
+                return canonical_of(building_of(node))
+
+            with span("link.blocks", rule.name):
+                left_blocks = {n: block_of(n) for n in left}
+                right_blocks = {n: block_of(n) for n in right}
+                # Blocks already holding a link of this rule (incremental runs) count as matched
+                linked_blocks = {block_of(n) for n in all_left if n in already_linked}
+            matched_left: Set[Node] = set()
+            matched_right: Set[Node] = set()
+
+            with span("link.keyed", rule.name):
+                for strategy in self.key_strategies:
+                    # Hash index: (block, key) -> right candidates, plus a block-less index
+                    # for nodes whose building could not be resolved on one side.
+                    index: Dict[Tuple[Optional[Node], str], List[Node]] = defaultdict(list)
+                    for r in right:
+                        if r in matched_right:
+                            continue
+                        for key in self.entity_keys(graph, r, strategy):
+                            index[(right_blocks[r], key)].append(r)
+                            if right_blocks[r] is not None:
+                                index[(None, key)].append(r)
+                    for l in left:
+                        if l in matched_left:
+                            continue
+                        for key in self.entity_keys(graph, l, strategy):
+                            block = left_blocks[l]
+                            hits = index.get((block, key)) or (index.get((None, key)) if block is not None else None)
+                            hits = [r for r in hits or [] if r not in matched_right]
+                            if len(hits) == 1:  # Ambiguous keys are left for later strategies
+                                self._add_link(target, report, stats, canonical, l, hits[0], strategy)
+                                matched_left.add(l)
+                                matched_right.add(hits[0])
+                                break
+
+            if rule.fallback is not None:
+                with span("link.fallback", rule.name):
+                    self._link_leftovers(
+                        rule, left, right, left_blocks, right_blocks, matched_left, matched_right, linked_blocks,
+                        lambda l, r: self._add_link(target, report, stats, canonical, l, r, rule.fallback),
+                    )
+
+            linked_right.update(matched_right)
+            stats.unmatched_left = len(left) - len(matched_left)
+            stats.unmatched_right = len(right) - len(matched_right)
+            stats.seconds = time.perf_counter() - rule_started
+            report.rules.append(stats)
+            if tracer.enabled():
+                tracer.record(f"link.rule[{rule.name}]", stats.seconds)
+                tracer.count("link.pairs", stats.matched)
+
+        report.seconds = time.perf_counter() - started
+        if tracer.enabled():
+            tracer.record("link", report.seconds)
+        self.last_report = report
+        return report
+
+    @staticmethod
+    def _link_leftovers(rule: LinkRule, left: List[Node], right: List[Node],
+                        left_blocks: Dict[Node, Optional[Node]], right_blocks: Dict[Node, Optional[Node]],
+                        matched_left: Set[Node], matched_right: Set[Node], linked_blocks: Set[Optional[Node]],
+                        add_link) -> None:
+        """Pairs the candidates keyed matching left over, per building block, as rule.fallback says."""
+        keyed_blocks = linked_blocks | {left_blocks[l] for l in matched_left}
+        left_by_block: Dict[Optional[Node], List[Node]] = defaultdict(list)
+        right_by_block: Dict[Optional[Node], List[Node]] = defaultdict(list)
+        for l in left:
+            if l not in matched_left:
+                left_by_block[left_blocks[l]].append(l)
+        for r in right:
+            if r not in matched_right:
+                right_by_block[right_blocks[r]].append(r)
+        for block, block_left in left_by_block.items():
+            block_right = right_by_block.get(block) or (right_by_block.get(None) if block is not None else None)
+            block_right = [r for r in block_right or [] if r not in matched_right]
+            if rule.fallback == "unambiguous":
+                pairs = list(zip(block_left, block_right)) if len(block_left) == len(block_right) == 1 else []
+            elif rule.fallback == "first":
+                pairs = [(block_left[0], block_right[0])] if block_right and block not in keyed_blocks else []
+            else:
+                pairs = list(zip(block_left, block_right))
+            for l, r in pairs:
+                add_link(l, r)
+                matched_left.add(l)
+                matched_right.add(r)
+
+    @staticmethod
+    def _add_link(graph: rdflib.Graph, report: LinkReport, stats: RuleStats,
+                  canonical: Dict[Node, Node], left: Node, right: Node, strategy: str) -> None:
+        graph.add((left, OWL_SAMEAS, right))
+        report.links.append((left, right, strategy))
+        stats.matched_by[strategy] = stats.matched_by.get(strategy, 0) + 1
+        if left != right:
+            canonical[right] = left
@@ -0,0 +1,186 @@
+from typing import Optional, List, Dict, Set, Tuple, Any, Mapping
+
+import pandas as pd
+import rdflib
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql.evaluate import evalBGP, evalPart
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.sparql import Query, QueryContext
+from rdflib.term import Variable, BNode, Node
+
+from c4sb_demo.dataset_stats import GraphStatistics, get_graph_statistics
+from c4sb_demo.witness import copy_algebra, where_pattern, iter_solutions
+
+TriplePattern = Tuple[Node, Node, Node]
+
+# Set on the BGPs ordered by optimize_query; see _eval_ordered_bgp
+ORDERED_BGP_KEY = "_c4sb_ordered"
+
+
+def pattern_vars(pattern: TriplePattern) -> Set[Node]:
+    # Blank nodes in a query pattern behave like (non-projectable) variables
+    return {term for term in pattern if isinstance(term, (Variable, BNode))}
+
+
+def reorder_bgp(
+    patterns: List[TriplePattern],
+    stats: GraphStatistics,
+    bound: Set[Node] = frozenset()
+) -> List[TriplePattern]:
+    """
+    Greedily orders triple patterns most-selective-first: at each step the pattern
+    with the smallest estimated fan-out given the variables bound so far is
+    picked, preferring patterns that share a variable with them so no cartesian
+    products are introduced while a connected pattern is left.
+    """
+    remaining = list(patterns)
+    ordered: List[TriplePattern] = []
+    bound = set(bound)
+    while remaining:
+        connected = [t for t in remaining if pattern_vars(t) & bound or not pattern_vars(t)]
+        candidates = connected if bound and connected else remaining
+        best = min(candidates, key=lambda t: (stats.estimate(t, bound), remaining.index(t)))
+        remaining.remove(best)
+        ordered.append(best)
+        bound |= pattern_vars(best)
+    return ordered
+
+
+def _raw_items(node: CompValue):
+    # CompValue.__getitem__ evaluates expressions; read the raw values instead
+    return dict.items(node)
+
+
+def _optimize_part(node: Any, stats: GraphStatistics, bound: Set[Node]) -> Set[Node]:
+    """Reorders every BGP under node in place; returns the variables node binds."""
+    if not isinstance(node, CompValue):
+        return bound
+    if node.name == "BGP":
+        node["triples"] = reorder_bgp(list(node.triples), stats, bound)
+        node[ORDERED_BGP_KEY] = True
+        bound = set(bound)
+        for pattern in node.triples:
+            bound |= pattern_vars(pattern)
+        return bound
+    if node.name in ("Join", "LeftJoin"):
+        # rdflib evaluates p2 once per p1 solution with p1's bindings pushed in,
+        # except for non-lazy joins, which evaluate both sides independently
+        left = _optimize_part(node.get("p1"), stats, bound)
+        pushed = left if node.name == "LeftJoin" or dict.get(node, "lazy") else bound
+        right = _optimize_part(node.get("p2"), stats, pushed)
+        return left | right if node.name == "Join" else left
+    if node.name in ("Union", "Minus"):
+        left = _optimize_part(node.get("p1"), stats, bound)
+        _optimize_part(node.get("p2"), stats, bound)
+        return left
+    result = bound
+    for key, child in _raw_items(node):
+        if key == "_vars":
+            continue
+        for part in (child if isinstance(child, list) else [child]):
+            if isinstance(part, CompValue):
+                result = result | _optimize_part(part, stats, bound)
+    return result
+
+
+def _eval_ordered_bgp(ctx: QueryContext, part: CompValue):
+    """
+    rdflib CUSTOM_EVALS hook. rdflib's evalPart re-sorts every BGP by the number
+    of unbound terms per pattern before evaluating it, which would undo
+    reorder_bgp; BGPs marked by optimize_query are evaluated in their own order.
+    """
+    if part.name != "BGP" or not dict.get(part, ORDERED_BGP_KEY):
+        raise NotImplementedError()
+    return evalBGP(ctx, part.triples)
+
+
+CUSTOM_EVALS["c4sb_demo_ordered_bgp"] = _eval_ordered_bgp
+
+
+def optimize_query(prepared: Query, stats: GraphStatistics) -> Query:
+    """
+    Returns a copy of prepared whose basic graph patterns are ordered by
+    reorder_bgp and evaluated in that order.
+    """
+    optimized = Query(prepared.prologue, copy_algebra(prepared.algebra))
+    _optimize_part(optimized.algebra, stats, set())
+    optimized._original_args = getattr(prepared, "_original_args", None)
+    return optimized
+
+
+def optimized_query(query_text: str, prepared: Query, stats: GraphStatistics) -> Query:
+    """optimize_query(prepared, stats), cached per query text in stats."""
+    return stats.plan(query_text, lambda: optimize_query(prepared, stats))
+
+
+def _evaluation_order(bgp: CompValue, bound: Set[Node]) -> List[TriplePattern]:
+    """The order bgp's patterns are evaluated in: their own when optimized, else rdflib's sort."""
+    if dict.get(bgp, ORDERED_BGP_KEY):
+        return list(bgp.triples)
+    return sorted(bgp.triples, key=lambda t: len(pattern_vars(t) - bound))
+
+
+def _format_pattern(pattern: TriplePattern, graph: rdflib.Graph) -> str:
+    return " ".join(
+        f"?{term}" if isinstance(term, Variable) else term.n3(graph.namespace_manager)
+        for term in pattern
+    )
+
+
+def _bgps(node: Any) -> List[CompValue]:
+    found: List[CompValue] = []
+    if isinstance(node, CompValue):
+        if node.name == "BGP":
+            found.append(node)
+        for key, child in _raw_items(node):
+            if key != "_vars":
+                found.extend(_bgps(child))
+    elif isinstance(node, list):
+        for child in node:
+            found.extend(_bgps(child))
+    return found
+
+
+def explain_query(
+    graph: rdflib.Graph,
+    query: Query,
+    stats: Optional[GraphStatistics] = None,
+    init_bindings: Optional[Mapping[str, Any]] = None,
+    analyze: bool = True
+) -> pd.DataFrame:
+    """
+    EXPLAIN for a prepared query: one row per triple pattern of every BGP, in
+    evaluation order, with the estimated number of rows after joining it and,
+    when analyze is True, the actual number of rows of that BGP prefix evaluated
+    on its own (outer OPTIONAL/JOIN bindings are not pushed in). BGPs not
+    ordered by optimize_query are listed in rdflib's own order, fewest unbound
+    terms first.
+    The last row, bgp == "where", is the solution count of the whole WHERE clause.
+    """
+    stats = stats or get_graph_statistics(graph)
+    bindings = {Variable(k): v for k, v in (init_bindings or {}).items()}
+    rows: List[Dict[str, Any]] = []
+    for bgp_index, bgp in enumerate(_bgps(where_pattern(query))):
+        bound: Set[Node] = set(bindings)
+        patterns = _evaluation_order(bgp, bound)
+        estimated = 1.0
+        for step, pattern in enumerate(patterns):
+            estimated *= stats.estimate(pattern, bound)
+            bound |= pattern_vars(pattern)
+            actual = None
+            if analyze:
+                ctx = QueryContext(graph, initBindings=bindings)
+                prefix = CompValue("BGP", triples=patterns[:step + 1])
+                actual = sum(1 for _ in evalPart(ctx, prefix))
+            rows.append({
+                "bgp": bgp_index,
+                "step": step,
+                "pattern": _format_pattern(pattern, graph),
+                "estimated_rows": round(estimated, 2),
+                "actual_rows": actual,
+            })
+    if analyze:
+        total = sum(1 for _ in iter_solutions(graph, query, init_bindings))
+        rows.append({"bgp": "where", "step": None, "pattern": "", "estimated_rows": None, "actual_rows": total})
+    df = pd.DataFrame(rows, columns=["bgp", "step", "pattern", "estimated_rows", "actual_rows"])
+    return df.astype({"step": "Int64", "actual_rows": "Int64"})
@@ -0,0 +1,169 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple, Any, Mapping
+
+import pandas as pd
+import rdflib
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.sparql import Query
+
+from c4sb_demo.witness import size_hint
+
+DEFAULT_PREPARED_QUERY_CACHE_SIZE: int = 128
+
+
+class PreparedQueryCache:
+    """
+    Process-wide LRU cache of parsed and algebra-translated SPARQL queries.
+
+    Entries are keyed by query text and the namespace bindings used to resolve
+    prefixes, so repeated executions of the same query skip rdflib's
+    parse/translate phase entirely.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_PREPARED_QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, Tuple[Tuple[str, str], ...]], Query]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query_text: str, init_ns: Optional[Mapping[str, Any]]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+        namespaces = tuple(sorted((prefix, str(ns)) for prefix, ns in (init_ns or {}).items()))
+        return query_text, namespaces
+
+    def get(self, query_text: str, init_ns: Optional[Mapping[str, Any]] = None) -> Query:
+        """Returns the prepared form of query_text, preparing and caching it on a miss."""
+        key = self.make_key(query_text, init_ns)
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return prepared
+            self.misses += 1
+        # Prepare outside the lock; a concurrent miss on the same key just prepares twice.
+        prepared = prepareQuery(query_text, initNs=dict(init_ns or {}))
+        with self._lock:
+            self._entries[key] = prepared
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return prepared
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+_prepared_query_cache = PreparedQueryCache()
+
+
+def get_prepared_query_cache() -> PreparedQueryCache:
+    return _prepared_query_cache
+
+
+def prepare_cached(query_text: str, init_ns: Optional[Mapping[str, Any]] = None) -> Query:
+    """Returns the cached prepared form of query_text from the process-wide cache."""
+    return _prepared_query_cache.get(query_text, init_ns)
+
+
+DEFAULT_RESULT_CACHE_BYTES: int = 256 * 1024 * 1024
+# Rough per-triple footprint of a cached path graph in an rdflib Memory store.
+_APPROX_BYTES_PER_TRIPLE: int = 600
+
+
+def estimate_result_bytes(df: Optional[pd.DataFrame], path_graph: Optional[rdflib.Graph]) -> int:
+    size = 0
+    if df is not None:
+        size += int(df.memory_usage(index=True, deep=True).sum())
+    if path_graph is not None:
+        # A lazy witness graph is charged its budget rather than built just to be sized
+        size += size_hint(path_graph) * _APPROX_BYTES_PER_TRIPLE
+    return size
+
+
+class QueryResultCache:
+    """
+    Memory-bounded LRU cache of execute_sparql_query results.
+
+    Entries are keyed by (query text, initial bindings, graph version), where the
+    graph version comes from graph_store.graph_version; results for graphs without
+    a versioned store are never cached. Any add/remove on the graph changes its
+    version, so stale results are simply never looked up again and age out.
+    Cached DataFrames and path graphs are shared between callers and must not be
+    mutated.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_RESULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[Any, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        query_text: str,
+        init_bindings: Optional[Mapping[str, Any]],
+        version: Tuple[str, int],
+        extra: Any = None
+    ) -> Tuple[Any, ...]:
+        bindings = tuple(sorted((str(k), v) for k, v in (init_bindings or {}).items()))
+        return query_text, bindings, version, extra
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Tuple[Any, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key: Tuple[Any, ...], df: Optional[pd.DataFrame], path_graph: Optional[rdflib.Graph]) -> None:
+        size = estimate_result_bytes(df, path_graph)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            self._entries[key] = (df, path_graph, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_query_result_cache = QueryResultCache()
+
+
+def get_query_result_cache() -> QueryResultCache:
+    return _query_result_cache
@@ -0,0 +1,219 @@
+import hashlib
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Sequence, Iterable
+
+import owlrl
+import rdflib
+from rdflib.namespace import OWL, RDF, RDFS
+from rdflib.term import Node
+
+from c4sb_demo.graph_cache import CACHE_FILE_SUFFIX, PARSER_VERSION, add_encoded_graph, encode_graph, get_graph_cache, parse_source
+from c4sb_demo.graph_store import new_graph
+
+try:  # The RDFS flavour pyshacl's inference='rdfs' runs
+    from pyshacl.inference import CustomRDFSSemantics as RDFSSemantics
+except ImportError:
+    RDFSSemantics = owlrl.RDFS_Semantics
+
+# Bump whenever the entailment rules or the cached closure layout change.
+CLOSURE_FORMAT_VERSION: int = 1
+
+Triple = Tuple[Node, Node, Node]
+
+
+def compute_rdfs_closure(graph: rdflib.Graph) -> rdflib.Graph:
+    """Returns a new graph with graph and its RDFS closure, exactly as pyshacl's inference='rdfs' computes it."""
+    closure = new_graph()
+    for prefix, namespace in graph.namespaces():
+        closure.bind(prefix, namespace)
+    closure.addN((s, p, o, closure) for s, p, o in graph)
+    owlrl.DeductiveClosure(RDFSSemantics).expand(closure)
+    return closure
+
+
+def ontology_versions(graph: rdflib.Graph) -> List[str]:
+    """The owl:versionIRI / owl:versionInfo values declared by the owl:Ontology nodes of graph."""
+    versions = []
+    for ontology in sorted(graph.subjects(RDF.type, OWL.Ontology), key=str):
+        for predicate in (OWL.versionIRI, OWL.versionInfo):
+            versions.extend(f"{ontology} {value}" for value in graph.objects(ontology, predicate))
+    return versions
+
+
+class OntologyClosure:
+    """
+    The RDFS closure of a static ontology (e.g. the Brick, REC or 223P class
+    hierarchies), computed once and shared by every data graph validated against it.
+
+    entail() adds a data graph to a copy of the closure and runs only the
+    entailments the data triples take part in, as a semi-naive forward chaining
+    over the same rules owlrl's RDFS closure applies. The result is the same graph
+    pyshacl would get from inference='rdfs' with the ontology mixed in, at a cost
+    proportional to the data rather than the ontology.
+    """
+
+    def __init__(self, graph: rdflib.Graph, version_key: str = "", versions: Optional[List[str]] = None):
+        self.graph = graph
+        self.version_key = version_key
+        self.versions = list(versions or [])
+        self._triples: List[Triple] = list(graph)
+
+    @classmethod
+    def from_ontology(cls, ontology_graph: rdflib.Graph, version_key: str = "") -> "OntologyClosure":
+        return cls(compute_rdfs_closure(ontology_graph), version_key, ontology_versions(ontology_graph))
+
+    def __len__(self) -> int:
+        return len(self._triples)
+
+    def entail(self, data_graph: rdflib.Graph) -> rdflib.Graph:
+        """Returns a new graph with the closure, data_graph (left unmodified) and their RDFS entailments."""
+        graph = new_graph()
+        for prefix, namespace in data_graph.namespaces():
+            graph.bind(prefix, namespace)
+        graph.addN((s, p, o, graph) for s, p, o in self._triples)
+        data = list(data_graph.triples((None, None, None)))
+        graph.addN((s, p, o, graph) for s, p, o in data)
+        # owlrl only types the terms of the asserted triples as rdfs:Resource (rdfs4a/b)
+        pending = deque(t for s, _, o in data for t in ((s, RDF.type, RDFS.Resource), (o, RDF.type, RDFS.Resource)))
+        pending.extend(data)
+        self._chain(graph, pending)
+        return graph
+
+    @staticmethod
+    def _chain(graph: rdflib.Graph, pending: deque) -> None:
+        """Adds the consequences of the pending triples, and of those, until nothing new follows."""
+        triples = graph.triples
+
+        def derive(triple: Triple) -> None:
+            if triple not in graph:
+                graph.add(triple)
+                pending.append(triple)
+
+        while pending:
+            s, p, o = pending.popleft()
+            if (s, p, o) not in graph:
+                graph.add((s, p, o))
+            derive((p, RDF.type, RDF.Property))  # rdf1
+            for _, _, cls in triples((p, RDFS.domain, None)):  # rdfs2
+                derive((s, RDF.type, cls))
+            for _, _, cls in triples((p, RDFS.range, None)):  # rdfs3
+                derive((o, RDF.type, cls))
+            for _, _, super_property in triples((p, RDFS.subPropertyOf, None)):  # rdfs7
+                derive((s, super_property, o))
+
+            if p == RDF.type:
+                for _, _, super_class in triples((o, RDFS.subClassOf, None)):  # rdfs9
+                    derive((s, RDF.type, super_class))
+                if o == RDF.Property:  # rdfs6
+                    derive((s, RDFS.subPropertyOf, s))
+                elif o == RDFS.Class:  # rdfs8, rdfs10
+                    derive((s, RDFS.subClassOf, RDFS.Resource))
+                    derive((s, RDFS.subClassOf, s))
+                elif o == RDFS.ContainerMembershipProperty:  # rdfs12
+                    derive((s, RDFS.subPropertyOf, RDFS.member))
+                elif o == RDFS.Datatype:  # rdfs13
+                    derive((s, RDFS.subClassOf, RDFS.Literal))
+            elif p == RDFS.domain:
+                for subject, _, _ in triples((None, s, None)):
+                    derive((subject, RDF.type, o))
+            elif p == RDFS.range:
+                for _, _, value in triples((None, s, None)):
+                    derive((value, RDF.type, o))
+            elif p == RDFS.subPropertyOf:
+                for _, _, super_property in triples((o, RDFS.subPropertyOf, None)):  # rdfs5
+                    derive((s, RDFS.subPropertyOf, super_property))
+                for sub_property, _, _ in triples((None, RDFS.subPropertyOf, s)):
+                    derive((sub_property, RDFS.subPropertyOf, o))
+                for subject, _, value in triples((None, s, None)):
+                    derive((subject, o, value))
+            elif p == RDFS.subClassOf:
+                for instance, _, _ in triples((None, RDF.type, s)):
+                    derive((instance, RDF.type, o))
+                for _, _, super_class in triples((o, RDFS.subClassOf, None)):  # rdfs11
+                    derive((s, RDFS.subClassOf, super_class))
+                for sub_class, _, _ in triples((None, RDFS.subClassOf, s)):
+                    derive((sub_class, RDFS.subClassOf, o))
+
+
+def closure_cache_dir() -> Optional[Path]:
+    """Where ontology closures are kept on disk: next to the parsed-graph cache, None when that is disabled."""
+    cache = get_graph_cache()
+    return None if cache is None else cache.cache_dir / "closures"
+
+
+def ontology_version_key(ontology_graph_paths: Sequence[Path]) -> str:
+    """
+    Version key of an ontology file set: a digest of the files' parsed-graph cache
+    keys (their content hashes, or size and mtime in "mtime" key mode), the rdflib
+    and owlrl releases and CLOSURE_FORMAT_VERSION.
+    """
+    cache = get_graph_cache()
+    digest = hashlib.sha256(f"{PARSER_VERSION}\0owlrl-{owlrl.__version__}\0{CLOSURE_FORMAT_VERSION}\0".encode("utf-8"))
+    for path in ontology_graph_paths:
+        if cache is not None:
+            digest.update(cache.cache_key(Path(path), "turtle").encode("utf-8"))
+        else:
+            digest.update(Path(path).read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+_closures: Dict[str, OntologyClosure] = {}
+_closures_lock = threading.Lock()
+
+
+def _load_closure(entry: Path, version_key: str) -> Optional[OntologyClosure]:
+    try:
+        blob = entry.read_bytes()
+    except OSError:
+        return None
+    graph = new_graph()
+    try:
+        add_encoded_graph(graph, blob)
+    except Exception as e:
+        print(f"Warning: discarding unreadable ontology closure {entry}: {e}")
+        entry.unlink(missing_ok=True)
+        return None
+    return OntologyClosure(graph, version_key, ontology_versions(graph))
+
+
+def _store_closure(entry: Path, closure: OntologyClosure) -> None:
+    try:
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(encode_graph(closure.graph))
+        os.replace(tmp_path, entry)
+    except OSError as e:
+        print(f"Warning: could not write ontology closure {entry}: {e}")
+
+
+def get_ontology_closure(ontology_graph_paths: Iterable[Path], use_cache: bool = True) -> OntologyClosure:
+    """
+    Returns the RDFS closure of the ontology files, computing it only the first
+    time a version of them is seen: closures are kept per process and on disk
+    under their ontology_version_key. An empty file list gives an empty closure.
+    """
+    paths = [Path(p) for p in ontology_graph_paths]
+    if not paths:
+        return OntologyClosure(new_graph())
+    version_key = ontology_version_key(paths)
+    with _closures_lock:
+        closure = _closures.get(version_key) if use_cache else None
+        if closure is not None:
+            return closure
+        cache_dir = closure_cache_dir() if use_cache else None
+        entry = cache_dir / f"{version_key}{CACHE_FILE_SUFFIX}" if cache_dir is not None else None
+        closure = _load_closure(entry, version_key) if entry is not None else None
+        if closure is None:
+            ontology_graph = rdflib.Graph()
+            for path in paths:
+                parse_source(ontology_graph, path, "turtle", use_cache=use_cache)
+            closure = OntologyClosure.from_ontology(ontology_graph, version_key)
+            if entry is not None:
+                _store_closure(entry, closure)
+        if use_cache:
+            _closures[version_key] = closure
+        return closure
@@ -0,0 +1,97 @@
+from typing import Optional, List, Dict, Sequence, Mapping, Any
+
+import pandas as pd
+from rdflib.namespace import XSD
+from rdflib.term import URIRef, Literal, Variable, Node
+
+# xsd datatypes mapped onto typed pandas columns
+XSD_INTEGER_TYPES = {
+    XSD.integer, XSD.int, XSD.long, XSD.short, XSD.byte,
+    XSD.nonNegativeInteger, XSD.nonPositiveInteger, XSD.positiveInteger, XSD.negativeInteger,
+    XSD.unsignedLong, XSD.unsignedInt, XSD.unsignedShort, XSD.unsignedByte,
+}
+XSD_FLOAT_TYPES = {XSD.decimal, XSD.double, XSD.float}
+XSD_BOOLEAN_TYPES = {XSD.boolean}
+XSD_DATETIME_TYPES = {XSD.dateTime, XSD.dateTimeStamp, XSD.date}
+# Literals converted to plain text columns
+XSD_STRING_TYPES = {None, XSD.string}
+
+
+def _column_kind(values: List[Optional[Node]]) -> str:
+    """Classifies a column of RDF terms as iri/integer/float/boolean/datetime/string/empty."""
+    kinds = set()
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, URIRef):
+            kinds.add("iri")
+        elif isinstance(value, Literal):
+            datatype = value.datatype
+            if datatype in XSD_INTEGER_TYPES:
+                kinds.add("integer")
+            elif datatype in XSD_FLOAT_TYPES:
+                kinds.add("float")
+            elif datatype in XSD_BOOLEAN_TYPES:
+                kinds.add("boolean")
+            elif datatype in XSD_DATETIME_TYPES:
+                kinds.add("datetime")
+            else:
+                kinds.add("string")
+        else:
+            kinds.add("string")
+        if len(kinds) > 1 and kinds != {"integer", "float"}:
+            return "string"
+    if not kinds:
+        return "empty"
+    if kinds == {"integer", "float"}:
+        return "float"
+    return kinds.pop()
+
+
+def _lexical(values: List[Optional[Node]]) -> List[Optional[str]]:
+    return [None if value is None else str(value) for value in values]
+
+
+def terms_to_series(values: List[Optional[Node]], name: str) -> pd.Series:
+    """
+    Converts a column of RDF terms into a typed pandas Series: xsd integers to
+    Int64, decimals/doubles to Float64, booleans to boolean, dates to datetime64,
+    IRIs to category and everything else to string. Missing values become <NA>.
+    Columns whose literals fail to convert fall back to string.
+    """
+    kind = _column_kind(values)
+    lexical = _lexical(values)
+    if kind == "empty":
+        return pd.Series([pd.NA] * len(values), name=name, dtype="object")
+    if kind == "iri":
+        return pd.Series(lexical, name=name, dtype="category")
+    try:
+        if kind == "integer":
+            return pd.to_numeric(pd.Series(lexical, name=name, dtype="string")).astype("Int64")
+        if kind == "float":
+            return pd.to_numeric(pd.Series(lexical, name=name, dtype="string")).astype("Float64")
+        if kind == "boolean":
+            return pd.Series(
+                [None if v is None else v.strip() in ("true", "1") for v in lexical], name=name, dtype="boolean"
+            )
+        if kind == "datetime":
+            return pd.Series(pd.to_datetime(lexical, format="ISO8601", utc=True), name=name)
+    except (ValueError, TypeError, OverflowError):
+        pass  # Ill-typed literal somewhere in the column; keep the text instead
+    return pd.Series(lexical, name=name, dtype="string")
+
+
+def bindings_to_dataframe(variables: Sequence[Variable], bindings: Sequence[Mapping[Any, Node]]) -> pd.DataFrame:
+    """
+    Builds a typed DataFrame from SPARQL SELECT bindings column by column,
+    filling one list per variable in a single pass over the bindings.
+    """
+    names = [str(var) for var in variables]
+    columns: Dict[str, List[Optional[Node]]] = {name: [] for name in names}
+    appenders = [(var, columns[name].append) for var, name in zip(variables, names)]
+    for binding in bindings:
+        for var, append in appenders:
+            append(binding.get(var))
+    if not names:
+        return pd.DataFrame()
+    return pd.DataFrame({name: terms_to_series(columns[name], name) for name in names}, columns=names)
@@ -0,0 +1,210 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Set, Tuple, Any, Iterator
+
+from rdflib import Graph, BNode, Literal
+from rdflib.namespace import RDFS
+from rdflib.term import Node
+
+from c4sb_demo.graph_cache import add_encoded_graph, encode_graph, encode_triples
+from c4sb_demo.incremental_validation import (
+    SH,
+    Triple,
+    _closure,
+    dependency_radius,
+    neighborhood,
+    report_conforms,
+    report_text,
+)
+from c4sb_demo.sparql_constants import RDF_TYPE
+from c4sb_demo.tracing import debug
+from c4sb_demo.validate_graphs import DataGraph, ShapesValidator, get_shapes_validator
+
+# Focus nodes validated together in one shard
+DEFAULT_SHARD_SIZE: int = 500
+
+
+@dataclass
+class Shard:
+    """A group of focus nodes and the part of the data graph needed to validate them."""
+    focus_nodes: List[Node]
+    triples: List[Triple] = field(default_factory=list)
+
+
+def target_nodes(shapes_validator: ShapesValidator, data_graph: Graph) -> Set[Node]:
+    """The focus nodes the targets of every shape select in data_graph."""
+    dg = DataGraph.from_rdflib(data_graph) if DataGraph is not None else data_graph
+    nodes: Set[Node] = set()
+    for shape in shapes_validator.shapes:
+        nodes |= shape.focus_nodes(dg)
+    return nodes
+
+
+def _locality_order(graph: Graph, focus_nodes: Set[Node]) -> List[Node]:
+    """
+    The focus nodes in breadth-first order over the data graph, one connected
+    component after the other, so consecutive nodes tend to share their context.
+    """
+    ordered: List[Node] = []
+    seen: Set[Node] = set()
+    for start in sorted(focus_nodes, key=lambda n: (isinstance(n, BNode), str(n))):
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node in focus_nodes:
+                ordered.append(node)
+            neighbors = [o for p, o in graph.predicate_objects(node) if p != RDF_TYPE and not isinstance(o, Literal)]
+            neighbors.extend(graph.subjects(None, node))
+            for neighbor in neighbors:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+    return ordered
+
+
+def _superclass_triples(graph: Graph, cls: Node, cache: Dict[Node, Set[Triple]]) -> Set[Triple]:
+    """The rdfs:subClassOf triples on the way up from cls, cached per class."""
+    if cls not in cache:
+        found: Set[Triple] = set()
+        stack = [cls]
+        seen = {cls}
+        while stack:
+            for triple in graph.triples((stack.pop(), RDFS.subClassOf, None)):
+                found.add(triple)
+                if triple[2] not in seen:
+                    seen.add(triple[2])
+                    stack.append(triple[2])
+        cache[cls] = found
+    return cache[cls]
+
+
+def shard_context(
+    graph: Graph,
+    focus_nodes: List[Node],
+    radius: int,
+    superclasses: Optional[Dict[Node, Set[Triple]]] = None
+) -> List[Triple]:
+    """
+    The triples of every node within radius hops of the focus nodes, with the
+    blank node structures they point to and the part of the class hierarchy
+    above their classes. superclasses caches the latter across shards.
+    """
+    superclasses = {} if superclasses is None else superclasses
+    triples: Dict[Triple, None] = {}
+    for node in neighborhood(graph, focus_nodes, radius):
+        triples.update(dict.fromkeys(_closure(graph, node)))
+    for cls in {o for _, p, o in triples if p == RDF_TYPE}:
+        triples.update(dict.fromkeys(_superclass_triples(graph, cls, superclasses)))
+    return list(triples)
+
+
+def plan_shards(
+    shapes_validator: ShapesValidator,
+    data_graph: Graph,
+    shard_size: int = DEFAULT_SHARD_SIZE
+) -> List[Shard]:
+    """
+    Splits the focus nodes of data_graph into shards of up to shard_size
+    neighboring nodes, each with the context its focus nodes can be validated in
+    on their own: everything within the shapes' dependency_radius of them.
+    Shapes whose dependency radius is unbounded cannot be sharded.
+    """
+    radius = dependency_radius(shapes_validator)
+    if radius is None:
+        raise ValueError("The shapes' dependencies are unbounded; validate the whole graph instead")
+    focus_nodes = target_nodes(shapes_validator, data_graph)
+    ordered = _locality_order(data_graph, focus_nodes)
+    superclasses: Dict[Node, Set[Triple]] = {}
+    shards = []
+    for start in range(0, len(ordered), max(shard_size, 1)):
+        chunk = ordered[start:start + shard_size]
+        shards.append(Shard(chunk, shard_context(data_graph, chunk, radius, superclasses)))
+    return shards
+
+
+def _validate_shard(job: Tuple[List[Path], Dict[str, Any], bytes, List[Node]]) -> bytes:
+    """Worker entry point: validates the focus nodes of one encoded shard and returns the encoded report graph."""
+    shacl_graph_paths, options, payload, focus_nodes = job
+    shard_graph = Graph()
+    add_encoded_graph(shard_graph, payload, fresh_bnodes=False)  # Focus nodes may be blank nodes
+    _, results_graph, _ = get_shapes_validator(shacl_graph_paths, **options).validate(shard_graph, focus_nodes=focus_nodes)
+    return encode_graph(results_graph)
+
+
+def _decode_report(payload: bytes) -> Graph:
+    results_graph = Graph()
+    add_encoded_graph(results_graph, payload, fresh_bnodes=False)
+    return results_graph
+
+
+def merge_reports(results_graphs: List[Graph], options: Dict[str, Any]) -> Tuple[bool, Graph, str]:
+    """Combines report graphs over disjoint focus nodes into one (conforms, results_graph, results_text)."""
+    merged = Graph()
+    report = BNode()
+    merged.add((report, RDF_TYPE, SH.ValidationReport))
+    for results_graph in results_graphs:
+        for prefix, namespace in results_graph.namespaces():
+            merged.bind(prefix, namespace, override=False)
+        partial_report = results_graph.value(predicate=RDF_TYPE, object=SH.ValidationReport)
+        for result in results_graph.objects(partial_report, SH.result):
+            merged.add((report, SH.result, result))
+            for triple in _closure(results_graph, result):
+                merged.add(triple)
+    conforms = report_conforms(merged, options)
+    merged.add((report, SH.conforms, Literal(conforms)))
+    return conforms, merged, report_text(merged)
+
+
+def iter_shard_reports(
+    shapes_validator: ShapesValidator,
+    shards: List[Shard],
+    max_workers: Optional[int] = None
+) -> Iterator[Graph]:
+    """Validates each shard in a process pool of max_workers (default: one per CPU) and yields its report graph."""
+    # Shards are cut from the already inferred graph, so the workers skip inference
+    options = {k: shapes_validator.options[k] for k in ("advanced", "allow_infos", "allow_warnings", "abort_on_first")}
+    options["inference"] = "none"
+    jobs = [
+        (shapes_validator.shacl_graph_paths, options, encode_triples(shard.triples, []), shard.focus_nodes)
+        for shard in shards
+    ]
+    if len(jobs) <= 1 or max_workers == 1:
+        payloads: Iterator[bytes] = map(_validate_shard, jobs)
+        yield from map(_decode_report, payloads)
+        return
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from map(_decode_report, executor.map(_validate_shard, jobs))
+
+
+def validate_sharded(
+    shapes_validator: ShapesValidator,
+    data_graph: Graph,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    max_workers: Optional[int] = None
+) -> Tuple[bool, Graph, str]:
+    """
+    Validates data_graph shard by shard in parallel (see plan_shards) and merges
+    the shard reports; returns (conforms, results_graph, results_text) like
+    ShapesValidator.validate. Shapes with SHACL rules or an unbounded
+    dependency_radius, and inference other than 'rdfs' or 'none', need the
+    whole graph and are validated in one piece.
+    """
+    inference = shapes_validator.options.get("inference")
+    if (None, SH.rule, None) in shapes_validator.shacl_graph or inference not in ("rdfs", "none") \
+            or dependency_radius(shapes_validator) is None:
+        return shapes_validator.validate(data_graph)
+    started = time.perf_counter()
+    if shapes_validator.ontology_closure is not None:
+        data_graph = shapes_validator.ontology_closure.entail(data_graph)
+    shards = plan_shards(shapes_validator, data_graph, shard_size)
+    debug(f"Split {len(data_graph)} triples into {len(shards)} shards in {time.perf_counter() - started:.2f}s")
+    results_graphs = list(iter_shard_reports(shapes_validator, shards, max_workers))
+    return merge_reports(results_graphs, shapes_validator.options)
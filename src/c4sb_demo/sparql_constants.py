@@ -8,6 +8,12 @@ S223: Namespace = Namespace("http://data.ashrae.org/standard223#")
 NS_PROPS: Namespace = Namespace("https://w3id.org/rec/props/")
 QUDT: Namespace = Namespace("http://qudt.org/schema/qudt/")
 UNIT: Namespace = Namespace("http://qudt.org/vocab/unit/")
+# Derived per-room aggregates materialized by views.py
+VIEW: Namespace = Namespace("https://w3id.org/c4sb-demo/view#")
+# Named graphs of a combined dataset holding generated triples (see create_combined_linked_dataset)
+C4SB_GRAPH: Namespace = Namespace("https://w3id.org/c4sb-demo/graph/")
+LINKS_GRAPH: URIRef = C4SB_GRAPH.links
+INFERRED_GRAPH: URIRef = C4SB_GRAPH.inferred
 
 # Explicit URIRefs for RDF, RDFS, OWL terms to be used in graph operations
 RDF_TYPE: URIRef = term.URIRef("http://www.w3.org/1999/02/22-rdf-syntax-ns#type")
@@ -27,6 +33,7 @@ PREFIX_DICT = {
     "rdf": RDF,
     "rdfs": RDFS,
     "owl": OWL,
+    "view": VIEW,
     # Consider adding skos if used in queries and not just as URIRefs
     # "skos": SKOS_CORE_NS, # Assuming SKOS_CORE_NS = Namespace("http://www.w3.org/2004/02/skos/core#")
 }
@@ -41,10 +48,12 @@ PREFIXES = """
     PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     PREFIX owl: <http://www.w3.org/2002/07/owl#>
+    PREFIX view: <https://w3id.org/c4sb-demo/view#>
 """
 
 # SPARQL Query Definitions
-# Each query is a dictionary with 'body' and 'path_graph_ttl'
+# Each query is a dictionary with a 'body' and an optional 'witness_triple_budget'
+# capping the path graph built from the query's matches (see witness.py)
 
 QUERY_1 = {
     "body": """
@@ -68,21 +77,6 @@ WHERE {
 }
 GROUP BY ?ashrae_rtu ?ashrae_component ?ashrae_component_label ?ashrae_component_type
 """,
-    "path_graph_ttl": PREFIXES + """
-@prefix mybldg: <http://example.com/mybuilding#> .
-
-mybldg:RTU-1 s223:hasComponent mybldg:RTU-1_SupplyFan .
-mybldg:RTU-1_SupplyFan rdf:type s223:Fan .
-mybldg:RTU-1 a s223:AirHandlingUnit .
-brick:SomeBrickRTUForQ1 owl:sameAs mybldg:RTU-1 ;
-    a brick:RTU ;
-    brick:feeds brick:SomeZoneForQ1 . # Added feeds for path
-brick:SomeZoneForQ1 owl:sameAs rec:SomeRoomForQ1 . # Added sameAs for path
-rec:SomeRoomForQ1 rec:containsAsset rec:Desk1, rec:Desk2 ; # Added desks for path
-    a rec:Room .
-rec:Desk1 a rec:Desk .
-rec:Desk2 a rec:Desk .
-"""
 }
 
 QUERY_2 = {
@@ -114,49 +108,6 @@ WHERE {
 }
 GROUP BY ?sensor_label ?zone_label ?rec_building_label ?rec_building_gross_area ?rec_room_label
 """,
-    "path_graph_ttl": PREFIXES + """
-@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
-
-brick:RTU_1_DAT_Sensor rdfs:label "RTU 1 Discharge Air Temperature Sensor" ;
-    a brick:Discharge_Air_Temperature_Sensor ;
-    brick:hasLocation brick:Zone1 .
-
-brick:Zone1 a brick:HVAC_Zone ; 
-    rdfs:label "Zone1 Label" ;
-    brick:isPartOf rec:Room101 .
-
-rec:Room101 a rec:Room ;
-    rdfs:label "Room 101 Label" ;
-    rec:isPartOf rec:Building123 ;
-    rec:containsAsset rec:Desk1, rec:Desk2 ;
-    props:hasArea [ props:hasValue "100.0"^^xsd:decimal ] .
-rec:Desk1 a rec:Desk .
-rec:Desk2 a rec:Desk .
-
-brick:Zone2 a brick:HVAC_Zone ;
-    rdfs:label "Zone2 Label" ;
-    brick:isPartOf rec:Room102 .
-rec:Room102 a rec:Room ;
-    rdfs:label "Room 102 Label" ;
-    rec:isPartOf rec:Building123 ;
-    rec:containsAsset rec:Desk3, rec:Desk4, rec:Desk5 ;
-    props:hasArea [ props:hasValue "150.0"^^xsd:decimal ] .
-rec:Desk3 a rec:Desk .
-rec:Desk4 a rec:Desk .
-rec:Desk5 a rec:Desk .
-
-rec:Building123 a rec:Building ;
-    props:grossArea "50000.0"^^xsd:double ; # Changed props:hasArea [ props:hasValue ... ] to props:grossArea
-    rdfs:label "Main Building Label" .
-
-brick:SomeBuildingForQ2 a brick:Building ;
-    owl:sameAs rec:Building123 ;
-    brick:hasPart brick:RTU_1 .
-
-brick:RTU_1 a brick:RTU ;
-    brick:hasPoint brick:RTU_1_DAT_Sensor ;
-    brick:feeds brick:Zone1, brick:Zone2 .
-"""
 }
 
 QUERY_3 = {
@@ -182,28 +133,6 @@ WHERE {
 }
 GROUP BY ?ashrae_rtu_description ?compressor_description ?compressor_model_number ?brick_rtu_label ?rec_room_label ?rec_room_area
 """,
-    "path_graph_ttl": PREFIXES + """
-@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
-
-s223:RTU-1 s223:hasComponent s223:RTU-1-C1 .
-s223:RTU-1-C1 rdf:type s223:Compressor .
-brick:RTU_1 brick:hasLocation brick:MechanicalRoom1 .
-brick:MechanicalRoom1 brick:isPartOf rec:Room101 .
-rec:Room101 props:area "100"^^xsd:string ; # Corrected from props:hasArea to props:area for consistency if it was a typo
-    rec:containsAsset rec:DeskQ3_1, rec:DeskQ3_2 ; # Added desks for path
-    a rec:Room .
-rec:DeskQ3_1 a rec:Desk .
-rec:DeskQ3_2 a rec:Desk .
-s223:RTU-1 a s223:AirHandlingUnit ;
-    s223:hasDescription "Rooftop Unit 1" .
-s223:RTU-1-C1 s223:hasDescription "Compressor 1 for RTU-1" ;
-    s223:hasModelNumber "COMP-MODEL-XYZ789" . 
-brick:RTU_1 owl:sameAs s223:RTU-1 ;
-    rdfs:label "Brick RTU_1 Label" ;
-    brick:feeds brick:ZoneServedByRTU1 .
-brick:ZoneServedByRTU1 owl:sameAs rec:Room101 .
-rec:Room101 rdfs:label "Room 101 Label" .
-"""
 }
 
 QUERY_4 = {
@@ -236,30 +165,23 @@ WHERE {
 }
 GROUP BY ?ashrae_ahu_description ?voltage_value ?voltage_unit_label
 """,
-    "path_graph_ttl": PREFIXES + """
-s223:RTU-1 s223:hasVoltage _:voltage_bnode_q4 .
-_:voltage_bnode_q4 s223:hasValue "208.0"^^s223:numeric ; # Assuming s223:numeric is defined or use xsd:decimal/double
-    s223:hasUnit _:voltage_unit_instance_bnode_q4 .
-_:voltage_unit_instance_bnode_q4 rdfs:label "V" ;
-    rdf:type s223:UnitOfMeasure . # Assuming s223:UnitOfMeasure is defined or use qudt:Unit
-brick:Zone1 brick:isPartOf rec:Room101 . # Using owl:sameAs as per other queries
-brick:RTU_1 brick:feeds brick:Zone1 .
-brick:RTU_1 owl:sameAs s223:RTU-1 .
-rec:Room101 a rec:Room ;
-    rec:containsAsset rec:DeskQ4_1, rec:DeskQ4_2, rec:DeskQ4_3, rec:DeskQ4_4 ; # Added desks for path
-    rdfs:label "Room 101 for Q4" .
-rec:DeskQ4_1 a rec:Desk .
-rec:DeskQ4_2 a rec:Desk .
-rec:DeskQ4_3 a rec:Desk .
-rec:DeskQ4_4 a rec:Desk .
-brick:Zone1 owl:sameAs rec:Room101 ;
-    a brick:HVAC_Zone .
-brick:RTU_1 a brick:RTU .
-s223:RTU-1 a s223:AirHandlingUnit ;
-    s223:hasDescription "Rooftop Unit 1" .
-s223:RTU-1 s223:hasConnectionPoint _:cp_elec_inlet_q4_vis .
-_:cp_elec_inlet_q4_vis a s223:InletConnectionPoint ;
-    s223:hasMedium _:medium_inst_q4_vis .
-_:medium_inst_q4_vis s223:hasVoltage _:voltage_bnode_q4 .
-"""
+}
+
+# Rooms fed by each RTU, answered from the materialized room views instead of
+# counting desks and walking area nodes (needs materialize_views=True)
+ROOM_IMPACT_QUERY = {
+    "body": """
+SELECT ?rtu_label ?room_label ?desk_count ?room_area
+WHERE {
+    ?brick_rtu_instance a brick:RTU .
+    ?brick_rtu_instance rdfs:label ?rtu_label .
+    ?brick_rtu_instance brick:feeds ?brick_zone .
+    ?brick_zone owl:sameAs ?rec_room .
+    ?rec_room a rec:Room .
+    ?rec_room rdfs:label ?room_label .
+    ?rec_room view:deskCount ?desk_count .
+    OPTIONAL { ?rec_room view:area ?room_area . }
+}
+ORDER BY ?room_label
+""",
 }
@@ -0,0 +1,438 @@
+import argparse
+import json
+import random
+import time
+from dataclasses import dataclass, asdict
+from decimal import Decimal
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Union, TextIO
+
+# Namespaces of the shipped sample files, so generated buildings link, query
+# and canonicalize exactly like them
+EX_BUILDING = "http://example.com/building#"
+EX_ASHRAE = "http://example.com/mybuilding#"
+
+BRICK_PREFIXES: Dict[str, str] = {
+    "brick": "https://brickschema.org/schema/Brick#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "ex": EX_BUILDING,
+}
+REC_PREFIXES: Dict[str, str] = {
+    "core": "https://w3id.org/rec/core/",
+    "props": "https://w3id.org/rec/props/",
+    "ref": "https://w3id.org/rec/ref/",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "ex": EX_BUILDING,
+}
+ASHRAE_PREFIXES: Dict[str, str] = {
+    "s223": "http://data.ashrae.org/standard223#",
+    "qudt": "http://qudt.org/schema/qudt/",
+    "unit": "http://qudt.org/vocab/unit/",
+    "quantitykind": "http://qudt.org/vocab/quantitykind/",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "ex": EX_ASHRAE,
+}
+
+# RTU points, emitted on both sides: (Brick class, 223P observed property, tag).
+# The first one is the discharge air temperature sensor QUERY_2 looks for.
+RTU_POINTS: List[Tuple[str, str, str]] = [
+    ("Discharge_Air_Temperature_Sensor", "DischargeAirTemperature", "discharge"),
+    ("Return_Air_Temperature_Sensor", "ReturnAirTemperature", "return"),
+    ("Mixed_Air_Temperature_Sensor", "MixedAirTemperature", "mixed"),
+    ("Outside_Air_Temperature_Sensor", "OutsideAirTemperature", "outside"),
+]
+ZONE_POINTS: List[str] = ["Zone_Air_Temperature_Sensor", "Zone_Air_Temperature_Setpoint", "Zone_Air_Humidity_Sensor"]
+
+# 223P components of every RTU besides its compressors: (class, local name, description, tags)
+RTU_COMPONENTS: List[Tuple[str, str, str, Tuple[str, ...]]] = [
+    ("Fan", "SupplyFan", "Supply Fan", ("fan",)),
+    ("CoolingCoil", "CoolingCoil", "Cooling Coil", ("coil", "cooling")),
+    ("HeatingCoil", "HeatingCoil", "Heating Coil", ("coil", "heating")),
+    ("Damper", "EconomizerDamper", "Economizer Damper", ("damper", "economizer")),
+]
+# Supply voltages drawn for the RTUs' electrical inlets
+RTU_VOLTAGES: List[int] = [208, 460]
+COMPRESSOR_MODELS: List[str] = ["XYZ", "ABC", "QRS", "LMN"]
+
+Term = str
+PredicateObjects = List[Tuple[Term, Union[Term, List[Term], "PredicateObjects"]]]
+
+
+@dataclass
+class BuildingScale:
+    """
+    How many of each entity generate_building_files emits. Counts are per
+    building unless noted; every HVAC zone serves exactly one REC room, so a
+    building has rtus * zones_per_rtu rooms spread evenly over its floors.
+    """
+    buildings: int = 1
+    floors: int = 2
+    rtus: int = 2
+    zones_per_rtu: int = 4
+    desks_per_room: int = 10  # Average: rooms get between half and one and a half times as many
+    points_per_rtu: int = 2  # On both the Brick and the 223P side
+    points_per_zone: int = 1
+    compressors_per_rtu: int = 1
+    connection_points_per_rtu: int = 1  # The electrical inlet, then alternating air inlets and outlets
+
+    @property
+    def rooms_per_building(self) -> int:
+        return self.rtus * self.zones_per_rtu
+
+    @property
+    def rooms(self) -> int:
+        return self.buildings * self.rooms_per_building
+
+    @property
+    def total_rtus(self) -> int:
+        return self.buildings * self.rtus
+
+
+# Named scales for the CLI and the benchmarks; "large" is 10k rooms and 1k RTUs
+SCALE_PRESETS: Dict[str, BuildingScale] = {
+    "tiny": BuildingScale(buildings=1, floors=1, rtus=1, zones_per_rtu=2, desks_per_room=3),
+    "small": BuildingScale(buildings=2, floors=3, rtus=5, zones_per_rtu=4),
+    "medium": BuildingScale(buildings=5, floors=5, rtus=20, zones_per_rtu=10),
+    "large": BuildingScale(buildings=10, floors=10, rtus=100, zones_per_rtu=10),
+}
+
+
+def _literal(value: Union[str, int, float, Decimal]) -> Term:
+    if isinstance(value, bool):
+        raise TypeError("Boolean literals are not generated")
+    if isinstance(value, int):
+        return f'"{value}"^^xsd:integer'
+    if isinstance(value, (float, Decimal)):
+        return f'"{value}"^^xsd:decimal'
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+class TurtleWriter:
+    """Writes subject blocks of prefixed terms as Turtle, in the order they are given."""
+
+    SEPARATOR = " ;\n    "
+
+    def __init__(self, out: TextIO, prefixes: Dict[str, str]):
+        self.out = out
+        self.statements = 0
+        for prefix, namespace in prefixes.items():
+            out.write(f"@prefix {prefix}: <{namespace}> .\n")
+        out.write("\n")
+
+    def _objects(self, value: Union[Term, List[Term], PredicateObjects]) -> str:
+        if isinstance(value, str):
+            self.statements += 1
+            return value
+        if value and isinstance(value[0], tuple):  # A blank node: [ p o ; ... ]
+            self.statements += 1
+            return f"[ {self._predicates(value, ' ; ')} ]"
+        return ", ".join(self._objects(v) for v in value)
+
+    def _predicates(self, predicate_objects: PredicateObjects, separator: str) -> str:
+        return separator.join(f"{p} {self._objects(o)}" for p, o in predicate_objects if o != [])
+
+    def subject(self, subject: Term, predicate_objects: PredicateObjects) -> None:
+        self.out.write(f"{subject} {self._predicates(predicate_objects, self.SEPARATOR)} .\n\n")
+
+
+class SyntheticBuildingWriter:
+    """
+    Emits one building after the other to the Brick, REC and 223P writers.
+    All randomness (room areas, desk counts, compressor models, supply voltages)
+    comes from one random.Random(seed) consumed in a fixed order, so a scale and
+    seed always give byte-identical files.
+    """
+
+    def __init__(self, scale: BuildingScale, seed: int, brick: TurtleWriter, rec: TurtleWriter, ashrae: TurtleWriter):
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.brick = brick
+        self.rec = rec
+        self.ashrae = ashrae
+        self.desks = 0
+
+    def write(self) -> None:
+        for voltage in RTU_VOLTAGES:
+            self._write_medium(voltage)
+        self.ashrae.subject("unit:V", [("rdfs:label", _literal("V"))])
+        for b in range(self.scale.buildings):
+            self._write_building(b)
+
+    def _write_medium(self, voltage: int) -> None:
+        medium = f"ex:Medium-AC-{voltage}V"
+        self.ashrae.subject(medium, [
+            ("a", "s223:Medium"),
+            ("s223:hasVoltage", f"{medium}_Voltage"),
+        ])
+        self.ashrae.subject(f"{medium}_Voltage", [
+            ("a", "s223:VoltageProperty"),
+            ("rdfs:label", _literal(f"AC {voltage}V Line-to-Line 3-Phase 60Hz")),
+            ("s223:hasVoltage", f"{medium}_VoltageMagnitude"),
+        ])
+        self.ashrae.subject(f"{medium}_VoltageMagnitude", [
+            ("a", "s223:VoltageMagnitude"),
+            ("rdfs:label", _literal(f"{voltage} Volts AC")),
+            ("s223:hasValue", _literal(Decimal(f"{voltage}.0"))),
+            ("qudt:hasUnit", "unit:V"),
+        ])
+
+    def _room_numbers(self) -> List[Tuple[int, str]]:
+        """(floor, room number) of each room of a building: floors filled in turn, numbers like "1003"."""
+        rooms, floors = self.scale.rooms_per_building, max(self.scale.floors, 1)
+        per_floor = -(-rooms // floors)
+        width = max(2, len(str(per_floor)))
+        return [(i // per_floor + 1, f"{i // per_floor + 1}{i % per_floor + 1:0{width}d}") for i in range(rooms)]
+
+    def _write_building(self, b: int) -> None:
+        scale = self.scale
+        building = f"ex:b{b}_building"
+        # "Building 0 (REC)" and "b0_building_rec" normalize to the Brick building's keys
+        self.brick.subject(building, [("a", "brick:Building"), ("rdfs:label", _literal(f"Building {b}"))])
+        self.brick.subject(f"ex:b{b}_roof", [
+            ("a", "brick:Roof"), ("rdfs:label", _literal(f"Building {b} Roof")), ("brick:isPartOf", building),
+        ])
+        self.brick.subject(f"ex:b{b}_mechanical_room", [
+            ("a", "brick:Mechanical_Room"), ("rdfs:label", _literal("Mechanical Room")), ("brick:isPartOf", building),
+        ])
+        rec_building = f"ex:b{b}_building_rec"
+        self.rec.subject(rec_building, [
+            ("a", "core:Building"),
+            ("rdfs:label", _literal(f"Building {b} (REC)")),
+            ("props:hasAddress", _literal(f"{100 + b} Main St, Anytown, USA")),
+        ])
+        for floor in range(1, max(scale.floors, 1) + 1):
+            self.rec.subject(f"ex:b{b}_floor_{floor}", [
+                ("a", "core:Floor"),
+                ("rdfs:label", _literal(f"Building {b} Floor {floor}")),
+                ("core:isPartOfBuilding", rec_building),
+                ("props:hasLevel", _literal(floor)),
+            ])
+        self.rec.subject(f"ex:b{b}_mechanical_room_rec", [
+            ("a", "core:Room"), ("rdfs:label", _literal("Mechanical Room")), ("core:isPartOfFloor", f"ex:b{b}_floor_1"),
+        ])
+
+        rooms = iter(self._room_numbers())
+        for r in range(1, scale.rtus + 1):
+            zones = []
+            for _ in range(scale.zones_per_rtu):
+                floor, number = next(rooms)
+                zones.append(self._write_zone(b, floor, number))
+            self._write_brick_rtu(b, r, zones)
+            self._write_ashrae_rtu(b, r)
+
+    def _write_zone(self, b: int, floor: int, number: str) -> Term:
+        """An HVAC zone and the REC room it serves, sharing the label the linker matches them by."""
+        scale = self.scale
+        zone, room = f"ex:b{b}_zone_{number}", f"ex:b{b}_room_{number}"
+        label = _literal(f"Room {number}")
+        points = [f"{zone}_point_{i + 1}" for i in range(scale.points_per_zone)]
+        self.brick.subject(zone, [
+            ("a", "brick:HVAC_Zone"), ("rdfs:label", label), ("brick:isPartOf", f"ex:b{b}_building"),
+            ("brick:hasPoint", points),
+        ])
+        for i, point in enumerate(points):
+            point_class = ZONE_POINTS[i % len(ZONE_POINTS)]
+            suffix = f" {i // len(ZONE_POINTS) + 1}" if i >= len(ZONE_POINTS) else ""
+            self.brick.subject(point, [
+                ("a", f"brick:{point_class}"),
+                ("rdfs:label", _literal(f"Room {number} {point_class.replace('_', ' ')}{suffix}")),
+            ])
+
+        area = self.rng.randint(12, 120)
+        desk_count = self.rng.randint(max(1, scale.desks_per_room // 2), max(1, scale.desks_per_room * 3 // 2))
+        desks = [f"ex:b{b}_desk_{number}_{d:02d}" for d in range(1, desk_count + 1)]
+        self.rec.subject(room, [
+            ("a", "core:Room"),
+            ("rdfs:label", label),
+            ("core:isPartOfFloor", f"ex:b{b}_floor_{floor}"),
+            ("props:hasArea", [
+                ("a", "core:Area"), ("props:hasValue", _literal(Decimal(area))), ("props:hasUnit", "ref:AreaSquareMeter"),
+            ]),
+            ("core:containsAsset", desks),
+        ])
+        for d, desk in enumerate(desks, start=1):
+            self.rec.subject(desk, [("a", "core:Desk"), ("rdfs:label", _literal(f"Desk {number}-{d:02d}"))])
+        self.desks += desk_count
+        return zone
+
+    def _write_brick_rtu(self, b: int, r: int, zones: List[Term]) -> None:
+        rtu = f"ex:b{b}_rtu_{r}"
+        points = [f"{rtu}_point_{i + 1}" for i in range(self.scale.points_per_rtu)]
+        self.brick.subject(rtu, [
+            ("a", "brick:RTU"),
+            ("rdfs:label", _literal(f"Building {b} Rooftop HVAC Unit {r}")),
+            ("brick:isPartOf", f"ex:b{b}_building"),
+            ("brick:hasLocation", f"ex:b{b}_roof"),
+            ("brick:feeds", zones),
+            ("brick:hasPoint", points),
+        ])
+        for i, point in enumerate(points):
+            point_class, _, _ = RTU_POINTS[i % len(RTU_POINTS)]
+            self.brick.subject(point, [
+                ("a", f"brick:{point_class}"),
+                ("rdfs:label", _literal(f"Building {b} RTU {r} {point_class.replace('_', ' ')}{_repeat_suffix(i)}")),
+            ])
+
+    def _write_ashrae_rtu(self, b: int, r: int) -> None:
+        scale, rng = self.scale, self.rng
+        # Local names like "B0-RTU-1" normalize to the Brick RTU's "b0_rtu_1"
+        rtu = f"ex:B{b}-RTU-{r}"
+        components = [f"{rtu}_{name}" for _, name, _, _ in RTU_COMPONENTS]
+        compressors = [f"{rtu}_Compressor-{c}" for c in range(1, scale.compressors_per_rtu + 1)]
+        connection_points = [f"{rtu}_ElectricalInlet"] + [
+            f"{rtu}_Air{'Inlet' if i % 2 else 'Outlet'}-{(i + 1) // 2}" for i in range(1, scale.connection_points_per_rtu)
+        ]
+        self.ashrae.subject(rtu, [
+            ("a", ["s223:AirHandlingUnit", "s223:Connectable"]),
+            ("s223:hasComponent", components + compressors),
+            ("s223:hasConnectionPoint", connection_points[:scale.connection_points_per_rtu]),
+            ("s223:hasDescription", _literal(f"Building {b} Rooftop Unit {r}")),
+            ("s223:hasTag", [_literal("hvac"), _literal("rtu")]),
+        ])
+
+        voltage = rng.choice(RTU_VOLTAGES)
+        for i, point in enumerate(connection_points[:scale.connection_points_per_rtu]):
+            if i == 0:
+                self.ashrae.subject(point, [
+                    ("a", "s223:InletConnectionPoint"),
+                    ("s223:hasMedium", f"ex:Medium-AC-{voltage}V"),
+                    ("s223:hasTag", [_literal("electrical"), _literal("inlet")]),
+                ])
+            else:
+                kind = "inlet" if i % 2 else "outlet"
+                self.ashrae.subject(point, [
+                    ("a", f"s223:{kind.capitalize()}ConnectionPoint"),
+                    ("s223:hasMedium", "s223:Medium-Air"),
+                    ("s223:hasTag", [_literal("air"), _literal(kind)]),
+                ])
+
+        for (component_class, _, description, tags), component in zip(RTU_COMPONENTS, components):
+            sensor = f"{component}_Sensor"
+            self.ashrae.subject(component, [
+                ("a", [f"s223:{component_class}", "s223:Connectable"]),
+                ("s223:hasDescription", _literal(f"{description} for B{b}-RTU-{r}")),
+                ("s223:hasTag", [_literal(t) for t in tags]),
+                ("s223:hasPoint", sensor),
+            ])
+            self._write_sensor(sensor, component, f"{description} Sensor", "Dimensionless", "PERCENT", "position")
+        for c, compressor in enumerate(compressors, start=1):
+            self.ashrae.subject(compressor, [
+                ("a", "s223:Compressor"),
+                ("s223:hasDescription", _literal(f"Compressor {c} for B{b}-RTU-{r}")),
+                ("s223:hasModelNumber", _literal(f"COMP-MODEL-{rng.choice(COMPRESSOR_MODELS)}{rng.randint(100, 999)}")),
+                ("s223:hasTag", _literal("compressor")),
+            ])
+        for i in range(scale.points_per_rtu):
+            _, observed, tag = RTU_POINTS[i % len(RTU_POINTS)]
+            self._write_sensor(
+                f"{rtu}_{observed}Sensor{_repeat_suffix(i).strip()}", rtu, f"{observed} Sensor", "Temperature", "DEG_C", tag
+            )
+
+    def _write_sensor(self, sensor: Term, point_of: Term, description: str, quantity_kind: str, unit: str, tag: str) -> None:
+        observed = f"{sensor}_Property"
+        self.ashrae.subject(sensor, [
+            ("a", "s223:Sensor"),
+            ("s223:isPointOf", point_of),
+            ("s223:hasQuantityKind", f"quantitykind:{quantity_kind}"),
+            ("s223:hasUnit", f"unit:{unit}"),
+            ("s223:hasTag", [_literal("sensor"), _literal(tag)]),
+            ("s223:observes", observed),
+            ("s223:hasObservationLocation", point_of),
+        ])
+        self.ashrae.subject(observed, [
+            ("a", "s223:QuantifiableObservableProperty"),
+            ("s223:hasDescription", _literal(description.replace(" Sensor", ""))),
+            ("s223:hasQuantityKind", f"quantitykind:{quantity_kind}"),
+            ("s223:hasUnit", f"unit:{unit}"),
+        ])
+
+
+def _repeat_suffix(index: int) -> str:
+    """" 2", " 3", ... for points past the first round of RTU_POINTS."""
+    return f" {index // len(RTU_POINTS) + 1}" if index >= len(RTU_POINTS) else ""
+
+
+@dataclass
+class GeneratedBuilding:
+    """The files generate_building_files wrote and what they hold."""
+    brick_file: Path
+    rec_file: Path
+    ashrae_file: Path
+    manifest_file: Path
+    scale: BuildingScale
+    seed: int
+    triples: int
+    desks: int
+
+
+def generate_building_files(
+    output_dir: Path,
+    scale: Optional[BuildingScale] = None,
+    seed: int = 0,
+    name: str = "synthetic"
+) -> GeneratedBuilding:
+    """
+    Writes a synthetic portfolio at the given scale to output_dir as
+    <name>-brick.ttl, <name>-rec.ttl and <name>-223.ttl, shaped like the shipped
+    sample files so EntityLinker links every building, RTU and zone and
+    QUERY_1..4 match every RTU. Also writes <name>.json, a batch manifest
+    (see batch.load_manifest) that records the scale and seed.
+    """
+    scale = scale or BuildingScale()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {kind: output_dir / f"{name}-{kind}.ttl" for kind in ("brick", "rec", "223")}
+    with open(paths["brick"], "w") as brick_out, open(paths["rec"], "w") as rec_out, open(paths["223"], "w") as ashrae_out:
+        writers = (
+            TurtleWriter(brick_out, BRICK_PREFIXES), TurtleWriter(rec_out, REC_PREFIXES), TurtleWriter(ashrae_out, ASHRAE_PREFIXES)
+        )
+        building = SyntheticBuildingWriter(scale, seed, *writers)
+        building.write()
+
+    manifest_file = output_dir / f"{name}.json"
+    manifest = {
+        "buildings": [{
+            "name": name,
+            "brick_file": paths["brick"].name,
+            "rec_file": paths["rec"].name,
+            "ashrae_file": paths["223"].name,
+        }],
+        "scale": asdict(scale),
+        "seed": seed,
+    }
+    manifest_file.write_text(json.dumps(manifest, indent=2) + "\n")
+    return GeneratedBuilding(
+        paths["brick"], paths["rec"], paths["223"], manifest_file, scale, seed,
+        sum(w.statements for w in writers), building.desks,
+    )
+
+
+def main():
+    """Generates a synthetic Brick + REC + 223P portfolio for load testing."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic Brick, REC and 223P building portfolio.")
+    parser.add_argument("output_dir", type=Path, help="Directory for the generated TTL files and manifest")
+    parser.add_argument("--preset", choices=sorted(SCALE_PRESETS), default="small", help="Starting scale (default: small)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--name", default="synthetic", help="File name prefix (default: synthetic)")
+    for field_name, value in asdict(BuildingScale()).items():
+        parser.add_argument(f"--{field_name.replace('_', '-')}", type=int, default=None, help=f"Override the preset's {field_name}")
+    args = parser.parse_args()
+
+    scale = asdict(SCALE_PRESETS[args.preset])
+    for field_name in scale:
+        if getattr(args, field_name) is not None:
+            scale[field_name] = getattr(args, field_name)
+    started = time.perf_counter()
+    generated = generate_building_files(args.output_dir, BuildingScale(**scale), seed=args.seed, name=args.name)
+    print(
+        f"Generated {generated.scale.buildings} buildings, {generated.scale.total_rtus} RTUs, {generated.scale.rooms} rooms, "
+        f"{generated.desks} desks ({generated.triples} triples) in {time.perf_counter() - started:.2f}s"
+    )
+    print(f"Manifest written to {generated.manifest_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from typing import Optional, List, Dict, Union, Iterator
+
+import pandas as pd
+
+# Trace levels: OFF records nothing, INFO aggregates span timings and counters,
+# DEBUG also prints the "DEBUG:" progress lines.
+OFF: int = 0
+INFO: int = 1
+DEBUG: int = 2
+LEVELS: Dict[str, int] = {"off": OFF, "info": INFO, "debug": DEBUG}
+
+
+def parse_level(level: Union[int, str]) -> int:
+    if isinstance(level, int):
+        return level
+    try:
+        return LEVELS[level.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown trace level {level!r}; expected one of {sorted(LEVELS)}") from None
+
+
+@dataclass
+class SpanStats:
+    """Aggregated timings of every run of one named span."""
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    min_seconds: float = float("inf")
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "started")
+
+    def __init__(self, tracer: "Tracer", name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.tracer.record(self.name, time.perf_counter() - self.started)
+
+
+# Handed out by span() while tracing is off; entering it costs next to nothing
+_NULL_SPAN = nullcontext()
+
+
+class Tracer:
+    """
+    Collects named span timings and counters in process.
+
+    Spans are aggregated by name (calls, total, min and max time) rather than
+    kept one by one, so a long-running app holds a fixed amount of trace
+    data. With the level below INFO span() hands back a shared no-op context
+    and count() returns right away.
+    """
+
+    def __init__(self, level: Union[int, str] = OFF):
+        self.level = parse_level(level)
+        self._spans: Dict[str, SpanStats] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def enabled(self, level: int = INFO) -> bool:
+        return self.level >= level
+
+    def span(self, name: str, detail: Optional[str] = None):
+        """Times the with-block under name, or "name[detail]" when detail is given."""
+        if self.level < INFO:
+            return _NULL_SPAN
+        return _Span(self, name if detail is None else f"{name}[{detail}]")
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = SpanStats(name)
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.min_seconds = min(stats.min_seconds, seconds)
+            stats.max_seconds = max(stats.max_seconds, seconds)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.level < INFO:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def debug(self, message: str) -> None:
+        if self.level >= DEBUG:
+            print(f"DEBUG: {message}")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def span_stats(self) -> List[SpanStats]:
+        """The span timings, longest total first."""
+        with self._lock:
+            return sorted((SpanStats(**asdict(s)) for s in self._spans.values()), key=lambda s: (-s.seconds, s.name))
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """The span timings as a DataFrame, longest total first."""
+        return pd.DataFrame(
+            [
+                {"span": s.name, "calls": s.calls, "seconds": s.seconds, "mean_seconds": s.mean_seconds,
+                 "min_seconds": s.min_seconds, "max_seconds": s.max_seconds}
+                for s in self.span_stats()
+            ],
+            columns=["span", "calls", "seconds", "mean_seconds", "min_seconds", "max_seconds"],
+        )
+
+    def records(self) -> Dict[str, Dict[str, float]]:
+        """Span timings and counters as plain dicts (picklable, JSON-ready)."""
+        return {
+            "spans": {s.name: {"calls": s.calls, "seconds": s.seconds} for s in self.span_stats()},
+            "counters": self.counters(),
+        }
+
+    def format(self, limit: Optional[int] = None) -> str:
+        spans = self.span_stats()
+        lines = [f"Trace spans (of {len(spans)}):"]
+        for s in spans[:limit]:
+            lines.append(f"  {s.seconds * 1000:10.1f} ms  {s.calls:6d} calls  {s.mean_seconds * 1000:9.2f} ms/call  {s.name}")
+        counters = self.counters()
+        if counters:
+            lines.append("Trace counters:")
+            lines.extend(f"  {value:10d}  {name}" for name, value in counters.items())
+        return "\n".join(lines)
+
+
+# The process-wide tracer; C4SB_TRACE=info|debug turns it on from the start
+_tracer = Tracer(os.environ.get("C4SB_TRACE", "off"))
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_trace_level(level: Union[int, str]) -> None:
+    _tracer.level = parse_level(level)
+
+
+def span(name: str, detail: Optional[str] = None):
+    """Times the with-block on the process-wide tracer (see Tracer.span)."""
+    if _tracer.level < INFO:
+        return _NULL_SPAN
+    return _Span(_tracer, name if detail is None else f"{name}[{detail}]")
+
+
+def count(name: str, n: int = 1) -> None:
+    if _tracer.level >= INFO:
+        _tracer.count(name, n)
+
+
+def debug_enabled() -> bool:
+    """Whether debug() prints; guard messages that are costly to build (e.g. len(graph)) with it."""
+    return _tracer.level >= DEBUG
+
+
+def debug(message: str) -> None:
+    if _tracer.level >= DEBUG:
+        print(f"DEBUG: {message}")
+
+
+@contextmanager
+def tracing(level: Union[int, str] = INFO, reset: bool = True) -> Iterator[Tracer]:
+    """
+    Raises the process-wide trace level to at least level within the block
+    (clearing earlier timings unless reset is False) and yields the tracer.
+    """
+    previous = _tracer.level
+    if reset:
+        _tracer.reset()
+    _tracer.level = max(previous, parse_level(level))
+    try:
+        yield _tracer
+    finally:
+        _tracer.level = previous
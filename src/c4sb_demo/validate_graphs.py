@@ -1,6 +1,40 @@
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Optional, List, Dict, Set, Tuple, Any, Sequence, Iterator, Iterable
 from rdflib import Graph
-from pyshacl import validate
+from rdflib.namespace import SH
+from pyshacl import Validator
+from pyshacl.constraints.sparql.sparql_based_constraints import SPARQLBasedConstraint
+from pyshacl.monkey import apply_patches
+from pyshacl.shape import Shape
+from pyshacl.shapes_graph import ShapesGraph
+from rdflib.term import Node
+
+from c4sb_demo.graph_cache import parse_source
+from c4sb_demo.query_cache import prepare_cached
+from c4sb_demo.rdfs_closure import OntologyClosure, get_ontology_closure
+from c4sb_demo.validation_profile import (
+    ResultCallback,
+    ValidationProfile,
+    format_profile,
+    pyshacl_patch_lock,
+    result_record,
+    validation_hooks,
+)
+
+try:  # pyshacl >= 0.30 only validates its own DataGraph wrapper
+    from pyshacl.graph_abstraction import DataGraph
+except ImportError:
+    DataGraph = None
 
 # Define project root to construct absolute paths
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
@@ -18,99 +52,467 @@ ASHRAE_DATA_SHAPES_FILE: Path = PROJECT_ROOT / "data" / "validations" / "ashrae-
 ASHRAE_MODEL_SHAPES_FILE: Path = PROJECT_ROOT / "data" / "validations" / "ashrae-223" / "model.shapes.ttl"
 ASHRAE_SCHEMA_SHAPES_FILE: Path = PROJECT_ROOT / "data" / "validations" / "ashrae-223" / "schema.shapes.ttl"
 
+# Define paths for the ontologies (class hierarchies) behind each shapes set
+BRICK_ONTOLOGY_FILE: Path = PROJECT_ROOT / "data" / "validations" / "brick" / "Brick.ttl"
+REC_ONTOLOGY_FILE: Path = REC_SHACL_FILE  # rec.ttl holds both the REC classes and their shapes
+ASHRAE_ONTOLOGY_FILE: Path = PROJECT_ROOT / "data" / "223p.ttl"
+
+@contextmanager
+def _prepared_sparql_constraints():
+    """
+    pyshacl re-parses an sh:sparql constraint's query text for every focus node;
+    within this block the parsed query is taken from the prepared-query cache.
+    Callers hold pyshacl_patch_lock.
+    """
+    original = SPARQLBasedConstraint._validate_sparql_query
+
+    def validate_prepared(self, query, init_binds, target_graph):
+        return original(self, prepare_cached(query) if isinstance(query, str) else query, init_binds, target_graph)
+
+    SPARQLBasedConstraint._validate_sparql_query = validate_prepared
+    try:
+        yield
+    finally:
+        SPARQLBasedConstraint._validate_sparql_query = original
+
+
+@contextmanager
+def _restricted_focus_nodes(focus_nodes: Optional[Set[Node]]):
+    """
+    Within this block shapes only validate the focus nodes (from their own
+    targets) that are in focus_nodes. Unlike pyshacl's focus_nodes option this
+    leaves value nodes checked through sh:node and friends alone, and it also
+    works for blank nodes. Callers hold pyshacl_patch_lock.
+    """
+    if focus_nodes is None:
+        yield
+        return
+    original = Shape.focus_nodes
+
+    def restricted(self, data_graph, debug=False):
+        return {node for node in original(self, data_graph, debug=debug) if node in focus_nodes}
+
+    Shape.focus_nodes = restricted
+    try:
+        yield
+    finally:
+        Shape.focus_nodes = original
+
+
+class ShapesValidator:
+    """
+    A SHACL shapes set loaded and analyzed once, for validating any number of data graphs.
+
+    The shape files are parsed (through the parsed-graph cache) into one shapes
+    graph, and pyshacl's ShapesGraph is built from it up front: the shapes are
+    harvested with their property paths, and SHACL-AF custom constraint
+    components are resolved. validate() then reuses all of it, and the SPARQL
+    queries of sh:sparql constraints are parsed once rather than per focus
+    node, so each data graph only pays for its own inference and constraint
+    evaluation.
+
+    With inference='rdfs' (the default) the RDFS closure of the ontology files
+    (none by default) comes from the closure cache, and only the entailments of
+    the data graph are computed per validation; the result is the same as
+    pyshacl's inference='rdfs' with the ontology as ont_graph.
+    """
+
+    def __init__(
+        self,
+        shacl_graph_paths: Sequence[Path],
+        inference: str = 'rdfs',
+        advanced: bool = True,
+        allow_infos: bool = True,
+        allow_warnings: bool = True,
+        abort_on_first: bool = False,
+        ontology_graph_paths: Optional[Sequence[Path]] = None
+    ):
+        self.shacl_graph_paths = [Path(p) for p in shacl_graph_paths]
+        self.ontology_graph_paths = [Path(p) for p in ontology_graph_paths or []]
+        self.options: Dict[str, Any] = dict(
+            inference=inference,
+            advanced=advanced,
+            allow_infos=allow_infos,
+            allow_warnings=allow_warnings,
+            abort_on_first=abort_on_first,
+            use_js=False,
+            debug=False,
+        )
+        self.shacl_graph = Graph()
+        for shacl_path in self.shacl_graph_paths:
+            parse_source(self.shacl_graph, shacl_path, "turtle")
+        apply_patches()
+        self.shapes_graph = ShapesGraph(self.shacl_graph)
+        self.shapes = list(self.shapes_graph.shapes)  # Harvests every shape and its path
+        self.shapes_graph.custom_constraints  # Resolves sh:ConstraintComponent definitions
+        self.ontology_closure: Optional[OntologyClosure] = None
+        self.ontology_graph: Optional[Graph] = None
+        if inference == 'rdfs':
+            self.ontology_closure = get_ontology_closure(self.ontology_graph_paths)
+        elif self.ontology_graph_paths:
+            # Other inference modes are left to pyshacl, which mixes the ontology in itself
+            self.ontology_graph = Graph()
+            for ontology_path in self.ontology_graph_paths:
+                parse_source(self.ontology_graph, ontology_path, "turtle")
+
+    def new_profile(self) -> ValidationProfile:
+        return ValidationProfile(self.shacl_graph)
+
+    def validate(
+        self,
+        data_graph: Graph,
+        focus_nodes: Optional[Iterable[Node]] = None,
+        profile: Optional[ValidationProfile] = None,
+        on_result: Optional[ResultCallback] = None
+    ) -> Tuple[bool, Graph, str]:
+        """
+        Validates data_graph (left unmodified); returns (conforms, results_graph, results_text)
+        like pyshacl.validate. With focus_nodes only those of the targeted nodes are validated.
+        Shape and constraint timings are added to profile, and on_result receives each
+        result (see validation_profile.result_record) as soon as its shape is done.
+        """
+        options = dict(self.options)
+        pre_inferenced = self.ontology_closure is not None
+        if pre_inferenced:
+            # A fresh graph with the data entailed on top of the cached ontology closure
+            data_graph = self.ontology_closure.entail(data_graph)
+            options["inplace"] = True
+        dg = DataGraph.from_rdflib(data_graph) if DataGraph is not None else data_graph
+        validator = Validator(
+            dg, shacl_graph=self.shacl_graph, ont_graph=self.ontology_graph,
+            options=options, pre_inferenced=pre_inferenced,
+        )
+        validator.shacl_graph = self.shapes_graph
+        focus = set(focus_nodes) if focus_nodes is not None else None
+        # The patches below are process-wide, and advanced mode registers SHACL
+        # functions and rules on the shared ShapesGraph, so validations take turns
+        with pyshacl_patch_lock, _prepared_sparql_constraints(), _restricted_focus_nodes(focus), \
+                validation_hooks(profile, on_result):
+            return validator.run()
+
+
+_shapes_validators: Dict[Tuple, ShapesValidator] = {}
+
+
+def get_shapes_validator(shacl_graph_paths: Sequence[Path], **options) -> ShapesValidator:
+    """
+    Returns the ShapesValidator for shacl_graph_paths and options, building it on
+    first use. It is rebuilt when one of the shape or ontology files has changed on disk.
+    """
+    paths = [Path(p) for p in shacl_graph_paths]
+    ontology_paths = [Path(p) for p in options.pop("ontology_graph_paths", None) or []]
+    key = (
+        tuple((str(p.resolve()), p.stat().st_mtime_ns, p.stat().st_size) for p in paths),
+        tuple((str(p.resolve()), p.stat().st_mtime_ns, p.stat().st_size) for p in ontology_paths),
+        tuple(sorted(options.items())),
+    )
+    shapes_validator = _shapes_validators.get(key)
+    if shapes_validator is None:
+        shapes_validator = ShapesValidator(paths, ontology_graph_paths=ontology_paths, **options)
+        _shapes_validators[key] = shapes_validator
+    return shapes_validator
+
+
+# Named shape sets c4sb-validate can validate data files against
+SHAPE_PROFILES: Dict[str, List[Path]] = {
+    "brick": [BRICK_SHACL_FILE],
+    "rec": [REC_SHACL_FILE],
+    "ashrae-223": [ASHRAE_DATA_SHAPES_FILE, ASHRAE_MODEL_SHAPES_FILE, ASHRAE_SCHEMA_SHAPES_FILE],
+}
+
+# Ontologies whose RDFS closure c4sb-validate --with-ontology adds to each profile's data
+PROFILE_ONTOLOGIES: Dict[str, List[Path]] = {
+    "brick": [BRICK_ONTOLOGY_FILE],
+    "rec": [REC_ONTOLOGY_FILE],
+    "ashrae-223": [ASHRAE_ONTOLOGY_FILE],
+}
+
+# (data file, profile, display name) validated when c4sb-validate gets no data files
+DEFAULT_FRAGMENTS: List[Tuple[Path, str, str]] = [
+    (BRICK_DATA_FILE, "brick", "Brick Model (brick-building-simple.ttl)"),
+    (REC_DATA_FILE, "rec", "RealEstateCore Model (rec-building-simple.ttl)"),
+    (ASHRAE_DATA_FILE, "ashrae-223", "ASHRAE 223 Model (ashrae-223-rtu.ttl)"),
+]
+
+
+@dataclass
+class ValidationReport:
+    """Outcome of validating one data file against one shapes set; picklable so workers can return it."""
+    data_path: Path
+    shacl_graph_paths: List[Path]
+    profile: str = ""
+    graph_name: str = ""
+    conforms: Optional[bool] = None
+    results_text: str = ""
+    shapes: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+    # Filled in by structured validation (see validate_file)
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    shape_timings: List[Dict[str, Any]] = field(default_factory=list)
+    constraint_timings: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.conforms)
+
+
+def validate_file(
+    data_graph_path: Path,
+    shacl_graph_paths: Sequence[Path],
+    profile: str = "",
+    graph_name: str = "",
+    ontology_graph_paths: Optional[Sequence[Path]] = None,
+    shard_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    structured: bool = False,
+    on_result: Optional[ResultCallback] = None
+) -> ValidationReport:
+    """
+    Validates one data file with the cached ShapesValidator of shacl_graph_paths,
+    with the RDFS closure of ontology_graph_paths (if any) added to the data.
+    With shard_size the data graph is validated in shards of that many focus
+    nodes by max_workers processes (see sharded_validation).
+
+    With structured=True the report also gets every result as a record, each
+    passed to on_result as soon as its shape is validated, and the per-shape and
+    per-constraint timings (not collected from shard workers).
+    """
+    started = time.perf_counter()
+    report = ValidationReport(Path(data_graph_path), [Path(p) for p in shacl_graph_paths], profile, graph_name or str(data_graph_path))
+    try:
+        if not report.data_path.exists():
+            report.error = f"Data graph file not found: {data_graph_path}"
+            return report
+        missing = [str(p) for p in report.shacl_graph_paths if not p.exists()]
+        if missing:
+            report.error = f"SHACL graph file(s) not found: {missing}"
+            return report
+        ontology_paths = [Path(p) for p in ontology_graph_paths or []]
+        missing = [str(p) for p in ontology_paths if not p.exists()]
+        if missing:
+            report.error = f"Ontology file(s) not found: {missing}"
+            return report
+        try:
+            # Parsed and analyzed once per shapes set (and process), then reused for every data graph
+            shapes_validator = get_shapes_validator(report.shacl_graph_paths, ontology_graph_paths=ontology_paths)
+        except Exception as e:
+            report.error = f"Error loading SHACL graphs {[str(p) for p in report.shacl_graph_paths]}: {e}"
+            return report
+        report.shapes = len(shapes_validator.shapes)
+        try:
+            data_graph = Graph().parse(str(data_graph_path), format="turtle")
+        except Exception as e:
+            report.error = f"Error loading graphs for {report.graph_name}: {e}"
+            return report
+
+        def collect(record: Dict[str, Any]) -> None:
+            record = {"data_path": str(report.data_path), "profile": report.profile, **record}
+            report.results.append(record)
+            if on_result is not None:
+                on_result(record)
+
+        try:
+            # Same settings as pyshacl.validate(inference='rdfs', advanced=True, allow_infos/warnings=True)
+            if shard_size:
+                from c4sb_demo.sharded_validation import validate_sharded  # It builds on this module
+                conforms, results_graph, results_text = validate_sharded(
+                    shapes_validator, data_graph, shard_size=shard_size, max_workers=max_workers
+                )
+                if structured:
+                    for result in results_graph.objects(None, SH.result):
+                        collect(result_record(result, list(results_graph.triples((result, None, None)))))
+            elif structured:
+                profile = shapes_validator.new_profile()
+                conforms, _, results_text = shapes_validator.validate(data_graph, profile=profile, on_result=collect)
+                report.shape_timings, report.constraint_timings = profile.records()
+            else:
+                conforms, _, results_text = shapes_validator.validate(data_graph)
+            report.conforms = bool(conforms)
+            report.results_text = results_text
+        except Exception as e:
+            report.error = f"Error during validation for {report.graph_name}: {e}"
+            traceback.print_exc()
+        return report
+    finally:
+        report.seconds = time.perf_counter() - started
+
+
+def print_report(report: ValidationReport) -> None:
+    print(f"--- Validating {report.graph_name} ---")
+    if report.shapes:
+        print(f"Using {report.shapes} shapes from: {[str(p) for p in report.shacl_graph_paths]}")
+    print(f"Data graph: {report.data_path}")
+    if report.error:
+        print(f"ERROR: {report.error}")
+    else:
+        print(f"Conforms: {report.conforms}")
+        if not report.conforms:
+            print("Validation Results:")
+            print(report.results_text)
+        else:
+            print(f"{report.graph_name} is valid according to the SHACL shapes.")
+    if report.shape_timings:
+        print(format_profile(report.shape_timings, report.constraint_timings))
+    print(f"Validated in {report.seconds:.2f}s")
+    print("-" * 30 + "\n")
+
+
 def validate_graph_fragment(data_graph_path, shacl_graph_paths, graph_name): # Modified to accept a list of SHACL paths
     """
-    Validates a data graph against one or more SHACL shapes graphs.
+    Validates a data graph against one or more SHACL shapes graphs and prints the report.
 
     Args:
         data_graph_path (Path): Path to the data graph file.
         shacl_graph_paths (list[Path]): List of paths to the SHACL shapes graph files.
         graph_name (str): Name of the graph for display purposes.
     """
-    print(f"--- Validating {graph_name} ---")
-    if not data_graph_path.exists():
-        print(f"ERROR: Data graph file not found: {data_graph_path}")
-        print("-" * 30 + "\n")
-        return
-    
-    combined_shacl_graph = Graph()
-    all_shacl_files_found = True
-    for shacl_path in shacl_graph_paths:
-        if not shacl_path.exists():
-            print(f"ERROR: SHACL graph file not found: {shacl_path}")
-            all_shacl_files_found = False
-        else:
-            print(f"Loading SHACL graph: {shacl_path}")
-            try:
-                combined_shacl_graph.parse(str(shacl_path), format="turtle")
-            except Exception as e:
-                print(f"Error loading SHACL graph {shacl_path}: {e}")
-                all_shacl_files_found = False # Treat loading error as file not found for simplicity
-    
-    if not all_shacl_files_found:
-        print("One or more SHACL files could not be loaded. Aborting validation for this graph.")
-        print("-" * 30 + "\n")
-        return
+    report = validate_file(data_graph_path, shacl_graph_paths, graph_name=graph_name)
+    print_report(report)
+    return report
 
-    print(f"Data graph: {data_graph_path}")
-    # print(f"SHACL graph(s): {[str(p) for p in shacl_graph_paths]}") # Already printed above
 
-    try:
-        data_graph = Graph().parse(str(data_graph_path), format="turtle")
-        # shacl_graph is now combined_shacl_graph
-    except Exception as e:
-        print(f"Error loading graphs for {graph_name}: {e}")
-        print("-" * 30 + "\n")
+ValidationJob = Tuple[Path, List[Path], str, str, List[Path]]
+
+
+def _validate_job(job: ValidationJob, structured: bool = False) -> ValidationReport:
+    return validate_file(*job, structured=structured)
+
+
+def iter_validation_reports(
+    jobs: Sequence[ValidationJob],
+    max_workers: Optional[int] = None,
+    structured: bool = False,
+    on_result: Optional[ResultCallback] = None
+) -> Iterator[ValidationReport]:
+    """
+    Runs validate_file for every (data file, shape files, profile, name, ontology
+    files) job in a process pool of max_workers (default: one per CPU). Reports
+    are yielded in job order, each as soon as it and the jobs before it have
+    finished. Every worker keeps its ShapesValidators, so a shapes set is loaded
+    at most once per worker. on_result only streams the results of structured
+    validations run in this process (max_workers=1 or a single job); otherwise
+    they come with the reports.
+    """
+    if len(jobs) <= 1 or max_workers == 1:
+        for job in jobs:
+            yield validate_file(*job, structured=structured, on_result=on_result)
         return
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(partial(_validate_job, structured=structured), jobs)
 
-    try:
-        conforms, results_graph, results_text = validate(
-            data_graph,
-            shacl_graph=combined_shacl_graph, # Use the combined graph
-            ont_graph=None,  # pyshacl will load owl:imports from shacl_graph if present
-            inference='rdfs', 
-            abort_on_first=False,
-            allow_infos=True,
-            allow_warnings=True,
-            meta_shacl=False,
-            advanced=True,
-            js=False,
-            debug=False
-        )
 
-        print(f"Conforms: {conforms}")
-        if not conforms:
-            print("Validation Results:")
-            # For detailed Turtle output of violations, uncomment below:
-            # results_graph.serialize(destination=sys.stdout, format="turtle")
-            print(results_text)
+def _data_files(paths: Sequence[Path]) -> List[Path]:
+    """Expands directories into the Turtle files below them."""
+    files: List[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.rglob("*.ttl")))
         else:
-            print(f"{graph_name} is valid according to the SHACL shapes.")
-        
-    except Exception as e:
-        print(f"Error during validation for {graph_name}: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
-        print("-" * 30 + "\n")
+            files.append(path)
+    return files
+
+
+def report_records(report: ValidationReport, with_results: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    The NDJSON lines of a report: its results (unless they were already streamed),
+    its shape and constraint timings and a summary, each tagged with a "type".
+    """
+    context = {"data_path": str(report.data_path), "profile": report.profile}
+    if with_results:
+        for record in report.results:
+            yield {"type": "result", **record}
+    for timing in report.shape_timings:
+        yield {"type": "shape_timing", **context, **timing}
+    for timing in report.constraint_timings:
+        yield {"type": "constraint_timing", **context, **timing}
+    yield {
+        "type": "summary", **context, "conforms": report.conforms, "results": len(report.results),
+        "seconds": report.seconds, "error": report.error,
+    }
+
 
-def main():
+def main(argv: Optional[Sequence[str]] = None) -> int:
     """
-    Main function to validate graph fragments against SHACL shapes.
+    Validates data files against SHACL shape profiles in parallel.
+
+    Without data files the Brick, REC and ASHRAE 223 demo fragments are validated
+    against their own profiles. Returns 0 when everything conforms, 1 otherwise.
     """
-    print("Starting SHACL validation of graph fragments...\n")
+    parser = argparse.ArgumentParser(description="Validate RDF data files against SHACL shape profiles.")
+    parser.add_argument("data", nargs="*", type=Path, help="Data files, or directories of *.ttl files, to validate")
+    parser.add_argument("--profile", action="append", default=[], choices=sorted(SHAPE_PROFILES),
+                        help="Shape profile to validate every data file against (repeatable)")
+    parser.add_argument("--shapes", action="append", default=[], type=Path,
+                        help="SHACL file of a 'custom' profile (repeatable; the files are combined)")
+    parser.add_argument("--with-ontology", action="store_true",
+                        help="Add the RDFS closure of each profile's ontology (Brick, REC, 223P) to the data")
+    parser.add_argument("--ontology", action="append", default=[], type=Path,
+                        help="Ontology file whose RDFS closure is added to every data file (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: one per CPU)")
+    parser.add_argument("--shard-size", type=int, default=None,
+                        help="Validate each data file in shards of this many focus nodes, in parallel "
+                             "(for very large data graphs; files are then validated one after the other)")
+    parser.add_argument("--ndjson", type=Path, default=None,
+                        help="Write one JSON line per result, shape and constraint timing and file summary")
+    parser.add_argument("--profile-shapes", action="store_true",
+                        help="Time every shape and constraint and print the slowest ones")
+    args = parser.parse_args(argv)
+
+    def ontologies(profile: str) -> List[Path]:
+        # The closures are cached on disk, so only the first run pays for a large ontology
+        return (PROFILE_ONTOLOGIES.get(profile, []) if args.with_ontology else []) + args.ontology
 
-    validate_graph_fragment(BRICK_DATA_FILE, [BRICK_SHACL_FILE], "Brick Model (brick-building-simple.ttl)")
-    validate_graph_fragment(REC_DATA_FILE, [REC_SHACL_FILE], "RealEstateCore Model (rec-building-simple.ttl)")
-    
-    ashrae_shacl_files = [
-        ASHRAE_DATA_SHAPES_FILE,
-        ASHRAE_MODEL_SHAPES_FILE,
-        ASHRAE_SCHEMA_SHAPES_FILE
-    ]
-    validate_graph_fragment(ASHRAE_DATA_FILE, ashrae_shacl_files, "ASHRAE 223 Model (ashrae-223-rtu.ttl)")
+    if args.data:
+        profiles = {name: SHAPE_PROFILES[name] for name in args.profile}
+        if args.shapes:
+            profiles["custom"] = args.shapes
+        if not profiles:
+            parser.error("data files need at least one --profile or --shapes")
+        jobs = [
+            (data_file, shacl_files, profile, f"{data_file} [{profile}]", ontologies(profile))
+            for data_file in _data_files(args.data)
+            for profile, shacl_files in profiles.items()
+        ]
+    else:
+        jobs = [
+            (data_file, SHAPE_PROFILES[profile], profile, name, ontologies(profile))
+            for data_file, profile, name in DEFAULT_FRAGMENTS
+        ]
 
-    print("SHACL validation process complete.")
+    print(f"Starting SHACL validation of {len(jobs)} data file/profile pairs...\n")
+    started = time.perf_counter()
+    failed = 0
+    structured = bool(args.ndjson or args.profile_shapes)
+    ndjson = open(args.ndjson, "w") if args.ndjson else None
+
+    def write_line(record: Dict[str, Any]) -> None:
+        ndjson.write(json.dumps(record, default=str) + "\n")
+        ndjson.flush()
+
+    # Results of validations run in this process are written as each shape finishes
+    streamed = ndjson is not None and not args.shard_size and (len(jobs) <= 1 or args.workers == 1)
+    on_result = (lambda record: write_line({"type": "result", **record})) if streamed else None
+    try:
+        if args.shard_size:
+            reports = (
+                validate_file(*job, shard_size=args.shard_size, max_workers=args.workers, structured=structured)
+                for job in jobs
+            )
+        else:
+            reports = iter_validation_reports(jobs, max_workers=args.workers, structured=structured, on_result=on_result)
+        for report in reports:
+            print_report(report)
+            failed += not report.ok
+            if ndjson is not None:
+                for record in report_records(report, with_results=not streamed):
+                    write_line(record)
+    finally:
+        if ndjson is not None:
+            ndjson.close()
+    print(f"SHACL validation process complete: {len(jobs) - failed}/{len(jobs)} conform ({time.perf_counter() - started:.2f}s).")
+    return 1 if failed else 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
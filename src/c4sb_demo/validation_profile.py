@@ -0,0 +1,249 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Optional, List, Dict, Tuple, Any, Callable, Iterator
+
+import pandas as pd
+from rdflib import Graph, BNode
+from rdflib.namespace import RDF, SH
+from rdflib.term import Node
+from pyshacl.constraints.constraint_component import ConstraintComponent
+from pyshacl.shape import Shape
+
+# Report properties copied into a result record, keyed by their record field
+RESULT_FIELDS: Dict[str, Node] = {
+    "focus_node": SH.focusNode,
+    "result_path": SH.resultPath,
+    "value": SH.value,
+    "source_shape": SH.sourceShape,
+    "constraint_component": SH.sourceConstraintComponent,
+    "severity": SH.resultSeverity,
+    "message": SH.resultMessage,
+}
+
+ResultCallback = Callable[[Dict[str, Any]], None]
+
+# Held while any pyshacl class is patched (here and in validate_graphs), since
+# the patches are process-wide; reentrant so the patches can be nested
+pyshacl_patch_lock = threading.RLock()
+
+
+def _local_name(node: Node) -> str:
+    return str(node).split("#")[-1].split("/")[-1]
+
+
+def result_record(result_node: Node, result_triples: List[Tuple[Node, Node, Node]]) -> Dict[str, Any]:
+    """A JSON-ready dict of one validation result from the (node, parts) pyshacl reports it with."""
+    record: Dict[str, Any] = {}
+    for name, predicate in RESULT_FIELDS.items():
+        # pyshacl gives data graph terms as (graph, term) pairs
+        values = [o[1] if isinstance(o, tuple) else o for s, p, o in result_triples if s == result_node and p == predicate]
+        if not values:
+            continue
+        if name in ("constraint_component", "severity"):
+            record[name] = _local_name(values[0])
+        elif name == "message":
+            record[name] = " ".join(sorted(str(v) for v in values))
+        else:
+            record[name] = None if isinstance(values[0], BNode) else str(values[0])
+    return record
+
+
+@dataclass
+class ShapeTiming:
+    shape: str
+    calls: int = 0
+    focus_nodes: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class ConstraintTiming:
+    shape: str
+    component: str
+    calls: int = 0
+    focus_nodes: int = 0
+    seconds: float = 0.0
+
+
+class ValidationProfile:
+    """
+    Evaluation time and focus node counts per shape and per constraint, collected
+    by validation_hooks over one or more validations with the same shapes graph.
+
+    Times are inclusive: a shape's time includes its constraints, and a sh:node
+    or sh:property constraint's time includes the shapes it validates. Shapes
+    reached that way (blank node property shapes in particular) are listed
+    separately, labelled by the shape that holds them and their path.
+    """
+
+    def __init__(self, shacl_graph: Graph):
+        self.shacl_graph = shacl_graph
+        self._shapes: Dict[Node, ShapeTiming] = {}
+        self._constraints: Dict[Tuple[Node, str], ConstraintTiming] = {}
+        self._labels: Dict[Node, str] = {}
+
+    def _holder(self, node: Node) -> Tuple[Optional[Node], str]:
+        # The shape that refers to a blank node shape and how: "sh:node", "sh:or[1]", ...
+        graph = self.shacl_graph
+        for holder, predicate in graph.subject_predicates(node):
+            if predicate != RDF.first:
+                return holder, predicate.n3(graph.namespace_manager)
+            # Member of an RDF list (sh:and, sh:or, sh:xone): walk back to its head
+            cell, index = holder, 0
+            previous = graph.value(predicate=RDF.rest, object=cell)
+            while previous is not None:
+                cell, index = previous, index + 1
+                previous = graph.value(predicate=RDF.rest, object=cell)
+            for list_holder, list_predicate in graph.subject_predicates(cell):
+                return list_holder, f"{list_predicate.n3(graph.namespace_manager)}[{index}]"
+        return None, ""
+
+    def shape_label(self, node: Node) -> str:
+        """
+        A readable name for a shape. Blank node shapes are named after the shape
+        holding them and their path, e.g. "ex:RoomShape / ex:desk" for a property
+        shape or "ex:RoomShape / sh:or[1]" for a member of a list.
+        """
+        label = self._labels.get(node)
+        if label is None:
+            namespace_manager = self.shacl_graph.namespace_manager
+            if isinstance(node, BNode):
+                self._labels[node] = "_"  # Guards against cycles
+                holder, via = self._holder(node)
+                path = self.shacl_graph.value(node, SH.path)
+                parts = [self.shape_label(holder) if holder is not None else "_"]
+                if path is not None:
+                    parts.append(path.n3(namespace_manager) if not isinstance(path, BNode) else "[path]")
+                elif via:
+                    parts.append(via)
+                label = " / ".join(parts)
+            else:
+                label = node.n3(namespace_manager)
+            self._labels[node] = label
+        return label
+
+    def add_shape(self, node: Node, focus_nodes: int, seconds: float) -> None:
+        timing = self._shapes.get(node)
+        if timing is None:
+            timing = self._shapes[node] = ShapeTiming(self.shape_label(node))
+        timing.calls += 1
+        timing.focus_nodes += focus_nodes
+        timing.seconds += seconds
+
+    def add_constraint(self, node: Node, component: str, focus_nodes: int, seconds: float) -> None:
+        timing = self._constraints.get((node, component))
+        if timing is None:
+            timing = self._constraints[(node, component)] = ConstraintTiming(self.shape_label(node), component)
+        timing.calls += 1
+        timing.focus_nodes += focus_nodes
+        timing.seconds += seconds
+
+    def shape_timings(self) -> List[ShapeTiming]:
+        """Shape timings, slowest first."""
+        return sorted(self._shapes.values(), key=lambda t: (-t.seconds, t.shape))
+
+    def constraint_timings(self) -> List[ConstraintTiming]:
+        """Constraint timings, slowest first."""
+        return sorted(self._constraints.values(), key=lambda t: (-t.seconds, t.shape, t.component))
+
+    def to_dataframes(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """The shape and constraint timings as DataFrames, slowest first."""
+        shapes = pd.DataFrame([asdict(t) for t in self.shape_timings()], columns=["shape", "calls", "focus_nodes", "seconds"])
+        constraints = pd.DataFrame(
+            [asdict(t) for t in self.constraint_timings()],
+            columns=["shape", "component", "calls", "focus_nodes", "seconds"],
+        )
+        return shapes, constraints
+
+    def records(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """The shape and constraint timings as plain dicts (picklable, JSON-ready), slowest first."""
+        return [asdict(t) for t in self.shape_timings()], [asdict(t) for t in self.constraint_timings()]
+
+
+def format_profile(shape_timings: List[Dict[str, Any]], constraint_timings: List[Dict[str, Any]], limit: int = 10) -> str:
+    """The slowest shapes and constraints of ValidationProfile.records() as text."""
+    lines = [f"Slowest shapes (of {len(shape_timings)}):"]
+    for t in shape_timings[:limit]:
+        lines.append(f"  {t['seconds'] * 1000:9.1f} ms  {t['calls']:6d} calls  {t['focus_nodes']:7d} focus nodes  {t['shape']}")
+    lines.append(f"Slowest constraints (of {len(constraint_timings)}):")
+    for t in constraint_timings[:limit]:
+        lines.append(
+            f"  {t['seconds'] * 1000:9.1f} ms  {t['calls']:6d} calls  {t['focus_nodes']:7d} focus nodes  "
+            f"{t['shape']} {t['component']}"
+        )
+    return "\n".join(lines)
+
+
+def _constraint_classes() -> Iterator[type]:
+    """Every ConstraintComponent subclass with its own evaluate method."""
+    pending = list(ConstraintComponent.__subclasses__())
+    seen = set()
+    while pending:
+        cls = pending.pop()
+        if cls in seen:
+            continue
+        seen.add(cls)
+        pending.extend(cls.__subclasses__())
+        if "evaluate" in cls.__dict__:
+            yield cls
+
+
+def _component_name(constraint: ConstraintComponent) -> str:
+    custom = getattr(getattr(constraint, "constraint", None), "node", None)
+    return _local_name(custom) if custom is not None else constraint.constraint_name()
+
+
+@contextmanager
+def validation_hooks(profile: Optional[ValidationProfile] = None, on_result: Optional[ResultCallback] = None):
+    """
+    Within this block pyshacl reports every shape and constraint evaluation to
+    profile, and passes each result of a top-level shape to on_result (as a
+    result_record) as soon as that shape has been validated.
+    """
+    if profile is None and on_result is None:
+        yield
+        return
+    with pyshacl_patch_lock:
+        original_validate = Shape.validate
+        originals = {cls: cls.__dict__["evaluate"] for cls in _constraint_classes()} if profile is not None else {}
+        focus_counts: List[int] = []  # Focus nodes of each shape evaluation in progress
+
+        def validate(self, executor, target_graph, focus=None, _evaluation_path=None):
+            started = time.perf_counter()
+            focus_counts.append(0)
+            try:
+                conforms, reports = original_validate(self, executor, target_graph, focus=focus, _evaluation_path=_evaluation_path)
+            finally:
+                focus_nodes = focus_counts.pop()
+                if profile is not None and (focus_nodes or focus is None):
+                    profile.add_shape(self.node, focus_nodes, time.perf_counter() - started)
+            if on_result is not None and focus is None:
+                # Shapes run without focus nodes are the top-level ones; nested results are in their sh:detail
+                for _, result_node, result_triples in reports:
+                    on_result(result_record(result_node, result_triples))
+            return conforms, reports
+
+        def timed(evaluate):
+            def evaluate_timed(self, executor, target_graph, focus_value_nodes, _evaluation_path):
+                started = time.perf_counter()
+                try:
+                    return evaluate(self, executor, target_graph, focus_value_nodes, _evaluation_path)
+                finally:
+                    if focus_counts:
+                        focus_counts[-1] = max(focus_counts[-1], len(focus_value_nodes))
+                    profile.add_constraint(
+                        self.shape.node, _component_name(self), len(focus_value_nodes), time.perf_counter() - started
+                    )
+            return evaluate_timed
+
+        Shape.validate = validate
+        for cls, evaluate in originals.items():
+            cls.evaluate = timed(evaluate)
+        try:
+            yield
+        finally:
+            Shape.validate = original_validate
+            for cls, evaluate in originals.items():
+                cls.evaluate = evaluate
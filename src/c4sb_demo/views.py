@@ -0,0 +1,236 @@
+import weakref
+from typing import Optional, Dict, Set, Tuple
+
+import pandas as pd
+import rdflib
+from rdflib import Literal
+from rdflib.namespace import XSD
+from rdflib.term import Node
+
+from c4sb_demo.graph_store import VersionedMemory
+from c4sb_demo.sparql_constants import REC_CORE, REC_PROPS, RDF_TYPE, VIEW
+from c4sb_demo.tracing import debug, debug_enabled
+
+Triple = Tuple[Node, Node, Node]
+
+# Predicates whose triples can change a room's aggregates
+_WATCHED_PREDICATES = {REC_CORE.containsAsset, RDF_TYPE, REC_PROPS.hasArea, REC_PROPS.hasValue}
+
+
+def _add_to(index: Dict[Node, Set[Node]], key: Node, value: Node) -> None:
+    index.setdefault(key, set()).add(value)
+
+
+def _discard_from(index: Dict[Node, Set[Node]], key: Node, value: Node) -> None:
+    values = index.get(key)
+    if values is not None:
+        values.discard(value)
+        if not values:
+            del index[key]
+
+
+def _numeric(value: Node) -> Optional[float]:
+    if isinstance(value, Literal):
+        try:
+            return float(value.toPython())
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class RoomAggregateView:
+    """
+    Materialized per-room desk count and floor area over a combined graph.
+
+    The aggregates are written back into the graph as view:deskCount
+    (xsd:integer) and view:area triples on each room, and are available through
+    desk_count / room_area / to_dataframe. When the graph is backed by a
+    VersionedMemory store the view registers itself as a change listener and
+    keeps both the lookups and the view triples current as triples are added
+    or removed; otherwise it is a one-off snapshot (call rebuild to refresh).
+
+    The rooms are the rec:Room instances plus anything that rec:containsAsset
+    or has a props:hasArea. A room's desk count is the number of distinct
+    rec:Desk assets it rec:containsAsset, written even when it is 0. Its area is
+    the props:hasValue of its props:hasArea node (or a literal props:hasArea),
+    the largest one if there are several.
+    """
+
+    def __init__(self, graph: rdflib.Graph, write_triples: bool = True):
+        self.graph = graph
+        self.write_triples = write_triples
+        self.assets_of_room: Dict[Node, Set[Node]] = {}
+        self.rooms_of_asset: Dict[Node, Set[Node]] = {}
+        self.desks: Set[Node] = set()
+        self.typed_rooms: Set[Node] = set()
+        self.area_nodes_of_room: Dict[Node, Set[Node]] = {}
+        self.rooms_of_area_node: Dict[Node, Set[Node]] = {}
+        self.values_of_area_node: Dict[Node, Set[Node]] = {}
+        self._desk_counts: Dict[Node, int] = {}
+        self._areas: Dict[Node, Node] = {}
+        self.rebuild()
+        store = graph.store
+        self.incremental = isinstance(store, VersionedMemory)
+        if self.incremental:
+            store.add_listener(self)
+
+    def detach(self) -> None:
+        """Stops tracking graph changes; the view triples stay in the graph."""
+        if self.incremental:
+            self.graph.store.remove_listener(self)
+            self.incremental = False
+
+    # Lookups
+
+    def desk_count(self, room: Node) -> int:
+        return self._desk_counts.get(room, 0)
+
+    def room_area(self, room: Node) -> Optional[Node]:
+        return self._areas.get(room)
+
+    def rooms(self) -> Set[Node]:
+        return set(self._desk_counts) | set(self._areas)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        rows = [
+            {"room": str(room), "desk_count": self.desk_count(room), "area": _numeric(self._areas.get(room))}
+            for room in sorted(self.rooms(), key=str)
+        ]
+        df = pd.DataFrame(rows, columns=["room", "desk_count", "area"])
+        return df.astype({"desk_count": "Int64", "area": "Float64"})
+
+    # Building and maintenance
+
+    def rebuild(self) -> None:
+        """Recomputes every room from a full scan of the graph."""
+        self.assets_of_room.clear()
+        self.rooms_of_asset.clear()
+        self.desks = set(self.graph.subjects(RDF_TYPE, REC_CORE.Desk))
+        self.typed_rooms = set(self.graph.subjects(RDF_TYPE, REC_CORE.Room))
+        self.area_nodes_of_room.clear()
+        self.rooms_of_area_node.clear()
+        self.values_of_area_node.clear()
+        for room, _, asset in self.graph.triples((None, REC_CORE.containsAsset, None)):
+            _add_to(self.assets_of_room, room, asset)
+            _add_to(self.rooms_of_asset, asset, room)
+        for room, _, area_node in self.graph.triples((None, REC_PROPS.hasArea, None)):
+            self._link_area_node(room, area_node)
+        stale = set(self._desk_counts) | set(self._areas)
+        self._desk_counts.clear()
+        self._areas.clear()
+        for room in stale | self.typed_rooms | set(self.assets_of_room) | set(self.area_nodes_of_room):
+            self._refresh(room)
+
+    def _link_area_node(self, room: Node, area_node: Node) -> None:
+        _add_to(self.area_nodes_of_room, room, area_node)
+        _add_to(self.rooms_of_area_node, area_node, room)
+        if area_node not in self.values_of_area_node and not isinstance(area_node, Literal):
+            for value in self.graph.objects(area_node, REC_PROPS.hasValue):
+                _add_to(self.values_of_area_node, area_node, value)
+
+    def _compute_area(self, room: Node) -> Optional[Node]:
+        candidates = []
+        for area_node in self.area_nodes_of_room.get(room, ()):
+            values = [area_node] if isinstance(area_node, Literal) else self.values_of_area_node.get(area_node, ())
+            for value in values:
+                number = _numeric(value)
+                if number is not None:
+                    candidates.append((number, str(value), value))
+        return max(candidates)[2] if candidates else None
+
+    def _is_room(self, node: Node) -> bool:
+        return node in self.typed_rooms or node in self.assets_of_room or node in self.area_nodes_of_room
+
+    def _refresh(self, room: Node) -> None:
+        is_room = self._is_room(room)
+        count = sum(1 for asset in self.assets_of_room.get(room, ()) if asset in self.desks)
+        area = self._compute_area(room)
+        if is_room:
+            self._desk_counts[room] = count
+        else:
+            self._desk_counts.pop(room, None)
+        if area is not None:
+            self._areas[room] = area
+        else:
+            self._areas.pop(room, None)
+        if self.write_triples:
+            self._write(room, VIEW.deskCount, Literal(count, datatype=XSD.integer) if is_room else None)
+            self._write(room, VIEW.area, area)
+
+    def _write(self, room: Node, predicate: Node, value: Optional[Node]) -> None:
+        if self.graph.value(room, predicate) == value:
+            return
+        self.graph.remove((room, predicate, None))
+        if value is not None:
+            self.graph.add((room, predicate, value))
+
+    # GraphChangeListener
+
+    def triple_added(self, triple: Triple) -> None:
+        self._on_change(triple, added=True)
+
+    def triple_removed(self, triple: Triple) -> None:
+        self._on_change(triple, added=False)
+
+    def _on_change(self, triple: Triple, added: bool) -> None:
+        s, p, o = triple
+        if p not in _WATCHED_PREDICATES:
+            return  # Includes the view's own view:* triples
+        affected: Set[Node] = set()
+        if p == REC_CORE.containsAsset:
+            if added:
+                _add_to(self.assets_of_room, s, o)
+                _add_to(self.rooms_of_asset, o, s)
+            else:
+                _discard_from(self.assets_of_room, s, o)
+                _discard_from(self.rooms_of_asset, o, s)
+            affected.add(s)
+        elif p == RDF_TYPE:
+            if o not in (REC_CORE.Desk, REC_CORE.Room):
+                return
+            members = self.desks if o == REC_CORE.Desk else self.typed_rooms
+            if added:
+                members.add(s)
+            elif (s, RDF_TYPE, o) not in self.graph:
+                members.discard(s)
+            if o == REC_CORE.Desk:
+                affected.update(self.rooms_of_asset.get(s, ()))
+            else:
+                affected.add(s)
+        elif p == REC_PROPS.hasArea:
+            if added:
+                self._link_area_node(s, o)
+            else:
+                _discard_from(self.area_nodes_of_room, s, o)
+                _discard_from(self.rooms_of_area_node, o, s)
+            affected.add(s)
+        else:  # props:hasValue
+            if s not in self.rooms_of_area_node:
+                return  # Not an area node (yet); linking it later reads its values
+            if added:
+                _add_to(self.values_of_area_node, s, o)
+            else:
+                _discard_from(self.values_of_area_node, s, o)
+            affected.update(self.rooms_of_area_node.get(s, ()))
+        for room in affected:
+            self._refresh(room)
+
+
+_room_views: "weakref.WeakKeyDictionary[rdflib.Graph, RoomAggregateView]" = weakref.WeakKeyDictionary()
+
+
+def materialize_room_views(graph: rdflib.Graph, write_triples: bool = True) -> RoomAggregateView:
+    """Builds (or rebuilds) the RoomAggregateView of graph and registers it for get_room_view."""
+    view = _room_views.get(graph)
+    if view is not None:
+        view.rebuild()
+        return view
+    view = RoomAggregateView(graph, write_triples=write_triples)
+    _room_views[graph] = view
+    if debug_enabled():
+        debug(f"Materialized room views for {len(view.rooms())} rooms.")
+    return view
+
+
+def get_room_view(graph: rdflib.Graph) -> Optional[RoomAggregateView]:
+    return _room_views.get(graph)
@@ -0,0 +1,357 @@
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Set, Tuple, Any
+
+import rdflib
+from rdflib import BNode, Literal, URIRef
+from rdflib.term import Node
+from pyvis.network import Network
+
+from c4sb_demo.sparql_constants import RDF_TYPE, RDFS_LABEL, SKOS_PREF_LABEL
+from c4sb_demo.tracing import span, count
+
+# Pyvis' own defaults for add_node, kept so the batched nodes look the same
+NODE_SHAPE: str = "dot"
+NODE_COLOR: str = "#97c2fc"
+FOCUS_COLOR: str = "#fb7e81"
+CLUSTER_COLOR: str = "#ffc966"
+
+# Level-of-detail defaults: graphs above FULL_RENDER_TRIPLE_LIMIT open on the
+# class overview; a neighbourhood shows at most DEFAULT_MAX_NODES nodes, and
+# CLUSTER_MIN_LEAVES or more leaves (or more than DEFAULT_MAX_FANOUT nodes)
+# of one kind on one node become a cluster
+FULL_RENDER_TRIPLE_LIMIT: int = 5000
+DEFAULT_HOPS: int = 1
+DEFAULT_MAX_NODES: int = 150
+DEFAULT_MAX_FANOUT: int = 25
+CLUSTER_MIN_LEAVES: int = 3
+CLUSTER_TITLE_MEMBERS: int = 20
+
+# (neighbour, predicate, whether the edge points away from the node)
+Adjacent = Tuple[Node, Node, bool]
+
+
+def fallback_label(node: Node) -> str:
+    """Display label of a node without rdfs:label/skos:prefLabel: the local name of a URI."""
+    if isinstance(node, BNode):
+        return f"_:{str(node)}"
+    if isinstance(node, URIRef):
+        label = str(node).split('#')[-1].split('/')[-1]
+        if not label and str(node).startswith("http"):
+            label = str(node)
+        return label
+    return str(node)
+
+
+@dataclass
+class GraphIndex:
+    """
+    Everything the visualizer needs from a graph, collected in one pass:
+    the rdfs:label/skos:prefLabel and rdf:type of each node, the literal
+    properties of each subject and the resource-to-resource edges, with nodes
+    in the order they are first seen.
+    """
+    nodes: Dict[Node, None] = field(default_factory=dict)  # Insertion-ordered set
+    edges: List[tuple] = field(default_factory=list)
+    literals: Dict[Node, List[tuple]] = field(default_factory=dict)
+    rdfs_labels: Dict[Node, str] = field(default_factory=dict)
+    skos_labels: Dict[Node, str] = field(default_factory=dict)
+    types: Dict[Node, List[Node]] = field(default_factory=dict)
+    _label_cache: Dict[Node, str] = field(default_factory=dict, repr=False)
+    _adjacency: Optional[Dict[Node, List[Adjacent]]] = field(default=None, repr=False)
+
+    @classmethod
+    def from_graph(cls, graph: rdflib.Graph) -> "GraphIndex":
+        index = cls()
+        nodes, edges, literals = index.nodes, index.edges, index.literals
+        rdfs_labels, skos_labels, types = index.rdfs_labels, index.skos_labels, index.types
+        for s, p, o in graph:
+            nodes[s] = None
+            if isinstance(o, Literal):
+                literals.setdefault(s, []).append((p, o))
+                if p == RDFS_LABEL:
+                    rdfs_labels.setdefault(s, str(o))
+                elif p == SKOS_PREF_LABEL:
+                    skos_labels.setdefault(s, str(o))
+            else:
+                nodes[o] = None
+                edges.append((s, p, o))
+                if p == RDF_TYPE:
+                    types.setdefault(s, []).append(o)
+        return index
+
+    def adjacency(self) -> Dict[Node, List[Adjacent]]:
+        """
+        Neighbours of each node along its resource edges in both directions,
+        built on first use. rdf:type edges are left out so classes do not
+        connect every instance to every other.
+        """
+        if self._adjacency is None:
+            adjacency: Dict[Node, List[Adjacent]] = {}
+            for s, p, o in self.edges:
+                if p == RDF_TYPE:
+                    continue
+                adjacency.setdefault(s, []).append((o, p, True))
+                adjacency.setdefault(o, []).append((s, p, False))
+            self._adjacency = adjacency
+        return self._adjacency
+
+    def primary_type(self, node: Node) -> Optional[Node]:
+        node_types = self.types.get(node)
+        return node_types[0] if node_types else None
+
+    def instances(self, cls: Node) -> List[Node]:
+        return [node for node, node_types in self.types.items() if cls in node_types]
+
+    def label(self, node: Node) -> str:
+        """rdfs:label, else skos:prefLabel, else the local name (same order as before)."""
+        label = self._label_cache.get(node)
+        if label is None:
+            label = self.rdfs_labels.get(node) or self.skos_labels.get(node) or fallback_label(node)
+            self._label_cache[node] = label
+        return label
+
+    def title(self, node: Node) -> str:
+        """Hover text of a node: its IRI followed by one line per literal property."""
+        lines = dict.fromkeys(f"{self.label(p)}: {str(o)}" for p, o in self.literals.get(node, ()))
+        return "\n".join([str(node), *lines])
+
+
+@dataclass
+class ClassSummary:
+    """One node of the class overview: a class and how many instances it has."""
+    cls: Node
+    instances: int
+
+
+@dataclass
+class ClassOverview:
+    """
+    The graph aggregated to its classes: instance counts per class and, per
+    (subject class, predicate, object class), the number of edges between
+    their instances. Resources without rdf:type are left out.
+    """
+    classes: List[ClassSummary]
+    links: Dict[Tuple[Node, Node, Node], int]
+
+    @classmethod
+    def from_index(cls, index: GraphIndex) -> "ClassOverview":
+        counts: Dict[Node, int] = {}
+        for node_types in index.types.values():
+            for node_type in node_types:
+                counts[node_type] = counts.get(node_type, 0) + 1
+        links: Dict[Tuple[Node, Node, Node], int] = {}
+        for s, p, o in index.edges:
+            if p == RDF_TYPE or s not in index.types or o not in index.types:
+                continue
+            for s_type in index.types[s]:
+                for o_type in index.types[o]:
+                    key = (s_type, p, o_type)
+                    links[key] = links.get(key, 0) + 1
+        classes = sorted((ClassSummary(c, n) for c, n in counts.items()), key=lambda c: (-c.instances, str(c.cls)))
+        return cls(classes, links)
+
+    def elements(self, index: GraphIndex) -> tuple:
+        """Pyvis node and edge option dicts; node size and edge width follow the counts."""
+        node_options = [
+            {"id": str(c.cls), "label": f"{index.label(c.cls)} ({c.instances})", "title": f"{c.cls}\ninstances: {c.instances}",
+             "value": c.instances, "shape": NODE_SHAPE, "color": NODE_COLOR}
+            for c in self.classes
+        ]
+        edge_options = [
+            {"from": str(s), "to": str(o), "label": f"{index.label(p)} ({n})", "title": f"{p}\nedges: {n}",
+             "value": n, "arrows": "to"}
+            for (s, p, o), n in self.links.items()
+        ]
+        return node_options, edge_options
+
+
+@dataclass
+class NodeCluster:
+    """
+    Neighbours linked to the same node by the same predicate, drawn as a
+    single node: leaves such as desks and points, or a fan-out too large to
+    draw one by one (a building's zones).
+    """
+    anchor: Node
+    predicate: Node
+    outgoing: bool  # Whether the edge points from the anchor to the members
+    members: List[Node] = field(default_factory=list)
+    member_type: Optional[Node] = None  # The type shared by every member, if any
+
+    @property
+    def id(self) -> str:
+        return f"cluster:{self.anchor}|{self.predicate}|{int(self.outgoing)}"
+
+
+@dataclass
+class NeighborhoodView:
+    """The part of a graph within some hops of focus nodes, capped at a node budget."""
+    focus: List[Node]
+    nodes: List[Node]
+    clusters: List[NodeCluster]
+    truncated: bool  # Whether the node budget cut the expansion short
+
+    @property
+    def size(self) -> int:
+        """Number of nodes drawn: plain nodes plus one per cluster."""
+        return len(self.nodes) + len(self.clusters)
+
+    def elements(self, index: GraphIndex) -> tuple:
+        """Pyvis node and edge option dicts for the view's nodes, clusters and the edges between them."""
+        focus = set(self.focus)
+        node_options = [
+            {"id": str(node), "label": index.label(node), "title": index.title(node), "shape": NODE_SHAPE,
+             "color": FOCUS_COLOR if node in focus else NODE_COLOR}
+            for node in self.nodes
+        ]
+        shown = set(self.nodes)
+        adjacency = index.adjacency()
+        edge_options = [
+            {"from": str(node), "to": str(neighbour), "label": index.label(p), "title": str(p), "arrows": "to"}
+            for node in self.nodes
+            for neighbour, p, outgoing in adjacency.get(node, ())
+            if outgoing and neighbour in shown
+        ]
+        for cluster in self.clusters:
+            kind = index.label(cluster.member_type if cluster.member_type is not None else cluster.predicate)
+            members = [index.label(m) for m in cluster.members[:CLUSTER_TITLE_MEMBERS]]
+            if len(cluster.members) > CLUSTER_TITLE_MEMBERS:
+                members.append(f"... {len(cluster.members) - CLUSTER_TITLE_MEMBERS} more")
+            node_options.append(
+                {"id": cluster.id, "label": f"{kind} x{len(cluster.members)}", "title": "\n".join(members),
+                 "value": len(cluster.members), "shape": "diamond", "color": CLUSTER_COLOR}
+            )
+            source, target = (str(cluster.anchor), cluster.id) if cluster.outgoing else (cluster.id, str(cluster.anchor))
+            edge_options.append(
+                {"from": source, "to": target, "label": index.label(cluster.predicate), "title": str(cluster.predicate),
+                 "arrows": "to"}
+            )
+        return node_options, edge_options
+
+
+def _is_leaf(adjacency: Dict[Node, List[Adjacent]], node: Node, anchor: Node) -> bool:
+    """Whether anchor is the only neighbour of node."""
+    return all(neighbour == anchor for neighbour, _, _ in adjacency.get(node, ()))
+
+
+def expand_neighborhood(
+    index: GraphIndex,
+    focus: List[Node],
+    hops: int = DEFAULT_HOPS,
+    max_nodes: int = DEFAULT_MAX_NODES,
+    cluster_min: int = CLUSTER_MIN_LEAVES,
+    max_fanout: int = DEFAULT_MAX_FANOUT
+) -> NeighborhoodView:
+    """
+    Breadth-first expansion from the focus nodes, up to hops edges away and
+    max_nodes drawn nodes. The neighbours of each expanded node are grouped
+    by predicate and direction; a group becomes one cluster node when it holds
+    cluster_min or more leaves (nodes with no other neighbour) or more than
+    max_fanout nodes of any kind, and clusters are not expanded further. The
+    work done follows the nodes visited, not the size of the graph.
+    """
+    adjacency = index.adjacency()
+    selected: Dict[Node, None] = dict.fromkeys(n for n in focus if n in index.nodes)
+    clusters: List[NodeCluster] = []
+    clustered: Set[Node] = set()
+    truncated = False
+
+    def has_room() -> bool:
+        return len(selected) + len(clusters) < max_nodes
+
+    frontier = list(selected)
+    for _ in range(hops):
+        next_frontier = []
+        # Hubs go last so their neighbours cannot use up the budget alone
+        for node in sorted(frontier, key=lambda n: len(adjacency.get(n, ()))):
+            groups: Dict[tuple, List[Node]] = {}
+            for neighbour, p, outgoing in adjacency.get(node, ()):
+                if neighbour not in selected and neighbour not in clustered:
+                    groups.setdefault((node, p, outgoing), []).append(neighbour)
+            for key, members in groups.items():
+                # A neighbour linked by several predicates (hasPart and isPartOf) is drawn once
+                members = [m for m in members if m not in selected and m not in clustered]
+                if not members:
+                    continue
+                leaves = all(_is_leaf(adjacency, m, node) for m in members)
+                if (leaves and len(members) >= cluster_min) or len(members) > max_fanout:
+                    if not has_room():
+                        truncated = True
+                        continue
+                    member_types = {index.primary_type(m) for m in members}
+                    clusters.append(NodeCluster(*key, members, member_types.pop() if len(member_types) == 1 else None))
+                    clustered.update(members)
+                    continue
+                for member in members:
+                    if not has_room():
+                        truncated = True
+                        break
+                    selected[member] = None
+                    next_frontier.append(member)
+        frontier = next_frontier
+    return NeighborhoodView(list(focus), list(selected), clusters, truncated)
+
+
+def pyvis_elements(index: GraphIndex) -> tuple:
+    """Pyvis node and edge option dicts for every node and edge of the indexed graph."""
+    node_options = [
+        {"id": str(node), "label": index.label(node), "title": index.title(node), "shape": NODE_SHAPE, "color": NODE_COLOR}
+        for node in index.nodes
+    ]
+    edge_options = [
+        {"from": str(s), "to": str(o), "label": index.label(p), "title": str(p), "arrows": "to"}
+        for s, p, o in index.edges
+    ]
+    return node_options, edge_options
+
+
+def add_elements(net: Network, node_options: List[Dict[str, Any]], edge_options: List[Dict[str, Any]]) -> None:
+    """
+    Adds nodes and edges to net in bulk. Network.add_node/add_edge look ids
+    up in a list on every call, which is quadratic for large graphs; the
+    option dicts here are the ones those methods would build.
+    """
+    for options in node_options:
+        if options["id"] not in net.node_map:
+            net.nodes.append(options)
+            net.node_ids.append(options["id"])
+            net.node_map[options["id"]] = options
+    net.edges.extend(edge_options)
+
+
+def _new_network(height: str) -> Network:
+    net = Network(notebook=True, height=height, width="100%", cdn_resources='remote', directed=True)
+    net.force_atlas_2based(gravity=-50, central_gravity=0.01, spring_length=100, spring_strength=0.08, damping=0.4, overlap=0)
+    return net
+
+
+def build_pyvis_network(graph: rdflib.Graph, height: str = "750px", index: Optional[GraphIndex] = None) -> Network:
+    """Directed Pyvis network of every node and triple of graph, built from a single GraphIndex pass."""
+    if index is None:
+        with span("viz.index"):
+            index = GraphIndex.from_graph(graph)
+    net = _new_network(height)
+    with span("viz.build"):
+        add_elements(net, *pyvis_elements(index))
+    count("viz.nodes", len(net.nodes))
+    return net
+
+
+def build_overview_network(index: GraphIndex, height: str = "750px", overview: Optional[ClassOverview] = None) -> Network:
+    """Pyvis network of the class overview (see ClassOverview)."""
+    net = _new_network(height)
+    with span("viz.overview"):
+        if overview is None:
+            overview = ClassOverview.from_index(index)
+        add_elements(net, *overview.elements(index))
+    count("viz.nodes", len(net.nodes))
+    return net
+
+
+def build_neighborhood_network(view: NeighborhoodView, index: GraphIndex, height: str = "750px") -> Network:
+    """Pyvis network of an expanded neighbourhood (see expand_neighborhood)."""
+    net = _new_network(height)
+    with span("viz.neighborhood"):
+        add_elements(net, *view.elements(index))
+    count("viz.nodes", len(net.nodes))
+    return net
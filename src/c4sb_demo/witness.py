@@ -0,0 +1,314 @@
+from collections import OrderedDict
+from types import MethodType
+from typing import Optional, List, Dict, Tuple, Callable, Any, Iterator
+
+import rdflib
+from rdflib.paths import Path, AlternativePath, InvPath, MulPath, NegatedPath, SequencePath
+from rdflib.plugins.sparql.evaluate import evalPart
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.sparql import Query, QueryContext
+from rdflib.plugins.stores.memory import Memory
+from rdflib.term import Variable, BNode, Node, URIRef
+
+from c4sb_demo.tracing import span
+
+# Upper bound on the number of triples put into a query's path (witness) graph.
+DEFAULT_WITNESS_TRIPLE_BUDGET: int = 2000
+
+# Solution modifiers sitting between the query form and its WHERE pattern.
+_MODIFIER_NODES = {
+    "SelectQuery", "AskQuery", "ConstructQuery", "DescribeQuery",
+    "Project", "Distinct", "Reduced", "Slice", "OrderBy", "ToMultiSet",
+}
+
+TriplePattern = Tuple[Node, Node, Node]
+
+
+def _find_node(node: Any, name: str) -> Optional[CompValue]:
+    if isinstance(node, CompValue):
+        if node.name == name:
+            return node
+        children = node.values()
+    elif isinstance(node, (list, tuple)):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_node(child, name)
+        if found is not None:
+            return found
+    return None
+
+
+def where_pattern(query: Query) -> CompValue:
+    """
+    Returns the algebra of a prepared query's WHERE clause, i.e. the part whose
+    solutions are the matches, without grouping, aggregation or projection.
+    """
+    group = _find_node(query.algebra, "Group")
+    if group is not None:
+        return group.p
+    node = query.algebra
+    while isinstance(node, CompValue) and node.name in _MODIFIER_NODES and node.get("p") is not None:
+        node = node.p
+    return node
+
+
+def set_where_pattern(query: Query, pattern: CompValue) -> None:
+    """Replaces the part of query's algebra that where_pattern returns with pattern."""
+    group = _find_node(query.algebra, "Group")
+    if group is not None:
+        group["p"] = pattern
+        return
+    node = query.algebra
+    while isinstance(node.get("p"), CompValue) and node.p.name in _MODIFIER_NODES:
+        node = node.p
+    node["p"] = pattern
+
+
+def copy_algebra(node: Any) -> Any:
+    """
+    Deep-copies a query algebra tree so it can be rewritten without touching a
+    shared prepared query. (copy.deepcopy can't rebuild CompValue, whose
+    __init__ needs a name.)
+    """
+    if isinstance(node, CompValue):
+        new = OrderedDict.__new__(type(node))
+        OrderedDict.__init__(new)
+        new.__dict__.update(node.__dict__)
+        evalfn = node.__dict__.get("_evalfn")
+        if isinstance(evalfn, MethodType):
+            # Expr binds its evaluation function to the instance; rebind it to the copy
+            new.__dict__["_evalfn"] = MethodType(evalfn.__func__, new)
+        for key, value in OrderedDict.items(node):
+            OrderedDict.__setitem__(new, key, copy_algebra(value))
+        return new
+    if isinstance(node, list):
+        return [copy_algebra(child) for child in node]
+    if isinstance(node, tuple):
+        return tuple(copy_algebra(child) for child in node)
+    if isinstance(node, set):
+        return set(node)
+    return node
+
+
+def triple_patterns(part: Any) -> List[TriplePattern]:
+    """Collects the triple patterns of every basic graph pattern (including OPTIONALs) under part."""
+    patterns: List[TriplePattern] = []
+    stack = [part]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, CompValue):
+            if node.name == "BGP":
+                patterns.extend(tuple(t) for t in node.triples)
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, (list, tuple)):
+            stack.extend(reversed(node))
+    return list(dict.fromkeys(patterns))
+
+
+def iter_solutions(graph: rdflib.Graph, query: Query, init_bindings: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """Lazily evaluates the WHERE pattern of query and yields its solution mappings."""
+    bindings = {Variable(k): v for k, v in (init_bindings or {}).items()}
+    ctx = QueryContext(graph, initBindings=bindings, datasetClause=query.algebra.get("datasetClause"))
+    ctx.prologue = query.prologue
+    return evalPart(ctx, where_pattern(query))
+
+
+def path_witness(graph: rdflib.Graph, subject: Node, path: Any, obj: Node) -> Optional[List[TriplePattern]]:
+    """
+    Returns the data triples along one way property path links subject to obj in
+    graph ([] for a zero-length match), or None if it doesn't.
+    """
+    if isinstance(path, URIRef):
+        return [(subject, path, obj)] if (subject, path, obj) in graph else None
+    if isinstance(path, InvPath):
+        return path_witness(graph, obj, path.arg, subject)
+    if isinstance(path, SequencePath):
+        return _sequence_witness(graph, subject, list(path.args), obj)
+    if isinstance(path, AlternativePath):
+        for alternative in path.args:
+            found = path_witness(graph, subject, alternative, obj)
+            if found is not None:
+                return found
+        return None
+    if isinstance(path, MulPath):
+        return _repeat_witness(graph, subject, path, obj)
+    if isinstance(path, NegatedPath):
+        forward = [a for a in path.args if isinstance(a, URIRef)]
+        inverse = [a.arg for a in path.args if isinstance(a, InvPath)]
+        if forward or not inverse:
+            for p in graph.predicates(subject, obj):
+                if p not in forward:
+                    return [(subject, p, obj)]
+        if inverse:
+            for p in graph.predicates(obj, subject):
+                if p not in inverse:
+                    return [(obj, p, subject)]
+        return None
+    return None
+
+
+def _sequence_witness(graph: rdflib.Graph, subject: Node, steps: List[Any], obj: Node) -> Optional[List[TriplePattern]]:
+    first, rest = steps[0], steps[1:]
+    if not rest:
+        return path_witness(graph, subject, first, obj)
+    for middle in dict.fromkeys(graph.objects(subject, first)):
+        tail = _sequence_witness(graph, middle, rest, obj)
+        if tail is not None:
+            head = path_witness(graph, subject, first, middle)
+            if head is not None:
+                return head + tail
+    return None
+
+
+def _repeat_witness(graph: rdflib.Graph, subject: Node, path: MulPath, obj: Node) -> Optional[List[TriplePattern]]:
+    # Breadth-first, so the witness is one of the shortest repetitions
+    if path.zero and subject == obj:
+        return []
+    parents: Dict[Node, Node] = {}
+    seen = {subject}
+    frontier = [subject]
+    while frontier:
+        next_frontier = []
+        for node in frontier:
+            for step in dict.fromkeys(graph.objects(node, path.path)):
+                if step == obj:
+                    hops = [(node, step)]
+                    hop = node
+                    while hop != subject:
+                        hops.append((parents[hop], hop))
+                        hop = parents[hop]
+                    triples: List[TriplePattern] = []
+                    for start, end in reversed(hops):
+                        triples.extend(path_witness(graph, start, path.path, end) or [])
+                    return triples
+                if path.more and step not in seen:
+                    seen.add(step)
+                    parents[step] = node
+                    next_frontier.append(step)
+        frontier = next_frontier
+    return None
+
+
+def build_witness_graph(
+    graph: rdflib.Graph,
+    query: Query,
+    target: rdflib.Graph,
+    init_bindings: Optional[Dict[str, Any]] = None,
+    max_triples: int = DEFAULT_WITNESS_TRIPLE_BUDGET
+) -> int:
+    """
+    Adds to target the data triples that witness the matches of query in graph:
+    every BGP pattern instantiated with each solution of the WHERE clause, kept
+    only when fully bound and actually present in graph. Property path patterns
+    contribute the data triples of one path between their ends (see
+    path_witness). Stops once target holds max_triples triples. Returns the
+    number of triples added.
+    """
+    patterns = triple_patterns(where_pattern(query))
+    seen = set()
+    witnessed = set()
+    added = 0
+    for solution in iter_solutions(graph, query, init_bindings):
+        for pattern in patterns:
+            triple = tuple(
+                solution.get(term) if isinstance(term, (Variable, BNode)) else term
+                for term in pattern
+            )
+            if None in triple or triple in seen:
+                continue
+            seen.add(triple)
+            if isinstance(triple[1], Path):
+                data_triples = path_witness(graph, *triple) or []
+            else:
+                data_triples = [triple] if triple in graph else []
+            for data_triple in data_triples:
+                if data_triple in witnessed:
+                    continue
+                witnessed.add(data_triple)
+                target.add(data_triple)
+                added += 1
+                if added >= max_triples:
+                    return added
+    return added
+
+
+class LazyWitnessStore(Memory):
+    """
+    Memory store that fills itself the first time its triples are read, so a path
+    graph handed back with query results costs nothing until it is displayed.
+    It also fills itself just before the queried graph's next mutation (see
+    graph_store.VersionedMemory.snapshot_before_change), so it always shows the
+    graph as it was when the query ran.
+    """
+
+    def __init__(self, max_triples: int = DEFAULT_WITNESS_TRIPLE_BUDGET):
+        super().__init__()
+        self.materialized = False
+        self.max_triples = max_triples
+        self._builder: Optional[Callable[[], None]] = None
+
+    def set_builder(self, builder: Callable[[], None]) -> None:
+        self._builder = builder
+
+    def materialize(self) -> None:
+        if self.materialized:
+            return
+        self.materialized = True
+        builder, self._builder = self._builder, None
+        if builder is not None:
+            builder()
+
+    def triples(self, triple_pattern, context=None):
+        self.materialize()
+        return super().triples(triple_pattern, context)
+
+    def __len__(self, context=None):
+        self.materialize()
+        return super().__len__(context)
+
+    def contexts(self, triple=None):
+        self.materialize()
+        return super().contexts(triple)
+
+
+def lazy_witness_graph(
+    graph: rdflib.Graph,
+    query: Query,
+    init_bindings: Optional[Dict[str, Any]] = None,
+    max_triples: int = DEFAULT_WITNESS_TRIPLE_BUDGET
+) -> rdflib.Graph:
+    """
+    Returns an rdflib.Graph whose witness triples (see build_witness_graph) are only
+    computed when the graph is first read, or before graph next changes. Graphs
+    whose store can't report changes (no snapshot_before_change, see
+    graph_store.VersionedMemory) get their witness built right away. Prefixes
+    can be bound right away.
+    """
+    store = LazyWitnessStore(max_triples)
+    witness = rdflib.Graph(store=store)
+    def build() -> None:
+        with span("query.path_graph"):
+            build_witness_graph(graph, query, witness, init_bindings, max_triples)
+
+    store.set_builder(build)
+    snapshot_before_change = getattr(graph.store, "snapshot_before_change", None)
+    if snapshot_before_change is not None:
+        snapshot_before_change(store)
+    else:
+        store.materialize()
+    return witness
+
+
+def is_materialized(path_graph: rdflib.Graph) -> bool:
+    store = path_graph.store
+    return not isinstance(store, LazyWitnessStore) or store.materialized
+
+
+def size_hint(path_graph: rdflib.Graph) -> int:
+    """Number of triples in path_graph, or its triple budget if it has not been built yet."""
+    store = path_graph.store
+    if isinstance(store, LazyWitnessStore) and not store.materialized:
+        return store.max_triples
+    return len(path_graph)
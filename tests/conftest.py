@@ -0,0 +1,13 @@
+import pytest
+
+from c4sb_demo.graph_cache import set_graph_cache
+
+
+@pytest.fixture(autouse=True, scope="session")
+def isolated_graph_cache(tmp_path_factory):
+    """Keeps the parsed-graph cache of the test run in a temporary directory instead of ~/.cache."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("C4SB_GRAPH_CACHE_DIR", str(tmp_path_factory.mktemp("graph-cache")))
+        set_graph_cache(None)  # Re-created on first use from the patched directory
+        yield
+    set_graph_cache(None)
@@ -0,0 +1,52 @@
+import json
+import warnings
+from pathlib import Path
+
+from c4sb_demo.batch import BuildingSources, load_manifest, run_batch
+from c4sb_demo.sparql_constants import QUERY_1, QUERY_4
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+
+
+def test_load_manifest_resolves_relative_paths(tmp_path):
+    manifest = tmp_path / "portfolio.json"
+    manifest.write_text(json.dumps({"buildings": [
+        {"name": "site-a", "brick_file": "a/brick.ttl", "additional_ttl_files": ["a/extra.ttl"]},
+    ]}))
+    [site] = load_manifest(manifest)
+    assert site.name == "site-a"
+    assert site.brick_file == tmp_path / "a" / "brick.ttl"
+    assert site.rec_file is None
+    assert site.additional_ttl_files == [tmp_path / "a" / "extra.ttl"]
+
+
+def test_run_batch_tags_results_by_building():
+    buildings = [
+        BuildingSources(
+            name="simple",
+            brick_file=DATA_PATH / "brick-building-simple.ttl",
+            rec_file=DATA_PATH / "rec-building-simple.ttl",
+            ashrae_file=DATA_PATH / "ashrae-223-rtu.ttl",
+        ),
+        BuildingSources(name="pnnl-bdg1-2", additional_ttl_files=[DATA_PATH / "samples" / "pnnl-bdg1-2.ttl"]),
+        BuildingSources(name="missing", brick_file=DATA_PATH / "does-not-exist.ttl"),
+    ]
+    queries = {"QUERY_1": QUERY_1, "QUERY_4": QUERY_4, "BROKEN": {"body": "SELECT ?s WHERE { ?s ?p }"}}
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)  # No empty or all-NA frames reach pd.concat
+        combined, timings = run_batch(buildings, queries, max_workers=2)
+
+    assert list(timings["building"]) == ["missing", "pnnl-bdg1-2", "simple"]
+    by_building = timings.set_index("building")
+    assert by_building.loc["missing", "error"] is not None
+    assert by_building.loc["simple", "error"] is None
+    assert by_building.loc["simple", "triples"] > 0
+    assert {"build_seconds", "QUERY_1_seconds", "QUERY_4_seconds", "total_seconds"} <= set(timings.columns)
+
+    simple = combined[combined["building"] == "simple"]
+    assert set(simple["query"]) == {"QUERY_1", "QUERY_4", "BROKEN"}
+    [broken] = simple[simple["query"] == "BROKEN"]["error"]
+    assert broken.startswith("Query failed")
+    assert simple[simple["query"] != "BROKEN"]["error"].isna().all()
+    assert "missing" not in set(combined["building"])
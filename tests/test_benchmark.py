@@ -0,0 +1,39 @@
+from c4sb_demo.benchmark import StageResult, compare_to_baseline, load_results, run_benchmarks, write_results
+
+
+def test_run_benchmarks_records_each_stage(tmp_path):
+    results = run_benchmarks(
+        ["sample", "tiny"], stages=["ingest", "QUERY_2", "validate:rec"], warmup=0, repeats=2,
+        work_dir=tmp_path, isolate=False,
+    )
+    assert [(r.size, r.stage) for r in results] == [
+        ("sample", "ingest"), ("sample", "QUERY_2"), ("sample", "validate:rec"),
+        ("tiny", "ingest"), ("tiny", "QUERY_2"), ("tiny", "validate:rec"),
+    ]
+    assert all(r.error is None and len(r.seconds) == 2 and r.triples > 0 for r in results)
+    assert results[1].rows == 1  # The RTU's one linked zone
+    assert (tmp_path / "tiny" / "tiny-brick.ttl").exists()
+
+    write_results(tmp_path / "results.json", results, {"sizes": ["sample", "tiny"]})
+    records = load_results(tmp_path / "results.json")
+    assert records[0]["triples_per_second"] == results[0].triples_per_second
+    assert not any(c.regressed for c in compare_to_baseline(results, records))
+
+
+def test_compare_to_baseline_thresholds():
+    baseline = [
+        StageResult("tiny", "ingest", 100, [1.0], rss_growth_mb=10.0).to_record(),
+        StageResult("tiny", "QUERY_1", 100, [0.001], rss_growth_mb=1.0).to_record(),
+        StageResult("tiny", "QUERY_2", 100, [1.0], rss_growth_mb=100.0).to_record(),
+    ]
+    results = [
+        StageResult("tiny", "ingest", 100, [1.3, 1.3, 1.1], rss_growth_mb=12.0),  # 30% slower
+        StageResult("tiny", "QUERY_1", 100, [0.003], rss_growth_mb=1.0),  # 3x slower but under the noise floor
+        StageResult("tiny", "QUERY_2", 100, [1.1], rss_growth_mb=150.0),  # 10% slower, 50% more memory
+        StageResult("tiny", "QUERY_3", 100, [5.0]),  # Not in the baseline
+    ]
+    by_stage = {c.stage: c for c in compare_to_baseline(results, baseline)}
+    assert set(by_stage) == {"ingest", "QUERY_1", "QUERY_2"}
+    assert by_stage["ingest"].time_regressed and not by_stage["ingest"].rss_regressed
+    assert not by_stage["QUERY_1"].regressed
+    assert by_stage["QUERY_2"].rss_regressed and not by_stage["QUERY_2"].time_regressed
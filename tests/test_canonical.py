@@ -0,0 +1,103 @@
+import rdflib
+from pathlib import Path
+from rdflib import Variable
+
+from c4sb_demo.canonical import UnionFind, canonicalize_graph, get_canonical_map, rewrite_sameas_query
+from c4sb_demo.graph_operations import create_combined_linked_graph, execute_sparql_query
+from c4sb_demo.query_cache import prepare_cached
+from c4sb_demo.sparql_constants import (
+    BRICK, S223, OWL_SAMEAS, RDF_TYPE, RDFS_LABEL, PREFIX_DICT, QUERY_1, QUERY_2, QUERY_3, QUERY_4
+)
+from c4sb_demo.witness import triple_patterns, where_pattern
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+SOURCE_FILES = dict(
+    brick_file=DATA_PATH / "brick-building-simple.ttl",
+    rec_file=DATA_PATH / "rec-building-simple.ttl",
+    ashrae_file=DATA_PATH / "ashrae-223-rtu.ttl",
+)
+EX = rdflib.Namespace("http://example.com/building#")
+MYBLDG = rdflib.Namespace("http://example.com/mybuilding#")
+
+
+def test_union_find_groups_chains():
+    uf = UnionFind()
+    uf.union("a", "b")
+    uf.union("c", "b")
+    uf.union("x", "y")
+    groups = sorted(sorted(members) for members in uf.groups().values())
+    assert groups == [["a", "b", "c"], ["x", "y"]]
+
+
+def test_canonicalize_merges_sameas_classes():
+    g = rdflib.Graph()
+    g.add((EX["rtu_1"], RDF_TYPE, BRICK.RTU))
+    g.add((EX["rtu_1"], OWL_SAMEAS, MYBLDG["RTU-1"]))
+    g.add((MYBLDG["RTU-1"], RDF_TYPE, S223.AirHandlingUnit))
+    g.add((MYBLDG["RTU-1"], S223.hasComponent, MYBLDG["Fan"]))
+
+    cmap = canonicalize_graph(g)
+    assert get_canonical_map(g) is cmap
+    assert cmap.canonical(MYBLDG["RTU-1"]) == EX["rtu_1"]
+    assert cmap.originals(EX["rtu_1"]) == (EX["rtu_1"], MYBLDG["RTU-1"])
+    assert (None, OWL_SAMEAS, None) not in g
+    assert (EX["rtu_1"], S223.hasComponent, MYBLDG["Fan"]) in g
+    assert len(list(g.subjects(RDF_TYPE, None))) == 2
+
+
+def _rows(df):
+    return sorted(map(tuple, df.astype(str).values.tolist()))
+
+
+def test_rewritten_queries_match_shipped_queries():
+    plain = create_combined_linked_graph(**SOURCE_FILES)
+    smushed = create_combined_linked_graph(**SOURCE_FILES, canonicalize=True)
+    cmap = get_canonical_map(smushed)
+    for query in (QUERY_1, QUERY_2, QUERY_3, QUERY_4):
+        expected, _ = execute_sparql_query(plain, query)
+        actual, _ = execute_sparql_query(smushed, query)
+        assert list(actual.columns) == list(expected.columns)
+        assert _rows(actual) == _rows(expected)
+
+    # QUERY_4 only asks each member of a class for its own properties: its sameAs joins are dropped
+    rewritten = cmap.rewrite_query(QUERY_4["body"], prepare_cached(QUERY_4["body"], PREFIX_DICT), smushed)
+    assert rewritten is not None
+    assert all(p != OWL_SAMEAS for _, p, _ in triple_patterns(where_pattern(rewritten)))
+    # QUERY_2 reads both the zone's and the room's rdfs:label, which smushing merges
+    assert cmap.rewrite_query(QUERY_2["body"], prepare_cached(QUERY_2["body"], PREFIX_DICT), smushed) is None
+    assert (EX["room_101"], RDFS_LABEL, rdflib.Literal("Room 101")) in cmap.original_view(smushed)
+
+
+def test_rewrite_verdict_follows_graph_changes():
+    plain = create_combined_linked_graph(**SOURCE_FILES)
+    smushed = create_combined_linked_graph(**SOURCE_FILES, canonicalize=True)
+    cmap = get_canonical_map(smushed)
+    prepared = prepare_cached(QUERY_4["body"], PREFIX_DICT)
+    assert cmap.rewrite_query(QUERY_4["body"], prepared, smushed) is not None
+
+    # Once the Brick RTU has a description of its own, the merged node would answer with both
+    extra = (EX["rtu_1"], S223.hasDescription, rdflib.Literal("Brick RTU"))
+    plain.add(extra)
+    smushed.add(extra)
+    assert cmap.rewrite_query(QUERY_4["body"], prepared, smushed) is None
+    expected, _ = execute_sparql_query(plain, QUERY_4)
+    actual, _ = execute_sparql_query(smushed, QUERY_4)
+    assert _rows(actual) == _rows(expected)
+
+
+def test_optional_sameas_patterns_stay_optional():
+    body = """
+SELECT ?zone ?room WHERE {
+    ?zone a brick:HVAC_Zone .
+    OPTIONAL { ?zone owl:sameAs ?room . }
+}
+"""
+    rewritten = rewrite_sameas_query(prepare_cached(body, PREFIX_DICT))
+    assert (Variable("zone"), OWL_SAMEAS, Variable("room")) in triple_patterns(where_pattern(rewritten))
+
+    plain = create_combined_linked_graph(**SOURCE_FILES)
+    smushed = create_combined_linked_graph(**SOURCE_FILES, canonicalize=True)
+    expected, _ = execute_sparql_query(plain, {"body": body})
+    actual, _ = execute_sparql_query(smushed, {"body": body})
+    assert _rows(actual) == _rows(expected)
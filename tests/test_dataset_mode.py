@@ -0,0 +1,79 @@
+import shutil
+import rdflib
+from rdflib.compare import isomorphic
+from pathlib import Path
+
+from c4sb_demo.graph_operations import (
+    create_combined_linked_graph,
+    create_combined_linked_dataset,
+    execute_sparql_query,
+    reload_source,
+    source_graph_id,
+)
+from c4sb_demo.sparql_constants import QUERY_1, LINKS_GRAPH, OWL_SAMEAS
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+SOURCE_NAMES = dict(
+    brick_file="brick-building-simple.ttl",
+    rec_file="rec-building-simple.ttl",
+    ashrae_file="ashrae-223-rtu.ttl",
+)
+EX = rdflib.Namespace("http://example.com/building#")
+
+
+def _copy_sources(tmp_path):
+    files = {}
+    for key, name in SOURCE_NAMES.items():
+        files[key] = tmp_path / name
+        shutil.copy(DATA_PATH / name, files[key])
+    return files
+
+
+def _triples(graph):
+    return set(graph.triples((None, None, None)))
+
+
+def _same_triples(first, second):
+    # Each load mints its own blank nodes, so compare up to blank node renaming
+    graphs = []
+    for graph in (first, second):
+        graphs.append(rdflib.Graph())
+        for triple in _triples(graph):
+            graphs[-1].add(triple)
+    return isomorphic(*graphs)
+
+
+def test_dataset_matches_combined_graph(tmp_path):
+    files = _copy_sources(tmp_path)
+    g = create_combined_linked_graph(**files)
+    ds = create_combined_linked_dataset(**files)
+    assert _same_triples(ds, g)
+    assert len(ds.graph(source_graph_id(files["rec_file"]))) > 0
+    assert len(ds.graph(LINKS_GRAPH)) == len(list(g.triples((None, OWL_SAMEAS, None))))
+
+    expected, _ = execute_sparql_query(g, QUERY_1)
+    results_df, path_graph = execute_sparql_query(ds, QUERY_1)
+    assert results_df.equals(expected)
+    assert path_graph is not None and len(path_graph) > 0
+
+
+def test_reload_source_matches_rebuild(tmp_path):
+    files = _copy_sources(tmp_path)
+    ds = create_combined_linked_dataset(**files)
+    links_before = set(ds.graph(LINKS_GRAPH))
+
+    # Unchanged sources keep their links untouched
+    reload_source(ds, files["ashrae_file"])
+    assert set(ds.graph(LINKS_GRAPH)) == links_before
+
+    with open(files["rec_file"], "a") as f:
+        f.write(
+            "\n<http://example.com/building#desk_new> a <https://w3id.org/rec/core/Desk> .\n"
+            "<http://example.com/building#room_102> <https://w3id.org/rec/core/containsAsset> "
+            "<http://example.com/building#desk_new> .\n"
+        )
+    report = reload_source(ds, files["rec_file"])
+    assert report.links  # The links touching REC entities were recomputed
+    assert (EX["desk_new"], None, None) in ds
+    assert _same_triples(ds, create_combined_linked_graph(**files))
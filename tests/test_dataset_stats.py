@@ -0,0 +1,50 @@
+import rdflib
+from pathlib import Path
+
+from c4sb_demo.dataset_stats import GraphStatistics, VOID, get_graph_statistics
+from c4sb_demo.graph_operations import create_combined_linked_graph
+from c4sb_demo.sparql_constants import REC_CORE, RDF_TYPE
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+SOURCE_FILES = dict(
+    brick_file=DATA_PATH / "brick-building-simple.ttl",
+    rec_file=DATA_PATH / "rec-building-simple.ttl",
+    ashrae_file=DATA_PATH / "ashrae-223-rtu.ttl",
+)
+EX = rdflib.Namespace("http://example.com/building#")
+
+
+def _snapshot(stats: GraphStatistics):
+    return (
+        stats.triples, stats.subjects, stats.objects,
+        stats.predicate_triples, stats.predicate_subjects, stats.predicate_objects,
+        stats.class_instances,
+    )
+
+
+def test_statistics_match_ingest_and_follow_changes():
+    g = create_combined_linked_graph(**SOURCE_FILES)
+    stats = get_graph_statistics(g, collect=False)
+    assert stats is not None and stats.incremental
+    assert _snapshot(stats) == _snapshot(GraphStatistics.collect(g))
+    assert stats.triples == len(g)
+    assert stats.class_count(REC_CORE.Desk) == 30
+
+    new_desk = EX["desk_99"]
+    g.add((new_desk, RDF_TYPE, REC_CORE.Desk))
+    g.add((EX["room_102"], REC_CORE.containsAsset, new_desk))
+    assert stats.class_count(REC_CORE.Desk) == 31
+    g.remove((None, REC_CORE.containsAsset, None))
+    assert stats.predicate_count(REC_CORE.containsAsset) == 0
+    assert _snapshot(stats) == _snapshot(GraphStatistics.collect(g))
+
+
+def test_statistics_as_void():
+    g = create_combined_linked_graph(**SOURCE_FILES)
+    stats = get_graph_statistics(g)
+    void = stats.to_void(rdflib.URIRef("urn:dataset"))
+    assert int(void.value(rdflib.URIRef("urn:dataset"), VOID.triples)) == len(g)
+    desk_partition = void.value(predicate=VOID["class"], object=REC_CORE.Desk)
+    assert int(void.value(desk_partition, VOID.entities)) == stats.class_count(REC_CORE.Desk)
+    assert set(stats.to_dataframe()["kind"]) == {"class", "predicate"}
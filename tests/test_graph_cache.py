@@ -0,0 +1,79 @@
+import pytest
+import rdflib
+from pathlib import Path
+
+from c4sb_demo.graph_cache import GraphCache, encode_graph, add_encoded_graph
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+REC_FILE = PROJECT_ROOT / "data" / "rec-building-simple.ttl"
+ASHRAE_FILE = PROJECT_ROOT / "data" / "ashrae-223-rtu.ttl"
+
+
+def parsed(path: Path) -> rdflib.Graph:
+    g = rdflib.Graph()
+    g.parse(str(path), format="turtle")
+    return g
+
+
+def test_encode_roundtrip_preserves_triples_and_prefixes():
+    original = parsed(REC_FILE)
+    restored = rdflib.Graph()
+    count = add_encoded_graph(restored, encode_graph(original))
+    assert count == len(original)
+    assert restored.isomorphic(original)
+    assert ("props", rdflib.URIRef("https://w3id.org/rec/props/")) in list(restored.namespaces())
+
+
+def test_cache_hit_matches_parse(tmp_path):
+    cache = GraphCache(cache_dir=tmp_path)
+    first = rdflib.Graph()
+    cache.parse_into(first, ASHRAE_FILE)
+    second = rdflib.Graph()
+    cache.parse_into(second, ASHRAE_FILE)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.isomorphic(parsed(ASHRAE_FILE))
+
+
+def test_cache_rekeys_on_content_change(tmp_path):
+    source = tmp_path / "building.ttl"
+    source.write_text("<urn:a> <urn:b> <urn:c> .\n")
+    cache = GraphCache(cache_dir=tmp_path / "cache")
+    cache.parse_into(rdflib.Graph(), source)
+    source.write_text("<urn:a> <urn:b> <urn:d> .\n")
+    g = rdflib.Graph()
+    cache.parse_into(g, source)
+    assert (rdflib.URIRef("urn:a"), rdflib.URIRef("urn:b"), rdflib.URIRef("urn:d")) in g
+    assert cache.misses == 2
+    assert cache.stats()["entries"] == 1  # the stale entry was replaced
+
+
+def test_invalidate_and_eviction(tmp_path):
+    cache = GraphCache(cache_dir=tmp_path)
+    cache.parse_into(rdflib.Graph(), REC_FILE)
+    cache.parse_into(rdflib.Graph(), ASHRAE_FILE)
+    assert cache.invalidate(REC_FILE) == 1
+    assert cache.stats()["entries"] == 1
+
+    cache.max_bytes = 1
+    assert cache.evict() == 1
+    assert cache.size_bytes() == 0
+
+
+def test_payload_is_not_pickle_and_rejects_garbage():
+    blob = encode_graph(parsed(REC_FILE))
+    assert not blob.startswith(b"\x80")  # No pickle protocol header
+    with pytest.raises(ValueError):
+        add_encoded_graph(rdflib.Graph(), b"\x80\x04garbage")
+    with pytest.raises(ValueError):
+        add_encoded_graph(rdflib.Graph(), blob[:-4])  # Truncated index array
+
+
+def test_loading_a_source_twice_keeps_blank_nodes_apart(tmp_path):
+    cache = GraphCache(cache_dir=tmp_path)
+    single = parsed(REC_FILE)
+    twice = rdflib.Graph()
+    cache.parse_into(twice, REC_FILE)
+    cache.parse_into(twice, REC_FILE)  # Cache hit
+    bnodes = lambda g: {t for triple in g for t in triple if isinstance(t, rdflib.BNode)}
+    assert len(bnodes(single)) > 0
+    assert len(bnodes(twice)) == 2 * len(bnodes(single))
@@ -0,0 +1,102 @@
+import rdflib
+from rdflib import Literal
+
+from c4sb_demo.incremental_validation import IncrementalValidator, SH, dependency_radius, shape_radius
+from c4sb_demo.validate_graphs import ShapesValidator
+
+EX = rdflib.Namespace("http://example.com/")
+
+SHAPES_TTL = """
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix ex: <http://example.com/> .
+
+ex:RoomShape a sh:NodeShape ;
+    sh:targetClass ex:Room ;
+    sh:property [ sh:path ex:desk ; sh:node ex:DeskShape ] ;
+    sh:sparql [
+        sh:message "Room has no desk" ;
+        sh:select "SELECT $this WHERE { FILTER NOT EXISTS { $this <http://example.com/desk> ?d } }" ;
+    ] .
+
+ex:DeskShape a sh:NodeShape ;
+    sh:property [ sh:path ex:label ; sh:minCount 1 ] .
+"""
+
+DATA_TTL = """
+@prefix ex: <http://example.com/> .
+ex:room1 a ex:Room ; ex:desk ex:d1 .
+ex:d1 ex:label "Desk 1" .
+ex:room2 a ex:Room ; ex:desk ex:d2 .
+ex:d2 ex:label "Desk 2" .
+ex:room3 a ex:Room .
+"""
+
+
+def _results(results_graph):
+    return sorted(
+        (str(results_graph.value(r, SH.focusNode)), str(results_graph.value(r, SH.sourceConstraintComponent)))
+        for r in results_graph.subjects(SH.focusNode, None)
+    )
+
+
+def test_shape_radius_follows_nested_shapes(tmp_path):
+    shapes_file = tmp_path / "rooms.shapes.ttl"
+    shapes_file.write_text(SHAPES_TTL)
+    shapes_validator = ShapesValidator([shapes_file])
+    # ex:desk to the desk, then its ex:label
+    assert shape_radius(shapes_validator.shacl_graph, EX["RoomShape"]) == 2
+
+
+def test_incremental_updates_match_full_validation(tmp_path):
+    shapes_file = tmp_path / "rooms.shapes.ttl"
+    shapes_file.write_text(SHAPES_TTL)
+    shapes_validator = ShapesValidator([shapes_file])
+    data_graph = rdflib.Graph().parse(data=DATA_TTL, format="turtle")
+    incremental = IncrementalValidator(shapes_validator, data_graph)
+    assert _results(incremental.results_graph) == [("http://example.com/room3", str(SH.SPARQLConstraintComponent))]
+
+    deltas = [
+        dict(removed=[(EX["d1"], EX["label"], Literal("Desk 1"))]),
+        dict(added=[(EX["room3"], EX["desk"], EX["d3"]), (EX["d3"], EX["label"], Literal("Desk 3"))]),
+        dict(added=[(EX["d1"], EX["label"], Literal("Desk one"))], removed=[(EX["room2"], rdflib.RDF.type, EX["Room"])]),
+    ]
+    for delta in deltas:
+        conforms, results_graph, results_text = incremental.update(**delta)
+        expected_conforms, expected_graph, _ = shapes_validator.validate(data_graph)
+        assert conforms == expected_conforms
+        assert _results(results_graph) == _results(expected_graph)
+        assert f"Conforms: {conforms}" in results_text
+
+    # Only nodes near the edit were revalidated
+    incremental.update(added=[(EX["d2"], EX["label"], Literal("Desk two"))])
+    assert EX["room2"] in incremental.last_focus_nodes
+    assert EX["room1"] not in incremental.last_focus_nodes
+
+
+CHAIN_SHAPES_TTL = """
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix ex: <http://example.com/> .
+
+ex:ChainShape a sh:NodeShape ;
+    sh:targetNode ex:n0 ;
+    sh:property [ sh:path [ sh:oneOrMorePath ex:next ] ; sh:hasValue ex:end ] .
+"""
+
+
+def test_unbounded_shapes_are_revalidated_in_full(tmp_path):
+    shapes_file = tmp_path / "chain.shapes.ttl"
+    shapes_file.write_text(CHAIN_SHAPES_TTL)
+    shapes_validator = ShapesValidator([shapes_file])
+    assert dependency_radius(shapes_validator) is None
+    data_graph = rdflib.Graph()
+    chain = [EX[f"n{i}"] for i in range(5)] + [EX["end"]]
+    for node, next_node in zip(chain, chain[1:]):
+        data_graph.add((node, EX["next"], next_node))
+    incremental = IncrementalValidator(shapes_validator, data_graph)
+    assert incremental.conforms is True
+
+    # The edit is five hops away from the focus node ex:n0
+    conforms, results_graph, results_text = incremental.update(removed=[(EX["n4"], EX["next"], EX["end"])])
+    assert conforms is False and incremental.last_focus_nodes is None
+    assert _results(results_graph) == [("http://example.com/n0", str(SH.HasValueConstraintComponent))]
+    assert "Conforms: False" in results_text and "Focus Node: ex:n0" in results_text
@@ -0,0 +1,49 @@
+import rdflib
+from pathlib import Path
+
+from c4sb_demo.graph_operations import create_combined_linked_graph
+from c4sb_demo.ingest import convert_to_ntriples, stream_ntriples
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+SOURCE_FILES = dict(
+    brick_file=DATA_PATH / "brick-building-simple.ttl",
+    rec_file=DATA_PATH / "rec-building-simple.ttl",
+    ashrae_file=DATA_PATH / "ashrae-223-rtu.ttl",
+)
+
+
+def test_parallel_ingest_matches_serial():
+    serial = create_combined_linked_graph(**SOURCE_FILES, use_cache=False)
+    parallel = create_combined_linked_graph(**SOURCE_FILES, use_cache=False, parallel=True, max_workers=3)
+    assert serial is not None and parallel is not None
+    assert parallel.isomorphic(serial)
+    assert set(parallel.namespaces()) == set(serial.namespaces())
+
+
+def test_stream_ntriples_matches_turtle_parse(tmp_path):
+    nt_file = convert_to_ntriples(SOURCE_FILES["rec_file"], tmp_path / "rec.nt")
+    expected = rdflib.Graph().parse(str(SOURCE_FILES["rec_file"]), format="turtle")
+
+    progress_calls = []
+    streamed = rdflib.Graph()
+    added = stream_ntriples(streamed, nt_file, batch_size=25, progress=lambda *args: progress_calls.append(args))
+    assert added == len(expected)
+    assert streamed.isomorphic(expected)
+    assert len(progress_calls) > 1
+    assert progress_calls[-1][1] == progress_calls[-1][2] == nt_file.stat().st_size
+
+
+def test_stream_nquads_keeps_named_graphs(tmp_path):
+    nq_file = tmp_path / "site.nq"
+    nq_file.write_text(
+        "<urn:s> <urn:p> <urn:o> <urn:g1> .\n"
+        "<urn:s> <urn:p> \"x\" .\n"
+    )
+    ds = rdflib.Dataset()
+    assert stream_ntriples(ds, nq_file) == 2
+    assert (rdflib.URIRef("urn:s"), rdflib.URIRef("urn:p"), rdflib.URIRef("urn:o")) in ds.graph(rdflib.URIRef("urn:g1"))
+
+    flat = rdflib.Graph()
+    stream_ntriples(flat, nq_file)
+    assert len(flat) == 2
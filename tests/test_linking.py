@@ -0,0 +1,85 @@
+import pytest
+import rdflib
+
+from c4sb_demo.linking import EntityLinker, LinkRule, normalize_key
+from c4sb_demo.sparql_constants import BRICK, REC_CORE, S223, RDF_TYPE, RDFS_LABEL, OWL_SAMEAS
+
+EX = rdflib.Namespace("http://example.com/campus#")
+
+
+def test_normalize_key():
+    assert normalize_key("RTU-01") == normalize_key("rtu_1") == normalize_key("Rtu 1 (Brick)") == "rtu1"
+    assert normalize_key("Example Office Building (REC)") == normalize_key("Example Office Building")
+    assert normalize_key("building_rec") == "building"
+
+
+def campus_graph(buildings: int, zones_per_building: int) -> rdflib.Graph:
+    g = rdflib.Graph()
+    for b in range(buildings):
+        brick_bldg, rec_bldg = EX[f"bldg_{b}"], EX[f"bldg_{b}_rec"]
+        g.add((brick_bldg, RDF_TYPE, BRICK.Building))
+        g.add((rec_bldg, RDF_TYPE, REC_CORE.Building))
+        for z in range(zones_per_building):
+            # Room labels repeat across buildings, so only the building block disambiguates them.
+            zone, room = EX[f"b{b}_zone_{z}"], EX[f"b{b}_space_{z}"]
+            g.add((zone, RDF_TYPE, BRICK.HVAC_Zone))
+            g.add((zone, RDFS_LABEL, rdflib.Literal(f"Room {z}")))
+            g.add((zone, BRICK.isPartOf, brick_bldg))
+            g.add((room, RDF_TYPE, REC_CORE.Room))
+            g.add((room, RDFS_LABEL, rdflib.Literal(f"Room {z:03d}")))
+            g.add((room, REC_CORE.isPartOfBuilding, rec_bldg))
+    return g
+
+
+def test_links_every_candidate_within_its_building():
+    g = campus_graph(buildings=3, zones_per_building=50)
+    linker = EntityLinker()
+    report = linker.link(g)
+    assert linker.last_report is report
+
+    zone_stats = next(s for s in report.rules if s.rule == "hvac_zone")
+    assert zone_stats.matched_by == {"label": 150}
+    assert zone_stats.unmatched_left == zone_stats.unmatched_right == 0
+    for b in range(3):
+        assert (EX[f"bldg_{b}"], OWL_SAMEAS, EX[f"bldg_{b}_rec"]) in g
+        assert (EX[f"b{b}_zone_7"], OWL_SAMEAS, EX[f"b{b}_space_7"]) in g
+
+
+def test_custom_rules_and_fallback_modes():
+    g = rdflib.Graph()
+    g.add((EX.unit_a, RDF_TYPE, BRICK.RTU))
+    g.add((EX.unit_b, RDF_TYPE, BRICK.RTU))
+    g.add((EX.ahu_x, RDF_TYPE, S223.AirHandlingUnit))
+    g.add((EX.ahu_y, RDF_TYPE, S223.AirHandlingUnit))
+
+    # Order-based pairing is opt-in, and "unambiguous" leaves a 2x2 block alone
+    assert EntityLinker(rules=[LinkRule("rtu", BRICK.RTU, S223.AirHandlingUnit)]).link(g).links == []
+    rule = LinkRule("rtu", BRICK.RTU, S223.AirHandlingUnit, fallback="unambiguous")
+    assert EntityLinker(rules=[rule]).link(g).links == []
+
+    report = EntityLinker(rules=[LinkRule("rtu", BRICK.RTU, S223.AirHandlingUnit, fallback="positional")]).link(g)
+    assert [(l, r) for l, r, _ in report.links] == [(EX.unit_a, EX.ahu_x), (EX.unit_b, EX.ahu_y)]
+    assert report.rules[0].matched_by == {"positional": 2}
+
+    g.remove((EX.unit_b, None, None))
+    g.remove((EX.ahu_y, None, None))
+    report = EntityLinker(rules=[rule]).link(g)
+    assert report.rules[0].matched_by == {"unambiguous": 1}
+    with pytest.raises(ValueError):
+        LinkRule("rtu", BRICK.RTU, S223.AirHandlingUnit, fallback="nearest")
+
+
+def test_equipment_tag_key():
+    g = rdflib.Graph()
+    for number, asset in ((3, "asset_9f2"), (4, "asset_7c1")):
+        unit = EX[f"roof_unit_{'north' if number == 3 else 'south'}"]
+        g.add((unit, RDF_TYPE, BRICK.RTU))
+        g.add((unit, RDFS_LABEL, rdflib.Literal(f"Roof unit (RTU-0{number})")))
+        g.add((EX[asset], RDF_TYPE, S223.AirHandlingUnit))
+        g.add((EX[asset], S223.hasTag, rdflib.Literal("rtu")))
+        g.add((EX[asset], S223.hasDescription, rdflib.Literal(f"Unit {number} on the roof")))
+
+    report = EntityLinker().link(g)
+    assert report.rules[1].matched_by == {"tag": 2}
+    assert (EX.roof_unit_north, OWL_SAMEAS, EX.asset_9f2) in g
+    assert (EX.roof_unit_south, OWL_SAMEAS, EX.asset_7c1) in g
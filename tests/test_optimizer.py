@@ -0,0 +1,67 @@
+import rdflib
+from pathlib import Path
+
+from rdflib.plugins.sparql.evaluate import evalBGP
+
+from c4sb_demo import optimizer
+from c4sb_demo.graph_operations import create_combined_linked_graph, execute_sparql_query, explain_sparql_query
+from c4sb_demo.optimizer import GraphStatistics, reorder_bgp
+from c4sb_demo.sparql_constants import BRICK, REC_CORE, RDF_TYPE, QUERY_1, QUERY_2, QUERY_3, QUERY_4
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+SOURCE_FILES = dict(
+    brick_file=DATA_PATH / "brick-building-simple.ttl",
+    rec_file=DATA_PATH / "rec-building-simple.ttl",
+    ashrae_file=DATA_PATH / "ashrae-223-rtu.ttl",
+)
+EX = rdflib.Namespace("http://example.com/reorder#")
+
+
+def test_reorder_bgp_puts_selective_patterns_first():
+    g = rdflib.Graph()
+    for i in range(100):
+        g.add((EX[f"room_{i}"], RDF_TYPE, REC_CORE.Room))
+    g.add((EX["rtu"], RDF_TYPE, BRICK.RTU))
+    g.add((EX["rtu"], BRICK.feeds, EX["room_7"]))
+    stats = GraphStatistics.collect(g)
+    assert stats.class_instances[REC_CORE.Room] == 100
+
+    room, rtu = rdflib.Variable("room"), rdflib.Variable("rtu")
+    patterns = [(room, RDF_TYPE, REC_CORE.Room), (rtu, BRICK.feeds, room), (rtu, RDF_TYPE, BRICK.RTU)]
+    ordered = reorder_bgp(patterns, stats)
+    assert ordered[0] in patterns[1:]
+    assert sorted(ordered) == sorted(patterns)
+
+
+def test_optimized_queries_match_and_explain():
+    g = create_combined_linked_graph(**SOURCE_FILES)
+    for query in (QUERY_1, QUERY_2, QUERY_3, QUERY_4):
+        expected, _ = execute_sparql_query(g, query, optimize=False)
+        actual, _ = execute_sparql_query(g, query)
+        assert actual.astype(str).equals(expected.astype(str))
+
+    plan = explain_sparql_query(g, QUERY_4)
+    steps = plan[plan["bgp"] != "where"]
+    assert list(steps.columns) == ["bgp", "step", "pattern", "estimated_rows", "actual_rows"]
+    assert "hasVoltage" in " ".join(steps["pattern"].iloc[:10])
+    assert "core:Room" not in steps["pattern"].iloc[0]
+    assert plan[plan["bgp"] == "where"]["actual_rows"].iloc[0] == 20
+
+
+def test_optimized_order_is_the_executed_order(monkeypatch):
+    g = create_combined_linked_graph(**SOURCE_FILES)
+    executed = []
+
+    def recording_eval_bgp(ctx, triples):
+        executed.append([optimizer._format_pattern(t, g) for t in triples])
+        return evalBGP(ctx, triples)
+
+    monkeypatch.setattr(optimizer, "evalBGP", recording_eval_bgp)
+    execute_sparql_query(g, QUERY_4)
+    plan = explain_sparql_query(g, QUERY_4, analyze=False)
+    planned = [list(steps["pattern"]) for _, steps in plan.groupby("bgp")]
+    assert planned and all(patterns in executed for patterns in planned)
+    # rdflib's own sort would have hoisted every class pattern to the front
+    unoptimized = explain_sparql_query(g, QUERY_4, optimize=False, analyze=False)
+    assert list(unoptimized[unoptimized["bgp"] == 0]["pattern"]) != planned[0]
@@ -0,0 +1,91 @@
+import rdflib
+from rdflib.compare import isomorphic
+from pathlib import Path
+from pyshacl import validate
+
+from c4sb_demo import rdfs_closure
+from c4sb_demo.graph_cache import GraphCache, get_graph_cache, set_graph_cache
+from c4sb_demo.rdfs_closure import compute_rdfs_closure, get_ontology_closure
+from c4sb_demo.validate_graphs import ShapesValidator
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+REC_DATA_FILE = DATA_PATH / "rec-building-simple.ttl"
+REC_ONTOLOGY_FILE = DATA_PATH / "validations" / "rec" / "rec.ttl"
+
+ONTOLOGY_TTL = """
+@prefix ex: <http://example.com/> .
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:ontology a owl:Ontology ; owl:versionInfo "1.2" .
+ex:Space a rdfs:Class .
+ex:Room rdfs:subClassOf ex:Space .
+ex:Office rdfs:subClassOf ex:Room .
+ex:hasPart rdfs:range ex:Space .
+ex:hasRoom rdfs:subPropertyOf ex:hasPart ; rdfs:domain ex:Building .
+"""
+
+DATA_TTL = """
+@prefix ex: <http://example.com/> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+ex:b1 ex:hasRoom ex:o1 .
+ex:o1 a ex:Office ; ex:area 10 .
+ex:r2 a ex:MeetingRoom .
+ex:MeetingRoom rdfs:subClassOf ex:Room .
+"""
+
+SHAPES_TTL = """
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix ex: <http://example.com/> .
+ex:SpaceShape a sh:NodeShape ;
+    sh:targetClass ex:Space ;
+    sh:property [ sh:path ex:area ; sh:minCount 1 ] .
+"""
+
+
+def test_entailment_on_cached_closure_matches_full_closure(tmp_path):
+    ontology_file = tmp_path / "ontology.ttl"
+    ontology_file.write_text(ONTOLOGY_TTL)
+    data_graph = rdflib.Graph().parse(data=DATA_TTL, format="turtle")
+    previous_cache = get_graph_cache()
+    set_graph_cache(GraphCache(cache_dir=tmp_path / "cache"))
+    try:
+        closure = get_ontology_closure([ontology_file])
+        assert get_ontology_closure([ontology_file]) is closure
+        assert closure.versions == ["http://example.com/ontology 1.2"]
+        rdfs_closure._closures.clear()  # Next lookup reads the closure back from disk
+        reloaded = get_ontology_closure([ontology_file])
+        assert reloaded is not closure and isomorphic(reloaded.graph, closure.graph)
+        assert list((tmp_path / "cache" / "closures").iterdir())
+    finally:
+        set_graph_cache(previous_cache)
+
+    full = rdflib.Graph().parse(data=ONTOLOGY_TTL + DATA_TTL, format="turtle")
+    entailed = reloaded.entail(data_graph)
+    assert isomorphic(entailed, compute_rdfs_closure(full))
+    assert len(data_graph) == 5
+
+    rec_data = rdflib.Graph().parse(REC_DATA_FILE)
+    rec = rdflib.Graph().parse(REC_ONTOLOGY_FILE)
+    rec += rec_data
+    assert isomorphic(get_ontology_closure([REC_ONTOLOGY_FILE]).entail(rec_data), compute_rdfs_closure(rec))
+
+
+def test_shapes_validator_with_ontology_matches_pyshacl(tmp_path):
+    ontology_file = tmp_path / "ontology.ttl"
+    ontology_file.write_text(ONTOLOGY_TTL)
+    shapes_file = tmp_path / "spaces.shapes.ttl"
+    shapes_file.write_text(SHAPES_TTL)
+    data_graph = rdflib.Graph().parse(data=DATA_TTL, format="turtle")
+
+    shapes_validator = ShapesValidator([shapes_file], ontology_graph_paths=[ontology_file])
+    conforms, results_graph, results_text = shapes_validator.validate(data_graph)
+    expected_conforms, expected_graph, expected_text = validate(
+        data_graph, shacl_graph=rdflib.Graph().parse(shapes_file), ont_graph=rdflib.Graph().parse(ontology_file),
+        inference='rdfs', advanced=True, allow_infos=True, allow_warnings=True, js=False,
+    )
+    assert conforms is expected_conforms is False
+    assert isomorphic(results_graph, expected_graph)
+    assert results_text == expected_text
+    assert "Results (1)" in results_text  # ex:r2 is a Space only through the ontology
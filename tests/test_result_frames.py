@@ -0,0 +1,27 @@
+from rdflib import Literal, URIRef, Variable
+from rdflib.namespace import XSD
+
+from c4sb_demo.result_frames import bindings_to_dataframe
+
+
+def test_bindings_to_dataframe_types_columns():
+    room, area, desks, label, active = (Variable(v) for v in ("room", "area", "desks", "label", "active"))
+    bindings = [
+        {room: URIRef("urn:room:1"), area: Literal("100", datatype=XSD.decimal), desks: Literal(20), label: Literal("Room 1"), active: Literal(True)},
+        {room: URIRef("urn:room:2"), area: Literal(80.5), desks: Literal(3)},
+    ]
+    df = bindings_to_dataframe([room, area, desks, label, active], bindings)
+
+    assert str(df["room"].dtype) == "category"
+    assert str(df["area"].dtype) == "Float64"
+    assert str(df["desks"].dtype) == "Int64"
+    assert str(df["active"].dtype) == "boolean"
+    assert df["area"].sum() == 180.5
+    assert df["label"].iloc[0] == "Room 1"
+    assert df["label"].isna().iloc[1]  # missing bindings are real nulls, not ""
+
+
+def test_ill_typed_literals_fall_back_to_text():
+    value = Variable("value")
+    df = bindings_to_dataframe([value], [{value: Literal("n/a", datatype=XSD.integer)}, {value: Literal(4)}])
+    assert list(df["value"]) == ["n/a", "4"]
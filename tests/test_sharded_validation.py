@@ -0,0 +1,88 @@
+import rdflib
+from rdflib.compare import isomorphic
+from pathlib import Path
+
+from c4sb_demo.incremental_validation import SH
+from c4sb_demo.sharded_validation import plan_shards, validate_sharded
+from c4sb_demo.validate_graphs import ShapesValidator
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+ASHRAE_DATA_FILE = DATA_PATH / "ashrae-223-rtu.ttl"
+ASHRAE_SHAPES_FILES = [
+    DATA_PATH / "validations" / "ashrae-223" / name
+    for name in ("data.shapes.ttl", "model.shapes.ttl", "schema.shapes.ttl")
+]
+
+EX = rdflib.Namespace("http://example.com/")
+
+SHAPES_TTL = """
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix ex: <http://example.com/> .
+
+ex:RoomShape a sh:NodeShape ;
+    sh:targetClass ex:Room ;
+    sh:property [ sh:path ex:desk ; sh:node ex:DeskShape ] ;
+    sh:property [ sh:path ( ex:isPartOf ex:isPartOf ) ; sh:class ex:Building ; sh:maxCount 1 ] .
+
+ex:DeskShape a sh:NodeShape ;
+    sh:property [ sh:path ex:label ; sh:minCount 1 ] .
+"""
+
+
+def _building_ttl(buildings: int, rooms: int) -> str:
+    lines = ["@prefix ex: <http://example.com/> .", "ex:Office <http://www.w3.org/2000/01/rdf-schema#subClassOf> ex:Room ."]
+    for b in range(buildings):
+        lines.append(f"ex:b{b} a ex:Building .")
+        lines.append(f"ex:f{b} ex:isPartOf ex:b{b} .")
+        for r in range(rooms):
+            room = f"ex:r{b}_{r}"
+            lines.append(f"{room} a {'ex:Office' if r % 2 else 'ex:Room'} ; ex:isPartOf ex:f{b} ; ex:desk ex:d{b}_{r} .")
+            if r % 3:
+                lines.append(f'ex:d{b}_{r} ex:label "Desk {r}" .')
+    lines.append("ex:f1 ex:isPartOf ex:b0 .")  # Rooms of b1 are in two buildings
+    return "\n".join(lines)
+
+
+def _results(results_graph):
+    return sorted(
+        (str(results_graph.value(r, SH.focusNode)), str(results_graph.value(r, SH.sourceConstraintComponent)),
+         str(results_graph.value(r, SH.value)))
+        for r in results_graph.subjects(SH.focusNode, None)
+    )
+
+
+def test_sharded_validation_matches_full_validation(tmp_path):
+    shapes_file = tmp_path / "rooms.shapes.ttl"
+    shapes_file.write_text(SHAPES_TTL)
+    shapes_validator = ShapesValidator([shapes_file])
+    data_graph = rdflib.Graph().parse(data=_building_ttl(buildings=3, rooms=6), format="turtle")
+    for i in range(50):  # Classes no node has stay out of the shards
+        data_graph.add((EX[f"Unused{i}"], rdflib.RDFS.subClassOf, EX["Room"]))
+
+    expected_conforms, expected_graph, _ = shapes_validator.validate(data_graph)
+    assert not expected_conforms and len(_results(expected_graph)) == 18  # With the nested sh:detail results
+
+    shards = plan_shards(shapes_validator, data_graph, shard_size=4)
+    assert sorted(len(shard.focus_nodes) for shard in shards) == [2, 4, 4, 4, 4]
+    # Context stops at the shapes' depth: a shard never holds the whole graph
+    assert all(len(shard.triples) < len(data_graph) for shard in shards)
+    assert all((EX["Office"], rdflib.RDFS.subClassOf, EX["Room"]) in shard.triples for shard in shards)
+    assert not any(s == EX["Unused0"] for shard in shards for s, _, _ in shard.triples)
+
+    for max_workers in (1, 2):
+        conforms, results_graph, results_text = validate_sharded(
+            shapes_validator, data_graph, shard_size=4, max_workers=max_workers
+        )
+        assert conforms is False
+        assert _results(results_graph) == _results(expected_graph)
+        assert "Results (12)" in results_text  # 6 unlabeled desks, 6 rooms in two buildings
+
+
+def test_sharded_validation_of_conforming_model():
+    shapes_validator = ShapesValidator(ASHRAE_SHAPES_FILES)
+    data_graph = rdflib.Graph().parse(ASHRAE_DATA_FILE)
+    conforms, results_graph, _ = validate_sharded(shapes_validator, data_graph, shard_size=10, max_workers=1)
+    expected_conforms, expected_graph, _ = shapes_validator.validate(data_graph)
+    assert conforms is expected_conforms is True
+    assert isomorphic(results_graph, expected_graph)
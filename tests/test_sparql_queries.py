@@ -6,8 +6,10 @@ from c4sb_demo.graph_operations import (
     create_combined_linked_graph,
     execute_sparql_query,
 )
+from c4sb_demo.query_cache import get_prepared_query_cache
+from c4sb_demo.witness import is_materialized
 from c4sb_demo.sparql_constants import (
-    BRICK, REC_CORE, REC_PROPS, S223,
+    BRICK, REC_CORE, REC_PROPS, S223, QUDT, UNIT,
     RDFS_LABEL, RDF_TYPE, OWL_SAMEAS,
     QUERY_1, 
     QUERY_2, 
@@ -15,8 +17,9 @@ from c4sb_demo.sparql_constants import (
     QUERY_4
 )
 
-XSD_DOUBLE = rdflib.term.URIRef("http://www.w3.org/2001/XMLSchema#double")
-XSD_STRING = rdflib.term.URIRef("http://www.w3.org/2001/XMLSchema#string")
+XSD_DECIMAL = rdflib.term.URIRef("http://www.w3.org/2001/XMLSchema#decimal")
+EX = rdflib.Namespace("http://example.com/building#")
+MYBLDG = rdflib.Namespace("http://example.com/mybuilding#")
 
 # Project root to locate data files
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -92,12 +95,16 @@ def test_query_1_path_graph(combined_graph):
     assert path_graph is not None, "Path graph should not be None for Query 1"
     assert_path_graph_basics(path_graph, QUERY_1)
     # Use actual URIs from the data
-    rtu1_uri = rdflib.URIRef("http://example.com/mybuilding#RTU-1")
-    supply_fan_uri = rdflib.URIRef("http://example.com/mybuilding#RTU-1_SupplyFan") 
+    rtu1_uri = MYBLDG["RTU-1"]
+    supply_fan_uri = MYBLDG["RTU-1_SupplyFan"]
     assert (rtu1_uri, S223.hasComponent, supply_fan_uri) in path_graph, \
         f"Path for RTU-1 to Supply Fan missing in Q1 path_graph. Path graph triples:\n{list(path_graph)}"
     assert (supply_fan_uri, RDF_TYPE, S223.Fan) in path_graph, \
         "Type for Supply Fan missing in Q1 path_graph"
+    assert (EX["rtu_1"], OWL_SAMEAS, rtu1_uri) in path_graph, \
+        "owl:sameAs link between ex:rtu_1 and mybldg:RTU-1 missing in Q1 path_graph"
+    assert (EX["room_101"], REC_CORE.containsAsset, EX["desk_01"]) in path_graph, \
+        "Desk in Room 101 missing in Q1 path_graph"
 
 # Test for Query 2 Results
 def test_query_2_results(combined_graph):
@@ -107,26 +114,21 @@ def test_query_2_results(combined_graph):
     assert str(results_df['sensor_label'].iloc[0]) == "RTU 1 Discharge Air Temperature Sensor"
     assert str(results_df['zone_label'].iloc[0]) == "HVAC Zone 1"
 
-# Test for Query 2 Path Graph (temporarily disabled)
-def test_query_2_path_graph(combined_graph): # Renamed from _test_query_2_path_graph
+# Test for Query 2 Path Graph
+def test_query_2_path_graph(combined_graph):
     _, path_graph = execute_sparql_query(combined_graph, QUERY_2) # Ignore results_df
     assert path_graph is not None, "Path graph should not be None for Query 2"
-    assert_path_graph_basics(path_graph, QUERY_2) # Re-enabled assertion
-    dat_sensor_uri = BRICK["RTU_1_DAT_Sensor"]
-    zone1_uri = BRICK["Zone1"]
-    rec_room101_uri = REC_CORE["Room101"]
-    rec_building_uri = REC_CORE["Building123"]
-
-    assert (dat_sensor_uri, BRICK.hasLocation, zone1_uri) in path_graph, \
-        "Path for DAT Sensor location Zone1 missing in Q2 path_graph"
+    assert_path_graph_basics(path_graph, QUERY_2)
+    dat_sensor_uri = EX["rtu_1_dat"]
+
+    assert (EX["rtu_1"], BRICK.hasPoint, dat_sensor_uri) in path_graph, \
+        "Path for RTU-1 hasPoint DAT Sensor missing in Q2 path_graph"
     assert (dat_sensor_uri, RDFS_LABEL, rdflib.Literal("RTU 1 Discharge Air Temperature Sensor")) in path_graph, \
         "Label for DAT Sensor missing in Q2 path_graph"
-    assert (zone1_uri, BRICK.isPartOf, rec_room101_uri) in path_graph, \
-        "Path for Zone1 partOf Room101 missing in Q2 path_graph"
-    assert (rec_room101_uri, REC_CORE.isPartOf, rec_building_uri) in path_graph, \
-        "Path for Room101 partOf Building123 missing in Q2 path_graph"
-    assert (rec_building_uri, REC_PROPS.grossArea, rdflib.Literal("50000.0", datatype=XSD_DOUBLE)) in path_graph, \
-        "Gross area for Building123 missing in Q2 path_graph"
+    assert (EX["hvac_zone_1"], OWL_SAMEAS, EX["room_101"]) in path_graph, \
+        "owl:sameAs link between hvac_zone_1 and room_101 missing in Q2 path_graph"
+    assert (EX["building"], OWL_SAMEAS, EX["building_rec"]) in path_graph, \
+        "owl:sameAs link between the Brick and REC buildings missing in Q2 path_graph"
 
 # Test for Query 3 Results
 def test_query_3_results(combined_graph):
@@ -142,20 +144,19 @@ def test_query_3_path_graph(combined_graph):
     _, path_graph = execute_sparql_query(combined_graph, QUERY_3) # Ignore results_df
     assert path_graph is not None, "Path graph should not be None for Query 3"
     assert_path_graph_basics(path_graph, QUERY_3)
-    rtu1_s223_uri = S223["RTU-1"]
-    compressor1_s223_uri = S223["RTU-1-C1"]
-    rec_room101_uri = REC_CORE["Room101"]
+    rtu1_s223_uri = MYBLDG["RTU-1"]
+    compressor1_s223_uri = MYBLDG["RTU-1_Compressor-1"]
 
     assert (rtu1_s223_uri, S223.hasComponent, compressor1_s223_uri) in path_graph, \
-        "Path for s223:RTU-1 hasComponent s223:RTU-1-C1 missing in Q3 path_graph"
+        "Path for RTU-1 hasComponent Compressor-1 missing in Q3 path_graph"
     assert (compressor1_s223_uri, RDF_TYPE, S223.Compressor) in path_graph, \
-        "Type for s223:RTU-1-C1 missing in Q3 path_graph"
-    assert (BRICK["RTU_1"], BRICK.hasLocation, BRICK["MechanicalRoom1"]) in path_graph, \
-        "Path for brick:RTU_1 location MechanicalRoom1 missing in Q3 path_graph"
-    assert (BRICK["MechanicalRoom1"], BRICK.isPartOf, rec_room101_uri) in path_graph, \
-         "Path for brick:MechanicalRoom1 partOf rec:Room101 missing in Q3 path_graph"
-    assert (rec_room101_uri, REC_PROPS.area, rdflib.Literal("100", datatype=XSD_STRING)) in path_graph, \
-        "Area for Room101 missing in Q3 path_graph"
+        "Type for Compressor-1 missing in Q3 path_graph"
+    assert (EX["rtu_1"], BRICK.feeds, EX["hvac_zone_1"]) in path_graph, \
+        "Path for rtu_1 feeds hvac_zone_1 missing in Q3 path_graph"
+    area_nodes = list(path_graph.objects(EX["room_101"], REC_PROPS.hasArea))
+    assert len(area_nodes) == 1, "Area node for Room 101 missing in Q3 path_graph"
+    assert (area_nodes[0], REC_PROPS.hasValue, rdflib.Literal("100", datatype=XSD_DECIMAL)) in path_graph, \
+        "Area value for Room 101 missing in Q3 path_graph"
 
 # Test for Query 4 Results
 def test_query_4_results(combined_graph):
@@ -172,34 +173,61 @@ def test_query_4_path_graph(combined_graph):
     _, path_graph = execute_sparql_query(combined_graph, QUERY_4) # Ignore results_df
     assert path_graph is not None, "Path graph should not be None for Query 4"
     assert_path_graph_basics(path_graph, QUERY_4)
-    rtu1_s223_uri = S223["RTU-1"]
-    voltage_bnode = None 
-    for s, p, o in path_graph.triples((rtu1_s223_uri, S223.hasVoltage, None)):
-        voltage_bnode = o
-        break
-    assert voltage_bnode is not None, "Voltage blank node not found in Q4 path_graph for RTU-1"
-    assert isinstance(voltage_bnode, rdflib.BNode), "Voltage identifier is not a BNode"
-
-    assert (voltage_bnode, S223.hasValue, rdflib.Literal("208.0", datatype=S223.numeric)) in path_graph, \
+    medium_uri = S223["AC-208VLL-3Ph-60Hz"]
+    voltage_bnode = path_graph.value(medium_uri, S223.hasVoltage)
+    assert isinstance(voltage_bnode, rdflib.BNode), "Voltage blank node not found in Q4 path_graph"
+    voltage_value_bnode = path_graph.value(voltage_bnode, S223.hasVoltage)
+    assert isinstance(voltage_value_bnode, rdflib.BNode), "Voltage value blank node not found in Q4 path_graph"
+
+    assert (voltage_value_bnode, S223.hasValue, rdflib.Literal("208.0", datatype=XSD_DECIMAL)) in path_graph, \
         "Voltage value missing in Q4 path_graph"
-    
-    voltage_unit_instance_bnode = None
-    for s, p, o in path_graph.triples((voltage_bnode, S223.hasUnit, None)):
-        voltage_unit_instance_bnode = o
-        break
-    assert voltage_unit_instance_bnode is not None, "Voltage unit instance bnode not found in Q4 path_graph"
-    assert isinstance(voltage_unit_instance_bnode, rdflib.BNode), "Voltage unit instance is not a BNode"
-    assert (voltage_unit_instance_bnode, RDFS_LABEL, rdflib.Literal("V")) in path_graph, \
+    assert (voltage_value_bnode, QUDT.hasUnit, UNIT.V) in path_graph, \
+        "Voltage unit missing in Q4 path_graph"
+    assert (UNIT.V, RDFS_LABEL, rdflib.Literal("V")) in path_graph, \
         "Voltage unit label 'V' missing in Q4 path_graph"
-    assert (voltage_unit_instance_bnode, RDF_TYPE, S223.UnitOfMeasure) in path_graph, \
-        "Voltage unit type s223:UnitOfMeasure missing in Q4 path_graph"
-
-    rec_room101_uri = REC_CORE["Room101"]
-    brick_zone1_uri = BRICK["Zone1"]
-    brick_rtu1_uri = BRICK["RTU_1"]
-    assert (brick_zone1_uri, BRICK.isPartOf, rec_room101_uri) in path_graph, \
-        "Path brick:Zone1 isPartOf rec:Room101 missing in Q4 path_graph"
-    assert (brick_rtu1_uri, BRICK.feeds, brick_zone1_uri) in path_graph, \
-        "Path brick:RTU_1 feeds brick:Zone1 missing in Q4 path_graph"
-    assert (brick_rtu1_uri, OWL_SAMEAS, rtu1_s223_uri) in path_graph, \
-        "owl:sameAs link between brick:RTU_1 and s223:RTU-1 missing in Q4 path_graph"
+    assert (EX["rtu_1"], BRICK.feeds, EX["hvac_zone_1"]) in path_graph, \
+        "Path rtu_1 feeds hvac_zone_1 missing in Q4 path_graph"
+    assert (EX["rtu_1"], OWL_SAMEAS, MYBLDG["RTU-1"]) in path_graph, \
+        "owl:sameAs link between ex:rtu_1 and mybldg:RTU-1 missing in Q4 path_graph"
+
+def test_path_graph_is_built_lazily_within_budget(combined_graph):
+    _, path_graph = execute_sparql_query(combined_graph, QUERY_1, witness_budget=10)
+    assert not is_materialized(path_graph)
+    assert len(path_graph) == 10
+    assert is_materialized(path_graph)
+
+def test_path_graph_expands_property_paths_and_snapshots_the_graph(combined_graph):
+    path_query = {"body": "SELECT ?r ?v WHERE { ?r props:hasArea/props:hasValue ?v }"}
+    results_df, path_graph = execute_sparql_query(combined_graph, path_query)
+    assert len(results_df) > 0
+    area = combined_graph.value(EX["room_101"], REC_PROPS.hasArea)
+    area_value = combined_graph.value(area, REC_PROPS.hasValue)
+
+    # Read only after the data changes: the path graph still shows the matched state
+    combined_graph.remove((area, REC_PROPS.hasValue, area_value))
+    try:
+        assert not any(isinstance(p, rdflib.paths.Path) for p in path_graph.predicates())
+        assert (EX["room_101"], REC_PROPS.hasArea, area) in path_graph
+        assert (area, REC_PROPS.hasValue, area_value) in path_graph
+    finally:
+        combined_graph.add((area, REC_PROPS.hasValue, area_value))
+
+def test_repeated_queries_reuse_prepared_query(combined_graph):
+    cache = get_prepared_query_cache()
+    execute_sparql_query(combined_graph, QUERY_4)
+    hits_before = cache.stats()["hits"]
+    results_df, _ = execute_sparql_query(combined_graph, QUERY_4)
+    assert cache.stats()["hits"] == hits_before + 1
+    assert len(results_df) == 1
+
+def test_result_cache_invalidated_by_graph_mutation(combined_graph):
+    first_df, _ = execute_sparql_query(combined_graph, QUERY_2, use_result_cache=True)
+    second_df, _ = execute_sparql_query(combined_graph, QUERY_2, use_result_cache=True)
+    assert second_df is first_df
+
+    marker = (rdflib.URIRef("urn:test:s"), RDFS_LABEL, rdflib.Literal("cache marker"))
+    combined_graph.add(marker)
+    combined_graph.remove(marker)
+    third_df, _ = execute_sparql_query(combined_graph, QUERY_2, use_result_cache=True)
+    assert third_df is not first_df
+    assert third_df.equals(first_df)
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from c4sb_demo.graph_operations import create_combined_linked_graph, execute_sparql_query
+from c4sb_demo.sparql_constants import QUERY_2
+from c4sb_demo.tracing import Tracer, get_tracer, span, tracing
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+SOURCE_FILES = (
+    DATA_PATH / "brick-building-simple.ttl",
+    DATA_PATH / "rec-building-simple.ttl",
+    DATA_PATH / "ashrae-223-rtu.ttl",
+)
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("parse"):
+        pass
+    tracer.count("query.rows", 3)
+    assert tracer.span_stats() == [] and tracer.counters() == {}
+    assert tracer.span("parse") is tracer.span("query.eval")  # The shared no-op context
+
+
+def test_tracing_aggregates_hot_path_spans(capsys):
+    with tracing() as tracer:
+        graph = create_combined_linked_graph(*SOURCE_FILES, use_cache=False)
+        results_df, path_graph = execute_sparql_query(graph, QUERY_2)
+        assert len(path_graph) > 0
+        records = tracer.records()
+    assert capsys.readouterr().out.count("DEBUG:") == 0  # INFO aggregates without printing
+
+    for name in ("parse[brick-building-simple.ttl]", "link.rule[rtu]", "query.eval", "query.dataframe", "query.path_graph"):
+        assert records["spans"][name]["calls"] >= 1, name
+    assert records["counters"]["query.rows"] == len(results_df)
+    assert not get_tracer().enabled()  # The level is restored after the block
+    with span("after"):
+        pass
+    assert "after" not in get_tracer().records()["spans"]
+
+    with tracing("debug"):
+        create_combined_linked_graph(*SOURCE_FILES, use_cache=False)
+    assert "DEBUG:" in capsys.readouterr().out
@@ -0,0 +1,136 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+import rdflib
+from rdflib.compare import isomorphic
+from pathlib import Path
+from pyshacl import validate
+
+from c4sb_demo.validate_graphs import ShapesValidator, get_shapes_validator, main
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+ASHRAE_DATA_FILE = DATA_PATH / "ashrae-223-rtu.ttl"
+ASHRAE_SHAPES_FILES = [
+    DATA_PATH / "validations" / "ashrae-223" / name
+    for name in ("data.shapes.ttl", "model.shapes.ttl", "schema.shapes.ttl")
+]
+
+SHAPES_TTL = """
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix ex: <http://example.com/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+
+ex:RoomShape a sh:NodeShape ;
+    sh:targetClass ex:Room ;
+    sh:property [ sh:path ex:area ; sh:datatype xsd:decimal ; sh:maxCount 1 ] ;
+    sh:sparql [
+        sh:message "Room has no desk" ;
+        sh:select "SELECT $this WHERE { FILTER NOT EXISTS { $this <http://example.com/desk> ?d } }" ;
+    ] .
+"""
+
+DATA_TTL = """
+@prefix ex: <http://example.com/> .
+ex:room1 a ex:Room ; ex:area 10.5 ; ex:desk ex:d1 .
+ex:room2 a ex:Room ; ex:area "big" .
+"""
+
+
+def _reference(data_graph, shacl_graph):
+    return validate(
+        data_graph, shacl_graph=shacl_graph, inference='rdfs', advanced=True,
+        allow_infos=True, allow_warnings=True, js=False,
+    )
+
+
+def test_shapes_validator_matches_pyshacl(tmp_path):
+    shapes_file = tmp_path / "rooms.shapes.ttl"
+    shapes_file.write_text(SHAPES_TTL)
+    data_graph = rdflib.Graph().parse(data=DATA_TTL, format="turtle")
+
+    shapes_validator = ShapesValidator([shapes_file])
+    expected_conforms, expected_graph, _ = _reference(data_graph, rdflib.Graph().parse(shapes_file))
+    for _ in range(2):  # The shapes are reused across runs
+        conforms, results_graph, results_text = shapes_validator.validate(data_graph)
+        assert conforms is expected_conforms is False
+        assert isomorphic(results_graph, expected_graph)
+        assert "Room has no desk" in results_text
+    assert len(data_graph) == 5  # Inference ran on a copy
+
+
+def test_shapes_validator_is_cached_per_shapes_set():
+    first = get_shapes_validator(ASHRAE_SHAPES_FILES)
+    assert get_shapes_validator(ASHRAE_SHAPES_FILES) is first
+    data_graph = rdflib.Graph().parse(ASHRAE_DATA_FILE)
+    shacl_graph = rdflib.Graph()
+    for path in ASHRAE_SHAPES_FILES:
+        shacl_graph.parse(path)
+    conforms, _, results_text = first.validate(data_graph)
+    expected_conforms, _, expected_text = _reference(data_graph, shacl_graph)
+    assert conforms == expected_conforms
+    assert results_text == expected_text
+
+
+def test_validators_patch_pyshacl_one_at_a_time(tmp_path):
+    shapes_file = tmp_path / "rooms.shapes.ttl"
+    shapes_file.write_text(SHAPES_TTL)
+    data_graph = rdflib.Graph().parse(data=DATA_TTL, format="turtle")
+    room1 = rdflib.URIRef("http://example.com/room1")
+
+    # Separate validators share pyshacl's classes; one's focus restriction must not leak into the other
+    def run(restricted):
+        validator = ShapesValidator([shapes_file])
+        focus = [room1] if restricted else None
+        return restricted, validator.validate(data_graph, focus_nodes=focus)[0]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outcomes = list(executor.map(run, [i % 2 == 0 for i in range(8)]))
+    assert all(conforms is restricted for restricted, conforms in outcomes)
+
+
+def test_validate_cli_streams_ordered_reports(tmp_path, capsys):
+    shapes_file = tmp_path / "rooms.shapes.ttl"
+    shapes_file.write_text(SHAPES_TTL)
+    models = tmp_path / "models"
+    models.mkdir()
+    (models / "a-bad.ttl").write_text(DATA_TTL)
+    (models / "b-good.ttl").write_text(
+        "@prefix ex: <http://example.com/> .\nex:room1 a ex:Room ; ex:area 10.5 ; ex:desk ex:d1 .\n"
+    )
+
+    assert main([str(models), "--shapes", str(shapes_file), "--workers", "2"]) == 1
+    out = capsys.readouterr().out
+    assert out.index("a-bad.ttl [custom]") < out.index("b-good.ttl [custom]")
+    assert "Room has no desk" in out
+    assert "1/2 conform" in out
+
+
+def test_structured_results_and_profile(tmp_path):
+    shapes_file = tmp_path / "rooms.shapes.ttl"
+    shapes_file.write_text(SHAPES_TTL)
+    data_graph = rdflib.Graph().parse(data=DATA_TTL, format="turtle")
+    shapes_validator = ShapesValidator([shapes_file])
+
+    streamed = []
+    profile = shapes_validator.new_profile()
+    conforms, _, _ = shapes_validator.validate(data_graph, profile=profile, on_result=streamed.append)
+    assert conforms is False
+    assert sorted((r["focus_node"], r["constraint_component"]) for r in streamed) == [
+        ("http://example.com/room2", "DatatypeConstraintComponent"),
+        ("http://example.com/room2", "SPARQLConstraintComponent"),
+    ]
+    shape_timings, constraint_timings = profile.records()
+    room_shape = next(t for t in shape_timings if t["shape"] == "ex:RoomShape")
+    assert room_shape["calls"] == 1 and room_shape["focus_nodes"] == 2
+    assert {t["component"] for t in constraint_timings} >= {"SPARQLConstraintComponent", "PropertyConstraintComponent"}
+    assert any(t["shape"] == "ex:RoomShape / ex:area" for t in constraint_timings)
+
+    data_file = tmp_path / "rooms.ttl"
+    data_file.write_text(DATA_TTL)
+    ndjson_file = tmp_path / "report.ndjson"
+    assert main([str(data_file), "--shapes", str(shapes_file), "--ndjson", str(ndjson_file)]) == 1
+    lines = [json.loads(line) for line in ndjson_file.read_text().splitlines()]
+    assert [line["type"] for line in lines[:2]] == ["result", "result"]
+    assert {line["type"] for line in lines[2:-1]} == {"shape_timing", "constraint_timing"}
+    assert lines[-1]["type"] == "summary" and lines[-1]["conforms"] is False and lines[-1]["results"] == 2
+    assert all(line["data_path"] == str(data_file) for line in lines)
@@ -0,0 +1,52 @@
+import rdflib
+from pathlib import Path
+
+from c4sb_demo.graph_operations import create_combined_linked_graph, execute_sparql_query
+from c4sb_demo.sparql_constants import REC_CORE, RDF_TYPE, VIEW, ROOM_IMPACT_QUERY
+from c4sb_demo.views import get_room_view
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+SOURCE_FILES = dict(
+    brick_file=DATA_PATH / "brick-building-simple.ttl",
+    rec_file=DATA_PATH / "rec-building-simple.ttl",
+    ashrae_file=DATA_PATH / "ashrae-223-rtu.ttl",
+)
+EX = rdflib.Namespace("http://example.com/building#")
+XSD_INTEGER = rdflib.URIRef("http://www.w3.org/2001/XMLSchema#integer")
+
+
+def test_room_views_are_materialized():
+    g = create_combined_linked_graph(**SOURCE_FILES, materialize_views=True)
+    view = get_room_view(g)
+    assert view is not None
+    assert view.desk_count(EX["room_101"]) == 20
+    assert view.desk_count(EX["room_102"]) == 10
+    assert float(view.room_area(EX["room_101"])) == 100.0
+    assert (EX["room_101"], VIEW.deskCount, rdflib.Literal(20, datatype=XSD_INTEGER)) in g
+    assert (None, VIEW.deskCount, None) not in create_combined_linked_graph(**SOURCE_FILES)  # Opt-in
+
+    results_df, _ = execute_sparql_query(g, ROOM_IMPACT_QUERY)
+    assert list(results_df["room_label"].astype(str)) == ["Room 101"]  # Only room_101 is linked to a zone
+    assert list(results_df["desk_count"]) == [20]
+    assert list(results_df["room_area"]) == [100.0]
+
+
+def test_room_views_follow_graph_changes():
+    g = create_combined_linked_graph(**SOURCE_FILES, materialize_views=True)
+    view = get_room_view(g)
+    new_desk = EX["desk_99"]
+    g.add((EX["room_102"], REC_CORE.containsAsset, new_desk))
+    assert view.desk_count(EX["room_102"]) == 10  # Not a desk until typed
+    g.add((new_desk, RDF_TYPE, REC_CORE.Desk))
+    assert view.desk_count(EX["room_102"]) == 11
+    assert g.value(EX["room_102"], VIEW.deskCount) == rdflib.Literal(11, datatype=XSD_INTEGER)
+
+    g.remove((EX["room_101"], REC_CORE.containsAsset, None))
+    assert view.desk_count(EX["room_101"]) == 0
+    assert g.value(EX["room_101"], VIEW.deskCount) == rdflib.Literal(0, datatype=XSD_INTEGER)
+    assert view.desk_count(EX["room_102"]) == 11
+
+    # A room without desks still shows up in the room impact query
+    results_df, _ = execute_sparql_query(g, ROOM_IMPACT_QUERY)
+    assert list(results_df["desk_count"]) == [0]
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import rdflib
+from rdflib import Literal
+
+from c4sb_demo.graph_operations import create_combined_linked_graph
+from c4sb_demo.synthetic import BuildingScale, generate_building_files
+from c4sb_demo.visualization import (
+    ClassOverview,
+    GraphIndex,
+    build_neighborhood_network,
+    build_pyvis_network,
+    expand_neighborhood,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = PROJECT_ROOT / "data"
+
+
+def test_pyvis_network_from_single_pass_index():
+    graph = rdflib.Graph().parse(DATA_PATH / "brick-building-simple.ttl")
+    net = build_pyvis_network(graph)
+
+    resources = {str(s) for s in graph.subjects()} | {str(o) for o in graph.objects() if not isinstance(o, Literal)}
+    assert net.node_ids == [n["id"] for n in net.nodes] and set(net.node_ids) == resources
+    assert len(net.edges) == sum(1 for _, _, o in graph if not isinstance(o, Literal))
+
+    rtu = net.get_node("http://example.com/building#rtu_1")
+    assert rtu["label"] == "Rooftop HVAC Unit 1"
+    assert rtu["title"] == "http://example.com/building#rtu_1\nlabel: Rooftop HVAC Unit 1"
+    assert net.get_node("https://brickschema.org/schema/Brick#RTU")["label"] == "RTU"  # Local name fallback
+    feeds = [e for e in net.edges if e["title"] == "https://brickschema.org/schema/Brick#feeds"]
+    assert len(feeds) == 2 and all(e["label"] == "feeds" and e["arrows"] == "to" for e in feeds)
+    assert "<script" in net.generate_html()
+
+
+def test_graph_index_labels_prefer_rdfs_over_skos(tmp_path):
+    generated = generate_building_files(tmp_path, BuildingScale(rtus=2, zones_per_rtu=2), seed=0)
+    graph = rdflib.Graph().parse(generated.rec_file)
+    skos = rdflib.URIRef("http://www.w3.org/2004/02/skos/core#prefLabel")
+    room = next(graph.subjects(rdflib.RDFS.label, None))
+    graph.add((room, skos, Literal("Preferred")))
+    other = rdflib.URIRef("http://example.com/building#only_skos")
+    graph.add((other, skos, Literal("Only SKOS")))
+
+    index = GraphIndex.from_graph(graph)
+    assert index.label(room) == str(graph.value(room, rdflib.RDFS.label))
+    assert index.label(other) == "Only SKOS"
+    assert "prefLabel: Preferred" in index.title(room)
+
+
+def test_level_of_detail_overview_and_neighborhood(tmp_path):
+    scale = BuildingScale(rtus=2, zones_per_rtu=3, desks_per_room=4, points_per_rtu=3)
+    generated = generate_building_files(tmp_path, scale, seed=2)
+    graph = create_combined_linked_graph(
+        generated.brick_file, generated.rec_file, generated.ashrae_file, use_cache=False
+    )
+    index = GraphIndex.from_graph(graph)
+    brick = rdflib.Namespace("https://brickschema.org/schema/Brick#")
+    rec = rdflib.Namespace("https://w3id.org/rec/core/")
+
+    overview = ClassOverview.from_index(index)
+    counts = {c.cls: c.instances for c in overview.classes}
+    assert counts[brick.RTU] == 2 and counts[brick.HVAC_Zone] == 6 and counts[rec.Desk] == generated.desks
+    assert overview.links[(brick.RTU, brick.feeds, brick.HVAC_Zone)] == 6
+
+    # The RTU's zones are drawn one by one, its points as a single cluster
+    rtu = rdflib.URIRef("http://example.com/building#b0_rtu_1")
+    view = expand_neighborhood(index, [rtu], hops=1)
+    assert not view.truncated
+    assert sum(1 for n in view.nodes if brick.HVAC_Zone in index.types.get(n, ())) == 3
+    [points] = [c for c in view.clusters if c.predicate == brick.hasPoint]
+    assert len(points.members) == 3 and points.anchor == rtu
+
+    # Two hops out the rooms' desks are clustered; a tight budget stops the expansion
+    wide = expand_neighborhood(index, [rtu], hops=3, cluster_min=1)
+    assert any(c.member_type == rec.Desk for c in wide.clusters)
+    assert not any(rec.Desk in index.types.get(n, ()) for n in wide.nodes)
+    small = expand_neighborhood(index, [rtu], hops=3, max_nodes=8)
+    assert small.truncated and small.size == 8
+    assert len(expand_neighborhood(index, [rtu], hops=1, max_fanout=2).nodes) < len(view.nodes)
+
+    net = build_neighborhood_network(view, index)
+    assert len(net.nodes) == view.size
+    assert {e["from"] for e in net.edges} | {e["to"] for e in net.edges} <= set(net.node_ids)